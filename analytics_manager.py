@@ -1,49 +1,34 @@
 # analytics_manager.py
 
-from decimal import Decimal
-from collections import defaultdict
-from datetime import date
-from typing import List, Dict
-from data_manager import load_json, FILES
 import user_manager as um
-from utils import to_decimal, fmt_money
+from utils import fmt_money
+from money import Money
+from frame import linear_trend
+import rollups
 import ui
 
-TXNS_PATH = FILES["transactions"]
-
 def predict_next_month_net():
     if not um.is_logged_in():
         ui.status_warn("Please log in first.")
         return
     cu = um.get_current_user()
-    txns = [t for t in load_json(TXNS_PATH) if t.get("username")==cu["username"]]
-    if not txns:
+    if not rollups.count(cu["username"]):
         ui.status_warn("No data for prediction.")
         return
 
     # net per month
-    buckets = defaultdict(lambda: Decimal("0"))
-    for t in txns:
-        ym = t["date"][:7]
-        amt = to_decimal(t["amount"])
-        buckets[ym] += amt if t["type"]=="income" else -amt
+    buckets = {ym: net for ym, (_, _, net) in rollups.monthly_totals(cu["username"]).items()}
     months = sorted(buckets.keys())
     if len(months) < 2:
         ui.status_warn("Need at least 2 months of data.")
         return
 
     # simple linear trend on index vs net
-    nets = [buckets[m] for m in months]
+    nets = [float(buckets[m]) for m in months]
     n = len(nets)
-    xs = list(range(n))
-    x_mean = sum(xs)/n
-    y_mean = sum(float(v) for v in nets)/n
-    num = sum((x-x_mean)*(float(y)-y_mean) for x,y in zip(xs,nets))
-    den = sum((x-x_mean)**2 for x in xs) or 1
-    slope = num/den
-    intercept = y_mean - slope*x_mean
+    slope, intercept = linear_trend(nets)
     next_x = n
-    pred = Decimal(str(intercept + slope*next_x))
+    pred = Money.parse(f"{intercept + slope*next_x:.2f}")
 
     ui.section("Predictive Analytics")
     print(f"Trend based on {n} month(s).")
@@ -0,0 +1,233 @@
+# backup_store.py
+# Content-addressed, compressed backups (replaces copying every file into data/backups).
+#
+# Each backed-up version is cut into content-defined chunks at line ends
+# (a line whose CRC32 hits the boundary mask closes a chunk), and every
+# chunk is stored once, zlib-compressed, under its SHA-256. A version is a
+# catalog entry listing its chunks, so an edit only adds the chunks around
+# the change, and an unchanged file adds nothing at all.
+# With PFM_BACKUP_DELTA=0 a version is stored as a single whole-file object.
+#
+# Usage:
+#   python backup_store.py list [file]
+#   python backup_store.py restore <file> [version-sha] [dest]
+#   python backup_store.py prune            (apply PFM_BACKUP_KEEP)
+#   python backup_store.py import-legacy    (fold old *.bak copies in)
+
+import hashlib
+import json
+import os
+import re
+import sys
+import zlib
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from data_manager import BACKUP_DIR, locked
+import ui
+
+OBJECT_DIR = os.path.join(BACKUP_DIR, "objects")
+CATALOG_PATH = os.path.join(BACKUP_DIR, "catalog.json")
+
+DELTA = os.environ.get("PFM_BACKUP_DELTA", "1").strip() != "0"
+BOUNDARY_MASK = 0x1F            # ~1 boundary every 32 lines
+MAX_CHUNK = 64 * 1024           # also cut long runs without newlines
+
+# Retention: keep the newest version in each of the last N hours/days/weeks.
+DEFAULT_KEEP = {"hourly": 24, "daily": 7, "weekly": 4}
+
+def retention_policy() -> Dict[str, int]:
+    keep = dict(DEFAULT_KEEP)
+    for part in os.environ.get("PFM_BACKUP_KEEP", "").split(","):
+        name, _, n = part.partition("=")
+        if name.strip() in keep and n.strip().isdigit():
+            keep[name.strip()] = int(n)
+    return keep
+
+# ---------- Objects ----------
+def _object_path(sha: str) -> str:
+    return os.path.join(OBJECT_DIR, sha[:2], sha)
+
+def _put(data: bytes) -> str:
+    sha = hashlib.sha256(data).hexdigest()
+    path = _object_path(sha)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(zlib.compress(data, 6))
+        os.replace(tmp, path)
+    return sha
+
+def _get(sha: str) -> bytes:
+    with open(_object_path(sha), "rb") as f:
+        return zlib.decompress(f.read())
+
+def _chunks(data: bytes) -> List[bytes]:
+    out, cur, size = [], [], 0
+    for line in data.splitlines(keepends=True):
+        cur.append(line)
+        size += len(line)
+        if (zlib.crc32(line) & BOUNDARY_MASK) == 0 or size >= MAX_CHUNK:
+            out.append(b"".join(cur))
+            cur, size = [], 0
+    if cur:
+        out.append(b"".join(cur))
+    return out
+
+# ---------- Catalog ----------
+def _load_catalog() -> List[dict]:
+    try:
+        with open(CATALOG_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return []
+
+def _save_catalog(entries: List[dict]):
+    os.makedirs(BACKUP_DIR, exist_ok=True)
+    entries.sort(key=lambda e: e["time"])   # stable: oldest first, per file too
+    tmp = CATALOG_PATH + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(entries, f, indent=1)
+    os.replace(tmp, CATALOG_PATH)
+
+def versions(name: Optional[str] = None) -> List[dict]:
+    """Catalog entries (newest last), optionally for one file name."""
+    return [e for e in _load_catalog() if name is None or e["file"] == name]
+
+# ---------- Backup / restore ----------
+def backup(path, when: Optional[datetime] = None) -> Optional[str]:
+    """Store the current contents of path; returns the version sha, or None
+    if the file is missing or identical to its latest version."""
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    sha = hashlib.sha256(data).hexdigest()
+    name = os.path.basename(path)
+    os.makedirs(BACKUP_DIR, exist_ok=True)
+    # Other processes back up and prune too; a catalog read-modify-write
+    # (and the objects it references) must not interleave with theirs.
+    with locked(CATALOG_PATH):
+        catalog = _load_catalog()
+        latest = next((e for e in reversed(catalog) if e["file"] == name), None)
+        if latest is not None and latest["sha"] == sha:
+            return None
+        if DELTA:
+            chunks = [_put(c) for c in _chunks(data)]
+        else:
+            chunks = [_put(data)]
+        catalog.append({"file": name, "time": (when or datetime.now()).isoformat(timespec="seconds"),
+                        "sha": sha, "size": len(data), "chunks": chunks})
+        _save_catalog(catalog)
+    return sha
+
+def read_version(entry: dict) -> bytes:
+    data = b"".join(_get(c) for c in entry["chunks"])
+    if hashlib.sha256(data).hexdigest() != entry["sha"]:
+        raise ValueError(f"Backup of {entry['file']} at {entry['time']} is corrupt")
+    return data
+
+def restore(name, sha_prefix: Optional[str] = None, dest: Optional[str] = None) -> Optional[str]:
+    """Write a version of name (latest, or the one whose sha starts with
+    sha_prefix) to dest (default: <name>.restored in the data dir)."""
+    matches = [e for e in versions(name) if sha_prefix is None or e["sha"].startswith(sha_prefix)]
+    if not matches:
+        return None
+    dest = dest or os.path.join(os.path.dirname(BACKUP_DIR), name + ".restored")
+    with open(dest, "wb") as f:
+        f.write(read_version(matches[-1]))
+    return dest
+
+# ---------- Retention ----------
+_BUCKETS = {
+    "hourly": lambda t: t.strftime("%Y-%m-%d %H"),
+    "daily":  lambda t: t.strftime("%Y-%m-%d"),
+    "weekly": lambda t: "%d-W%02d" % t.isocalendar()[:2],
+}
+
+def _kept(entries: List[dict], keep: Dict[str, int]) -> set:
+    """Indexes (into entries, one file's versions oldest first) to keep."""
+    kept = {len(entries) - 1} if entries else set()   # always the latest
+    for bucket, n in keep.items():
+        seen = []
+        for i in range(len(entries) - 1, -1, -1):
+            label = _BUCKETS[bucket](datetime.fromisoformat(entries[i]["time"]))
+            if label in seen:
+                continue
+            if len(seen) >= n:
+                break
+            seen.append(label)
+            kept.add(i)
+    return kept
+
+def prune(keep: Optional[Dict[str, int]] = None):
+    """Drop versions outside the retention policy and unreferenced objects."""
+    keep = keep or retention_policy()
+    os.makedirs(BACKUP_DIR, exist_ok=True)
+    # Held through the object sweep, so a concurrent backup cannot lose the
+    # chunks it just stored.
+    with locked(CATALOG_PATH):
+        catalog = _load_catalog()
+        by_file: Dict[str, List[int]] = {}
+        for i, e in enumerate(catalog):
+            by_file.setdefault(e["file"], []).append(i)
+        survivors = set()
+        for idxs in by_file.values():
+            survivors |= {idxs[j] for j in _kept([catalog[i] for i in idxs], keep)}
+        new_catalog = [e for i, e in enumerate(catalog) if i in survivors]
+        _save_catalog(new_catalog)
+
+        live = {c for e in new_catalog for c in e["chunks"]}
+        freed = removed = 0
+        if os.path.isdir(OBJECT_DIR):
+            for sub in os.listdir(OBJECT_DIR):
+                for sha in os.listdir(os.path.join(OBJECT_DIR, sub)):
+                    if sha not in live:
+                        p = os.path.join(OBJECT_DIR, sub, sha)
+                        freed += os.path.getsize(p)
+                        os.remove(p)
+                        removed += 1
+    ui.status_ok(f"Kept {len(new_catalog)} of {len(catalog)} version(s); "
+                 f"removed {removed} object(s), {freed / 1024:.1f} KiB freed.")
+
+# ---------- Legacy copies ----------
+_LEGACY = re.compile(r"^(?P<name>.+)_(?P<ts>\d{8}_\d{6})\.bak$")
+
+def import_legacy():
+    """Fold the old <file>_<YYYYmmdd_HHMMSS>.bak copies into the store and delete them."""
+    found = []
+    for fn in os.listdir(BACKUP_DIR):
+        m = _LEGACY.match(fn)
+        if m:
+            found.append((datetime.strptime(m["ts"], "%Y%m%d_%H%M%S"), m["name"], fn))
+    stored = 0
+    for when, name, fn in sorted(found):
+        src = os.path.join(BACKUP_DIR, fn)
+        tmp = os.path.join(BACKUP_DIR, name)   # catalog keys by base name
+        os.replace(src, tmp)
+        try:
+            stored += backup(tmp, when) is not None
+        finally:
+            os.remove(tmp)
+    ui.status_ok(f"Imported {len(found)} legacy backup(s) as {stored} distinct version(s).")
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    cmd = args[0] if args else "list"
+    if cmd == "list":
+        for e in versions(args[1] if len(args) > 1 else None):
+            print(f"{e['time']}  {e['file']:<20} {e['sha'][:12]}  {e['size']:>9} bytes  {len(e['chunks'])} chunk(s)")
+    elif cmd == "restore" and len(args) >= 2:
+        out = restore(args[1], args[2] if len(args) > 2 else None, args[3] if len(args) > 3 else None)
+        if out:
+            ui.status_ok(f"Restored -> {out}")
+        else:
+            ui.status_err("No matching backup.")
+    elif cmd == "prune":
+        prune()
+    elif cmd == "import-legacy":
+        import_legacy()
+    else:
+        print(__doc__ or "usage: python backup_store.py list|restore|prune|import-legacy")
@@ -1,74 +1,84 @@
 # budgets_manager.py
 
-from typing import List
-from collections import defaultdict
+from typing import List, Optional
 from datetime import date
-from decimal import Decimal
-from data_manager import load_json, save_json_with_backup, FILES
-from utils import get_nonempty_input, get_number, fmt_money
+from data_manager import get_backend, timed
+from utils import get_nonempty_input, get_amount, fmt_money
+from money import migrate_rows
 import user_manager as um
+import services as svc
 import ui
-import transaction_manager as tm
 
-BUDGETS_PATH = FILES["budgets"]
-_budgets: List[dict] = load_json(BUDGETS_PATH)
+_backend = get_backend()
+_budgets: Optional[List[dict]] = None   # loaded on first use, see get_budgets_data
 
-def save_budgets():
-    save_json_with_backup(BUDGETS_PATH, _budgets)
+def get_budgets_data() -> List[dict]:
+    global _budgets
+    if _budgets is None:
+        with timed("load budgets"):
+            _budgets = _backend.load("budgets")
+            migrate_rows("budgets", _budgets)
+    return _budgets
 
-def _ym(dt: str) -> str:
-    # dt is "YYYY-MM-DD"
-    return dt[:7] if len(dt) >= 7 else ""
+# ---------- Data ----------
+def user_budgets(username: str, month: Optional[str] = None) -> List[dict]:
+    return [b for b in get_budgets_data()
+            if b["username"] == username and (month is None or b["month"] == month)]
 
-def set_budget():
+def upsert_budget(username: str, category: str, month: str, limit_cents: int) -> dict:
+    existing = next((b for b in user_budgets(username, month) if b["category"] == category), None)
+    if existing:
+        before = dict(existing)
+        existing["limit_cents"] = limit_cents
+        _backend.update("budgets", get_budgets_data(), [existing], [before])
+        return existing
+    b = {"username": username, "category": category, "limit_cents": limit_cents, "month": month}
+    budgets = get_budgets_data()
+    budgets.append(b)
+    _backend.insert("budgets", budgets, [b])
+    return b
+
+# ---------- Menu adapters (see services.BudgetService) ----------
+def _service():
     if not um.is_logged_in():
         ui.status_warn("Please log in first.")
+        return None
+    return svc.BudgetService(svc.Session.for_user(um.get_current_user()))
+
+def set_budget():
+    s = _service()
+    if s is None:
         return
-    cu = um.get_current_user()
     ui.section("Set Monthly Budget")
     category = get_nonempty_input("Category: ").title()
     month = input("Month (YYYY-MM, blank = current): ").strip() or date.today().strftime("%Y-%m")
-    limit_amt = get_number("Monthly limit: ")
-
-    # upsert
-    existing = next((b for b in _budgets if b["username"]==cu["username"] and b["category"]==category and b["month"]==month), None)
-    if existing:
-        existing["limit"] = float(limit_amt)
-    else:
-        _budgets.append({"username": cu["username"], "category": category, "limit": float(limit_amt), "month": month})
-    save_budgets()
+    limit_amt = get_amount("Monthly limit: ")
+    try:
+        s.set(category, limit_amt, month)
+    except svc.ServiceError as e:
+        ui.status_err(str(e))
+        return
     ui.status_ok("Budget saved.")
 
 def view_budgets():
-    if not um.is_logged_in():
-        ui.status_warn("Please log in first.")
+    s = _service()
+    if s is None:
         return
-    cu = um.get_current_user()
+    cur = s.session.currency
     month = input("Month (YYYY-MM, blank = current): ").strip() or date.today().strftime("%Y-%m")
-
-    # sum expenses by category for this month
-    txns = [t for t in tm.get_transactions_data() if t.get("username")==cu["username"] and _ym(t.get("date",""))==month and t.get("type")=="expense"]
-    spent = defaultdict(Decimal)
-    for t in txns:
-        spent[t["category"]] += Decimal(str(t["amount"]))
+    try:
+        budgets = s.status(month)
+    except svc.ServiceError as e:
+        ui.status_err(str(e))
+        return
 
     rows = []
-    any_budget = False
-    for b in [x for x in _budgets if x["username"]==cu["username"] and x["month"]==month]:
-        any_budget = True
-        cat = b["category"]
-        limit = Decimal(str(b["limit"]))
-        used  = spent.get(cat, Decimal("0"))
-        pct = (used/limit*100) if limit>0 else Decimal("0")
-        status = "OK"
-        color = ui.FG["green"]
-        if used >= limit:
-            status = "OVER"
-            color = ui.FG["red"]
-        bar = _bar(int(pct))
-        rows.append((cat, f"{bar} {pct:.0f}%", fmt_money(used, cu["currency"]), fmt_money(limit, cu["currency"]), color+status+ui.RESET))
+    for b in budgets:
+        color, status = (ui.FG["red"], "OVER") if b["over"] else (ui.FG["green"], "OK")
+        bar = _bar(int(b["pct"]))
+        rows.append((b["category"], f"{bar} {b['pct']:.0f}%", fmt_money(b["spent"], cur), fmt_money(b["limit"], cur), color+status+ui.RESET))
     ui.section(f"Budgets — {month}")
-    if not any_budget:
+    if not rows:
         ui.status_warn("No budgets set for this month.")
     else:
         ui.table(rows, headers=("CATEGORY","PROGRESS","SPENT","LIMIT","STATUS"), align=["l","l","r","r","c"])
@@ -0,0 +1,252 @@
+# cli.py
+# Non-interactive commands for scripts and cron (the menus stay in main.py).
+#
+#   python cli.py txn add --user sarah --type expense --amount 12.50 --category Food
+#   python cli.py txn add --user sarah --file rows.jsonl      (or --file - for stdin)
+#   python cli.py txn import data/bank.csv --resume
+#   python cli.py report monthly --user sarah --month 2025-10 --json
+#   python cli.py recurring apply --all-users
+#   python cli.py reminders due --all-users --days 3
+#
+# Commands run the managers' own logic without prompts. A batch is validated
+# as a whole and committed with a single insert (one write of the store).
+# Results go to stdout (tab-separated, or JSON with --json); status messages
+# from the managers go to stderr. Exit status: 0 ok, 1 rejected input.
+
+import argparse
+import contextlib
+import json
+import sys
+from datetime import date, datetime
+from typing import List
+
+from data_manager import close_writes
+from utils import iso_ordinal, today_iso
+
+EXIT_OK, EXIT_REJECTED = 0, 1
+
+def _emit(out, args, payload, lines):
+    if args.json:
+        out.write(json.dumps(payload, ensure_ascii=False) + "\n")
+    else:
+        for fields in lines:
+            out.write("\t".join(str(f) for f in fields) + "\n")
+
+# ---------- txn add ----------
+def _read_records(path) -> List[dict]:
+    """JSON Lines (one object per line) or a JSON array, from a file or '-'.
+
+    Raises ValueError for unreadable input or a record that is not an object."""
+    try:
+        if path == "-":
+            text = sys.stdin.read()
+        else:
+            with open(path, encoding="utf-8") as f:
+                text = f.read()
+    except (OSError, UnicodeDecodeError) as e:
+        raise ValueError(f"cannot read {path}: {e}")
+    if text.lstrip().startswith("["):
+        try:
+            records = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"malformed JSON: {e}")
+    else:
+        records = []
+        for n, line in enumerate(text.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError as e:
+                raise ValueError(f"malformed JSON on line {n}: {e.msg}")
+    for n, rec in enumerate(records, start=1):
+        if not isinstance(rec, dict):
+            raise ValueError(f"record {n} is not a JSON object")
+    return records
+
+def cmd_txn_add(args, out):
+    import import_export as ie
+    import transaction_manager as tm
+    import user_manager as um
+
+    if args.file:
+        try:
+            records = _read_records(args.file)
+        except ValueError as e:
+            _emit(out, args, {"ok": False, "error": str(e)}, [("error", str(e))])
+            return EXIT_REJECTED
+    else:
+        if args.amount is None:
+            raise SystemExit("txn add: --amount is required without --file")
+        records = [{"amount": args.amount}]
+
+    usernames = {u.get("username") for u in um.get_users_data()}
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    rows, errors = [], []
+    for n, rec in enumerate(records, start=1):
+        rec = {k: ("" if v is None else str(v)) for k, v in dict(rec).items()}
+        # Fields a record leaves out come from the command line.
+        rec["username"] = rec.get("username") or args.user or ""
+        rec["type"] = rec.get("type") or args.type
+        rec["category"] = rec.get("category") or args.category
+        rec["description"] = rec.get("description") or args.description
+        rec["date"] = rec.get("date") or args.date or today_iso()
+        rec["id"] = "0"     # numbered below, once the batch is accepted
+        try:
+            t = ie.normalize_record(rec, usernames, now)
+        except ValueError as e:
+            reason, value = e.args
+            errors.append({"record": n, "reason": reason, "value": value})
+            continue
+        rows.append(t)
+
+    if errors and not args.skip_invalid:
+        _emit(out, args, {"ok": False, "added": 0, "errors": errors},
+              [("error", e["record"], e["reason"], e["value"]) for e in errors])
+        return EXIT_REJECTED
+    by_user = {}
+    for t in rows:
+        by_user.setdefault(t["username"], []).append(t)
+    for user, user_rows in by_user.items():
+        tm.assign_ids(user, user_rows)
+    tm.insert_transactions(rows)
+    _emit(out, args, {"ok": True, "added": len(rows), "ids": [[t["username"], t["id"]] for t in rows],
+                      "errors": errors},
+          [("added", len(rows))] + [("skipped", e["record"], e["reason"], e["value"]) for e in errors])
+    return EXIT_OK
+
+# ---------- txn import ----------
+def cmd_txn_import(args, out):
+    import import_export as ie
+    stats = ie.import_transactions_csv(args.path, chunk_size=args.chunk_size or ie.CHUNK_ROWS,
+                                       resume=args.resume)
+    if stats is None:
+        _emit(out, args, {"ok": False, "path": args.path}, [("error", args.path)])
+        return EXIT_REJECTED
+    _emit(out, args, {"ok": True, "path": args.path, **stats},
+          [("imported", stats["imported"]), ("rejected", stats["rejected"])]
+          + [("reason", r, n) for r, n in sorted(stats["reasons"].items())])
+    return EXIT_OK
+
+# ---------- report monthly ----------
+def cmd_report_monthly(args, out):
+    import rollups
+    import user_manager as um
+    if um.find_user(args.user) is None:
+        _emit(out, args, {"ok": False, "error": f"unknown user {args.user!r}"}, [("error", "unknown user", args.user)])
+        return EXIT_REJECTED
+    months = rollups.months(args.user) if args.all_months else [args.month]
+    report = []
+    for ym in months:
+        inc, exp, net = rollups.totals(args.user, ym)
+        cats = rollups.category_expenses(args.user, ym)
+        report.append({"month": ym, "income": str(inc), "expense": str(exp), "net": str(net),
+                       "transactions": rollups.count(args.user, ym),
+                       "expenses_by_category": {c: str(m) for c, m in sorted(cats.items())}})
+    lines = [(r["month"], r["income"], r["expense"], r["net"], r["transactions"]) for r in report]
+    _emit(out, args, {"ok": True, "user": args.user, "months": report}, lines)
+    return EXIT_OK
+
+# ---------- recurring apply ----------
+def cmd_recurring_apply(args, out):
+    import recurring_manager as rc
+    users = rc.rule_owners() if args.all_users else args.user
+    counts = rc.apply_due_for(users, args.today)
+    _emit(out, args, {"ok": True, "today": args.today or date.today().isoformat(),
+                      "applied": counts, "total": sum(counts.values())},
+          [(u, n) for u, n in sorted(counts.items())])
+    return EXIT_OK
+
+# ---------- reminders due ----------
+def cmd_reminders_due(args, out):
+    import reminders_manager as rem
+    lo = args.today or date.today().isoformat()
+    hi = date.fromordinal(iso_ordinal(lo) + args.days).isoformat()
+    if args.all_users:
+        hits = rem.reminders_due_all(lo, hi)
+    else:
+        hits = sorted((dr for u in dict.fromkeys(args.user) for dr in rem.reminders_due(u, lo, hi)),
+                      key=lambda dr: dr[0])
+    due = [{"username": r["username"], "due_date": d, "title": r["title"], "notes": r.get("notes", "")}
+           for d, r in hits]
+    _emit(out, args, {"ok": True, "from": lo, "to": hi, "due": due},
+          [(x["username"], x["due_date"], x["title"]) for x in due])
+    return EXIT_OK
+
+# ---------- Parser ----------
+def _month(s):
+    if iso_ordinal(f"{s}-01") is None:
+        raise argparse.ArgumentTypeError("expected YYYY-MM")
+    return s
+
+def _day(s):
+    if iso_ordinal(s) is None:
+        raise argparse.ArgumentTypeError("expected YYYY-MM-DD")
+    return s
+
+def build_parser():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--json", action="store_true", help="print results as JSON")
+
+    p = argparse.ArgumentParser(prog="pfm", description="Personal Finance Manager batch commands.")
+    groups = p.add_subparsers(dest="group", required=True)
+
+    txn = groups.add_parser("txn", help="transactions").add_subparsers(dest="command", required=True)
+    add = txn.add_parser("add", parents=[common], help="add one transaction or a batch")
+    add.add_argument("--user", help="owner (batch records may carry their own 'username')")
+    add.add_argument("--type", default="expense", choices=("income", "expense"))
+    add.add_argument("--amount")
+    add.add_argument("--category", default="Uncategorized")
+    add.add_argument("--date", type=_day, help="YYYY-MM-DD (default today)")
+    add.add_argument("--description", default="")
+    add.add_argument("--file", help="JSON Lines / JSON array of records, '-' for stdin")
+    add.add_argument("--skip-invalid", action="store_true", help="commit the valid records of a batch")
+    add.set_defaults(run=cmd_txn_add)
+
+    imp = txn.add_parser("import", parents=[common], help="stream a CSV (export format) in")
+    imp.add_argument("path")
+    imp.add_argument("--chunk-size", type=int, help="rows per commit (default 5000)")
+    resume = imp.add_mutually_exclusive_group()
+    resume.add_argument("--resume", dest="resume", action="store_true", default=False,
+                        help="continue an interrupted import from its checkpoint")
+    resume.add_argument("--restart", dest="resume", action="store_false", help="ignore any checkpoint (default)")
+    imp.set_defaults(run=cmd_txn_import)
+
+    report = groups.add_parser("report", help="reports").add_subparsers(dest="command", required=True)
+    monthly = report.add_parser("monthly", parents=[common], help="income/expense/net for a month")
+    monthly.add_argument("--user", required=True)
+    monthly.add_argument("--month", type=_month, default=date.today().strftime("%Y-%m"), help="YYYY-MM (default this month)")
+    monthly.add_argument("--all-months", action="store_true", help="every month with transactions")
+    monthly.set_defaults(run=cmd_report_monthly)
+
+    rec = groups.add_parser("recurring", help="recurring rules").add_subparsers(dest="command", required=True)
+    apply = rec.add_parser("apply", parents=[common], help="generate due occurrences")
+    who = apply.add_mutually_exclusive_group(required=True)
+    who.add_argument("--user", action="append", help="repeatable")
+    who.add_argument("--all-users", action="store_true")
+    apply.add_argument("--today", type=_day, help="apply as of YYYY-MM-DD (default today)")
+    apply.set_defaults(run=cmd_recurring_apply)
+
+    rem = groups.add_parser("reminders", help="reminders").add_subparsers(dest="command", required=True)
+    due = rem.add_parser("due", parents=[common], help="reminders due in the next days (for notifiers)")
+    who = due.add_mutually_exclusive_group(required=True)
+    who.add_argument("--user", action="append", help="repeatable")
+    who.add_argument("--all-users", action="store_true")
+    due.add_argument("--days", type=int, default=7, help="window length in days (default 7)")
+    due.add_argument("--today", type=_day, help="window start YYYY-MM-DD (default today)")
+    due.set_defaults(run=cmd_reminders_due)
+    return p
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    out = sys.stdout
+    # Manager status lines are for people; keep stdout for results.
+    with contextlib.redirect_stdout(sys.stderr):
+        try:
+            code = args.run(args, out)
+        finally:
+            close_writes()
+    return code
+
+if __name__ == "__main__":
+    sys.exit(main())
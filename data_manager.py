@@ -1,7 +1,10 @@
+import atexit
+import copy
+from contextlib import contextmanager
 import json
 import os
-from datetime import datetime
-from shutil import copyfile
+import threading
+import time
 import ui
 
 DATA_DIR = "data"
@@ -17,10 +20,9 @@ FILES = {
     "recurring": os.path.join(DATA_DIR, "recurring.json"), 
 }
 
-def save_json_with_backup(path, data):
-    """Always create a timestamped backup before write."""
-    backup_file(path)
-    save_json(path, data)
+def save_json_with_backup(path, data, changes=None):
+    """Back up the file on disk, then save data over it."""
+    save_json(path, data, backup=True, changes=changes)
     ui.status_ok(f"Saved {os.path.basename(path)} with backup.")
 
 def _ensure_dirs():
@@ -29,7 +31,7 @@ def _ensure_dirs():
 
 _ensure_dirs()
 
-def load_json(path):
+def _read_json(path):
     if not os.path.exists(path):
         return []
     try:
@@ -39,27 +41,656 @@ def load_json(path):
         ui.status_warn(f"Could not decode {path}; starting empty.")
         return []
 
-def save_json(path, data):
-    with open(path, "w", encoding="utf-8") as f:
+def load_json(path):
+    flush_writes([path])
+    # Read before the file: a write in between only costs a merge later.
+    _disk_versions[path] = disk_version(path)
+    return _read_json(path)
+
+def save_json(path, data, finalize=None, backup=False, changes=None):
+    """Save data to path through the write-behind queue (see Durable writes).
+
+    finalize(data), if given, runs on the copy right before it is written
+    (e.g. to stamp it against files written earlier in the same batch);
+    backup=True records the file's previous contents in the backup store.
+    changes (RowChanges) are the edits behind this save; if another process
+    wrote the file since we read it, they are replayed onto its contents
+    instead of overwriting them (see Concurrent writers)."""
+    bump_version(path, data)
+    _commits.submit(path, data, finalize, backup, changes)
+
+def on_flush(hook):
+    """Call hook() before every full flush (flush_writes(), close_writes(),
+    exit), for state that is kept in memory and saved only then (rollups)."""
+    _flush_hooks.append(hook)
+
+def flush_writes(paths=None):
+    """Write pending saves (all, or only those for paths) now."""
+    if paths is None:
+        for hook in _flush_hooks:
+            hook()
+    _commits.flush(paths)
+
+def pending_writes():
+    """Paths with a save still queued or being written."""
+    return _commits.pending()
+
+def write_error():
+    """Last error from a background save (cleared once read)."""
+    return _commits.take_error()
+
+def close_writes():
+    """Flush everything and stop the background writer (exit path)."""
+    for hook in _flush_hooks:
+        hook()
+    _commits.close()
+
+# ---------- Durable writes ----------
+# Every file is written to <path>.tmp, fsync-ed and os.replace()d over the
+# target, so a crash leaves the old or the new file, never a truncated one.
+# PFM_DURABILITY chooses when saves reach the disk:
+#   always-fsync  every save is written and fsync-ed before returning
+#   batched       saves within PFM_COMMIT_WINDOW_MS are coalesced into one
+#                 write per file (default)
+#   on-exit       saves stay in memory until flush_writes() / Save & Exit
+# Outside always-fsync, saves are write-behind: the caller queues a copy of
+# the rows and returns, and a worker thread does the backup, serialization
+# and I/O, so menus never wait on multi-megabyte files.
+DURABILITY_MODES = ("always-fsync", "batched", "on-exit")
+DURABILITY = os.environ.get("PFM_DURABILITY", "batched").strip().lower()
+if DURABILITY not in DURABILITY_MODES:
+    ui.status_warn(f"Unknown durability mode '{DURABILITY}'; using batched.")
+    DURABILITY = "batched"
+COMMIT_WINDOW_MS = int(os.environ.get("PFM_COMMIT_WINDOW_MS", "50"))
+
+def write_json_atomic(path, data):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
         json.dump(data, f, indent=4)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+def reserve_ids(path, key, n, floor=0):
+    """First of n consecutive ids for key that no other process gets too.
+
+    path holds the highest id handed out per key; it is read and bumped
+    under its lock. floor is the highest id the caller already knows of."""
+    with locked(path):
+        counters = _read_json(path) if os.path.exists(path) else {}
+        first = max(int(counters.get(key, 0)), floor) + 1
+        counters[key] = first + n - 1
+        write_json_atomic(path, counters)
+    return first
+
+def _fsync_dir(d):
+    # Makes the rename itself durable; not every platform allows it.
+    try:
+        fd = os.open(d or ".", os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def _frozen(data):
+    # Pending saves are written from another thread, so they hold a copy.
+    # Dataset rows are flat dicts; anything else is copied deeply.
+    if isinstance(data, list):
+        return [dict(r) if isinstance(r, dict) else r for r in data]
+    return copy.deepcopy(data)
+
+class GroupCommit:
+    """Queue of dirty files (newest data per path) and the worker that
+    writes them, one batch at a time."""
+
+    def __init__(self, mode=DURABILITY, window_ms=COMMIT_WINDOW_MS):
+        self.mode = mode
+        self.window = window_ms / 1000
+        self._pending = {}                # path -> (data, finalize, version, backup, changes)
+        self._writing = ()                # paths of the batch on disk right now
+        self._cond = threading.Condition()
+        self._io = threading.Lock()       # one batch on disk at a time
+        self._deadline = None
+        self._thread = None
+        self._closed = False
+        self._error = None
+
+    def submit(self, path, data, finalize=None, backup=False, changes=None):
+        version = _versions.get(path, 0)
+        if self.mode == "always-fsync" or self._closed:
+            with self._io:
+                self._write({path: (data, finalize, version, backup, changes)})
+            return
+        with self._cond:
+            item = (_frozen(data), finalize, version, backup, changes)
+            if path in self._pending:
+                item = _coalesce(self._pending[path], item)
+            self._pending[path] = item
+            if self.mode == "batched" and self._deadline is None:
+                self._deadline = time.monotonic() + self.window
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="pfm-writer", daemon=True)
+                    self._thread.start()
+                self._cond.notify()
+
+    def pending(self):
+        with self._cond:
+            return list(dict.fromkeys([*self._writing, *self._pending]))
+
+    def report(self, message):
+        with self._cond:
+            self._error = message
+
+    def take_error(self):
+        with self._cond:
+            err, self._error = self._error, None
+            return err
+
+    def close(self):
+        self.flush()
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def flush(self, paths=None):
+        with self._io:
+            with self._cond:
+                if paths is None:
+                    batch, self._pending, self._deadline = self._pending, {}, None
+                else:
+                    batch = {p: self._pending.pop(p) for p in paths if p in self._pending}
+            if batch:
+                self._writing = tuple(batch)
+                try:
+                    self._write(batch)
+                except Exception:
+                    with self._cond:
+                        # Keep unwritten saves queued, under any newer ones.
+                        for p, item in batch.items():
+                            newer = self._pending.get(p)
+                            self._pending[p] = item if newer is None else _coalesce(item, newer)
+                    raise
+                finally:
+                    self._writing = ()
+
+    def _write(self, batch):
+        # Dataset files first, so files stamped against them (rollups) see
+        # their final state.
+        dataset_paths = set(FILES.values())
+        dirs = set()
+        for path in sorted(batch, key=lambda p: p not in dataset_paths):
+            data, finalize, version, backup, changes = batch[path]
+            with locked(path) as lock:
+                if backup and os.path.exists(path):
+                    import backup_store
+                    try:
+                        backup_store.backup(path)
+                    except Exception as e:
+                        self._error = f"Backup failed for {path}: {e}"
+                on_disk = _read_counter(lock)
+                merge = changes is not None and _changed_elsewhere(path, on_disk)
+                if merge:
+                    data = changes.apply(_read_json(path))
+                    _diverged.add(path)
+                    report_conflicts(os.path.basename(path), len(changes.conflicts))
+                if finalize is not None:
+                    finalize(data)
+                write_json_atomic(path, data)
+                _write_counter(lock, on_disk + 1)
+            if path in _diverged:
+                # The file now differs from what this process holds in memory.
+                _cache.pop(path, None)
+            else:
+                _disk_versions[path] = on_disk + 1
+                _restamp(path, version)
+            dirs.add(os.path.dirname(path))
+        for d in dirs:
+            _fsync_dir(d)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._deadline is None and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                delay = self._deadline - time.monotonic()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+            try:
+                self.flush()
+            except Exception as e:
+                # Reported by the menus (write_error); the rows stay in memory
+                # and are written again by the next save or Save & Exit.
+                self._error = f"Background save failed: {e}"
+
+def _coalesce(older, newer):
+    # Newest data; a coalesced save still backs up what was on disk before
+    # the first one and replays both saves' changes in order.
+    data, finalize, version, backup, changes = newer
+    if older[4] is None or changes is None:
+        changes = None
+    else:
+        changes = older[4].then(changes)
+    return data, finalize, version, backup or older[3], changes
+
+_commits = GroupCommit()
+_flush_hooks = []                 # see on_flush
+atexit.register(flush_writes)
+
+# ---------- Concurrent writers ----------
+# Several processes (menus, cli.py, server.py, an import) may share data/.
+# Every write holds an exclusive advisory lock on <file>.lock, which also
+# stores the file's version counter (bumped by each write). A process
+# remembers the version it last read or wrote; if the counter moved on
+# since, another process wrote the file, and the save's RowChanges are
+# replayed onto the current contents instead of overwriting them. From
+# then on the file is "diverged": this process's in-memory rows lack the
+# other writer's, so every later save merges too, and files stamped
+# against it (rollups, snapshot) are not marked fresh. A restart picks the
+# merged data up. Lock waits give up after PFM_LOCK_TIMEOUT seconds; the
+# save stays queued and is retried by the next flush.
+try:
+    import fcntl
+except ImportError:      # no advisory locks (Windows): versions are still checked
+    fcntl = None
+
+LOCK_TIMEOUT = float(os.environ.get("PFM_LOCK_TIMEOUT", "10"))
+
+# Fields identifying a row across processes (none of them is ever edited).
+ROW_KEYS = {
+    "users": ("username",),
+    "transactions": ("username", "id"),
+    "goals": ("username", "goal_name", "created_at"),
+    "budgets": ("username", "category", "month"),
+    "reminders": ("username", "title", "due_date", "created_at"),
+    "recurring": ("username", "type", "category", "frequency", "description", "created_at"),
+}
+
+def row_key(dataset, row):
+    """The fields identifying row across processes (see ROW_KEYS)."""
+    return tuple(row.get(f) for f in ROW_KEYS[dataset])
+
+_disk_versions = {}    # path -> version counter as last read or written here
+_diverged = set()      # paths another process also wrote (see above)
+
+class RowChanges:
+    """Row-level edits of one dataset, in order, replayable onto other rows."""
+
+    def __init__(self, dataset, ops=()):
+        self.dataset = dataset
+        self.fields = ROW_KEYS[dataset]
+        self.ops = list(ops)     # (op, key, row copy, pre-edit copy for updates)
+        self.conflicts = []      # keys of updates the last apply() left out
+
+    def _key(self, row):
+        return row_key(self.dataset, row)
+
+    def insert(self, rows):
+        self.ops += [("insert", self._key(r), dict(r), None) for r in rows]
+        return self
+
+    def update(self, rows, before=None):
+        """before: the rows as they were prior to the edit (same order), so
+        an edit another process also made to the row is detected."""
+        before = before or [None] * len(rows)
+        self.ops += [("update", self._key(r), dict(r), b and dict(b)) for r, b in zip(rows, before)]
+        return self
+
+    def delete(self, rows):
+        self.ops += [("delete", self._key(r), None, None) for r in rows]
+        return self
+
+    def then(self, later):
+        return RowChanges(self.dataset, self.ops + later.ops)
+
+    def apply(self, theirs):
+        """theirs with these edits applied: inserts are added (a different
+        row under the same key is kept alongside), updates are merged into
+        the row if it still exists (see merge_update; conflicting ones are
+        left out and listed in .conflicts), deletes remove it."""
+        rows = list(theirs) if isinstance(theirs, list) else []
+        self.conflicts = []
+        where = {}
+        for i, r in enumerate(rows):
+            where.setdefault(self._key(r), i)
+        for op, key, row, before in self.ops:
+            i = where.get(key)
+            if op == "delete":
+                if i is not None:
+                    rows[i] = None
+                    del where[key]
+            elif op == "update":
+                if i is not None:
+                    merged = merge_update(rows[i], row, before)
+                    if merged is None:
+                        self.conflicts.append(key)
+                    else:
+                        rows[i] = merged
+            elif i is None or rows[i] != row:
+                where.setdefault(key, len(rows))
+                rows.append(dict(row))
+        return [r for r in rows if r is not None]
+
+def merge_update(current, row, before):
+    """current with the fields the edit before -> row changed, or None if
+    another process changed one of those fields too (its value is kept
+    rather than silently overwritten). Without before, row replaces current."""
+    if before is None:
+        return dict(row)
+    mine = {f: v for f, v in row.items() if before.get(f) != v}
+    if any(current.get(f) != before.get(f) for f in mine):
+        return None
+    return {**current, **mine}
+
+def report_conflicts(where, n):
+    """Tell the menus (write_error) that n edits lost to another process's."""
+    if n:
+        _commits.report(f"{n} edit(s) to {where} were not saved: another process "
+                        f"changed the same row(s) first. Reload to see them.")
+
+def _changed_elsewhere(path, on_disk):
+    # A file this process never read counts as version 0: if it has a
+    # counter, another process created it (e.g. a new partition) meanwhile.
+    return path in _diverged or on_disk != _disk_versions.get(path, 0)
+
+@contextmanager
+def locked(path):
+    """Exclusive lock on path's lock file; yields its fd (see _read_counter)."""
+    fd = os.open(path + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if fcntl is not None:
+            deadline = time.monotonic() + LOCK_TIMEOUT
+            while True:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    if time.monotonic() >= deadline:
+                        raise TimeoutError(f"{path} is locked by another process")
+                    time.sleep(0.005)
+        yield fd
+    finally:
+        os.close(fd)     # also releases the lock
+
+def _read_counter(fd):
+    raw = os.pread(fd, 32, 0).strip()
+    return int(raw) if raw.isdigit() else 0
+
+def _write_counter(fd, n):
+    data = str(n).encode()
+    os.pwrite(fd, data, 0)
+    os.ftruncate(fd, len(data))
+
+def disk_version(path):
+    """path's version counter (0 if it was never written under a lock)."""
+    try:
+        fd = os.open(path + ".lock", os.O_RDONLY)
+    except OSError:
+        return 0
+    try:
+        return _read_counter(fd)
+    finally:
+        os.close(fd)
+
+def mark_diverged(path):
+    _diverged.add(path)
+
+def diverged(paths):
+    """True if any of paths was also written by another process."""
+    return any(p in _diverged for p in paths)
+
+def remove_json(path, changes=None):
+    """Delete path, unless another process wrote rows to it meanwhile: then
+    the changes are replayed onto those rows and the rest is kept. Returns
+    the number of rows left (0 = removed)."""
+    flush_writes([path])
+    with locked(path) as lock:
+        on_disk = _read_counter(lock)
+        if not os.path.exists(path):
+            return 0
+        if changes is not None and _changed_elsewhere(path, on_disk):
+            rows = changes.apply(_read_json(path))
+            if rows:
+                _diverged.add(path)
+                write_json_atomic(path, rows)
+                _write_counter(lock, on_disk + 1)
+                bump_version(path)
+                return len(rows)
+        os.remove(path)
+        _write_counter(lock, on_disk + 1)
+        _disk_versions[path] = on_disk + 1
+    bump_version(path)
+    return 0
+
+# ---------- Read-modify-write ----------
+# Merging keeps every process's inserts and deletes, but an update computed
+# from rows another process has changed since (adding to a goal, advancing a
+# recurring rule) would undo that process's update. Such operations run
+# under exclusive(dataset): one process at a time, re-reading the dataset
+# first if another process wrote it, and with their writes on disk before
+# the next process goes ahead.
+@contextmanager
+def exclusive(dataset):
+    """Serialize a read-modify-write of dataset across processes. Yields True
+    if another process wrote the dataset since this one last read or wrote
+    it (the caller reloads before reading); flushes the writes made inside."""
+    with locked(os.path.join(DATA_DIR, dataset + ".update")):
+        try:
+            yield get_backend().changed_elsewhere(dataset)
+        finally:
+            flush_writes()
+
+# ---------- Dataset cache ----------
+# Parsed datasets shared by every manager, keyed by path. An entry is reused
+# while the file's (mtime, size) stamp and the in-process version match; writes
+# through this module bump the version and install the data just written, so
+# readers see it without re-reading the file.
+_cache = {}      # path -> entry dict
+_versions = {}   # path -> int
+
+def file_stamp(paths):
+    out = []
+    for p in paths:
+        try:
+            st = os.stat(p)
+            out.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            out.append(None)
+    return tuple(out)
+
+def load_cached(path, loader=None, extra_paths=()):
+    """Return the parsed contents of path, parsing only when it changed.
+
+    extra_paths are files the result also depends on (e.g. a journal)."""
+    paths = (path,) + tuple(extra_paths)
+    entry = _cache.get(path)
+    version = _versions.get(path, 0)
+    if entry and entry["paths"] == paths and entry["version"] == version and entry["stamp"] == file_stamp(paths):
+        return entry["data"]
+    data = (loader or load_json)(path)
+    _cache[path] = {"paths": paths, "version": version, "stamp": file_stamp(paths), "data": data, "derived": {}}
+    return data
+
+def bump_version(path, data=None):
+    """Mark path as written. With data, it becomes the cached contents."""
+    _versions[path] = _versions.get(path, 0) + 1
+    entry = _cache.get(path)
+    if data is None:
+        _cache.pop(path, None)
+        return
+    paths = entry["paths"] if entry else (path,)
+    _cache[path] = {"paths": paths, "version": _versions[path], "stamp": file_stamp(paths), "data": data, "derived": {}}
+
+def _restamp(path, version):
+    """The file now holds what was saved at version; keep the cache entry valid."""
+    entry = _cache.get(path)
+    if entry is not None and entry["version"] == version == _versions.get(path, 0):
+        entry["stamp"] = file_stamp(entry["paths"])
+
+def cached_derive(path, key, build, loader=None, extra_paths=()):
+    """Memoize build(data) for the current cached contents of path."""
+    data = load_cached(path, loader, extra_paths)
+    derived = _cache[path]["derived"]
+    if key not in derived:
+        derived[key] = build(data)
+    return derived[key]
 
 def backup_file(path):
+    """Record the current contents of path in the backup store (see
+    backup_store.py); unchanged files cost nothing."""
     if not os.path.exists(path):
         return
-    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-    base = os.path.basename(path)
-    dest = os.path.join(BACKUP_DIR, f"{base}_{ts}.bak")
+    import backup_store
     try:
-        copyfile(path, dest)
-        ui.status_ok(f"Backup created: {os.path.basename(dest)}")
+        sha = backup_store.backup(path)
+        if sha:
+            ui.status_ok(f"Backup created: {os.path.basename(path)}@{sha[:10]}")
     except Exception as e:
         ui.status_warn(f"Backup failed for {path}: {e}")
 
+# ---------- Timings ----------
+# (label, seconds) for dataset loads and lazy imports, printed by
+# `python main.py --timings`.
+TIMINGS = []
+
+@contextmanager
+def timed(label):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        TIMINGS.append((label, time.perf_counter() - t0))
+
 def load_all():
     return {k: load_json(p) for k, p in FILES.items()}
 
 def save_all(datasets: dict):
-    for k, p in FILES.items():
-        if k in datasets:
-            backup_file(p)
-            save_json(p, datasets[k])
+    get_backend().save_all(datasets)
+    flush_writes()
+
+# ---------- Storage backends ----------
+# Managers never touch files directly; they go through the selected backend.
+# Row-level calls (insert/update/delete) receive the full in-memory list plus
+# the rows that changed, so file-based backends can rewrite while database
+# backends write only the affected rows.
+STORAGE_BACKEND = os.environ.get("PFM_STORAGE", "json").strip().lower()
+
+# Datasets that get a timestamped backup on every write (as before).
+BACKUP_ON_WRITE = {"goals", "budgets", "reminders", "recurring"}
+
+# Datasets mirrored into a binary snapshot on full saves (see snapshot.py).
+SNAPSHOT_DATASETS = {"transactions"}
+
+class JsonBackend:
+    name = "json"
+    # True when a single user's rows can be loaded (and written) on their own.
+    supports_user_load = False
+    _snapshot = None
+
+    def _cache_args(self, dataset):
+        # (loader, extra_paths) passed to the dataset cache; see load_cached.
+        return None, ()
+
+    def load(self, dataset):
+        return load_cached(FILES[dataset], *self._cache_args(dataset))
+
+    def load_for_user(self, dataset, username):
+        snap = self.open_snapshot(dataset)
+        if snap is not None:
+            return snap.user_rows(username)
+        return cached_derive(FILES[dataset], ("user", username),
+                             lambda rows: [r for r in rows if r.get("username") == username],
+                             *self._cache_args(dataset))
+
+    def load_for_user_month(self, dataset, username, ym):
+        return [r for r in self.load_for_user(dataset, username) if str(r.get("date", ""))[:7] == ym]
+
+    def storage_paths(self, dataset):
+        """Files whose stamp changes whenever the dataset is written."""
+        return (FILES[dataset],) + tuple(self._cache_args(dataset)[1])
+
+    def changed_elsewhere(self, dataset):
+        """Whether another process wrote dataset since we last read or wrote it."""
+        return any(_changed_elsewhere(p, disk_version(p)) for p in self.storage_paths(dataset))
+
+    # ---------- Binary snapshot ----------
+    def open_snapshot(self, dataset):
+        """The dataset's binary snapshot while it matches the JSON files, else None."""
+        if dataset not in SNAPSHOT_DATASETS:
+            return None
+        import snapshot
+        paths = self.storage_paths(dataset)
+        if self._snapshot is None or not self._snapshot.is_fresh(paths):
+            self._snapshot = snapshot.open_fresh(paths)
+        return self._snapshot
+
+    def write_snapshot(self, dataset, rows):
+        if dataset not in SNAPSHOT_DATASETS:
+            return False
+        import snapshot
+        self._snapshot = None
+        # The snapshot is stamped against the files, so they must be final,
+        # and must hold what we write (not so once another process merged in).
+        paths = self.storage_paths(dataset)
+        flush_writes(paths)
+        if diverged(paths):
+            return False
+        return snapshot.write(rows, paths)
+
+    def _write(self, dataset, rows, changes):
+        if dataset in BACKUP_ON_WRITE:
+            save_json_with_backup(FILES[dataset], rows, changes)
+        else:
+            save_json(FILES[dataset], rows, changes=changes)
+
+    # A full save carries no row changes: if another process wrote the file
+    # meanwhile, its contents (which include our earlier row-level saves) win.
+    def save(self, dataset, rows):
+        self._write(dataset, rows, RowChanges(dataset))
+        self.write_snapshot(dataset, rows)
+
+    def insert(self, dataset, rows, new_rows):
+        self._write(dataset, rows, RowChanges(dataset).insert(new_rows))
+
+    def update(self, dataset, rows, changed_rows, before=None):
+        """before: copies of changed_rows from prior to the edit (optional)."""
+        self._write(dataset, rows, RowChanges(dataset).update(changed_rows, before))
+
+    def delete(self, dataset, rows, removed_rows):
+        self._write(dataset, rows, RowChanges(dataset).delete(removed_rows))
+
+    def save_all(self, datasets):
+        for k, p in FILES.items():
+            if k in datasets:
+                backup_file(p)
+                save_json(p, datasets[k], changes=RowChanges(k))
+                self.write_snapshot(k, datasets[k])
+
+_backend = None
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        if STORAGE_BACKEND == "sqlite":
+            from sqlite_backend import SqliteBackend
+            _backend = SqliteBackend()
+        elif STORAGE_BACKEND == "partitioned":
+            from partition_backend import PartitionedBackend
+            _backend = PartitionedBackend()
+        elif STORAGE_BACKEND == "journal":
+            from journal_backend import JournalBackend
+            _backend = JournalBackend()
+        else:
+            if STORAGE_BACKEND != "json":
+                ui.status_warn(f"Unknown storage backend '{STORAGE_BACKEND}'; using json.")
+            _backend = JsonBackend()
+    return _backend
@@ -0,0 +1,115 @@
+# frame.py
+# Columnar view of transactions for bulk aggregation.
+# With NumPy installed, amounts are int64 cents, dates datetime64[D], and
+# username/type/category are interned integer codes, so the rollup group-by
+# is a few vectorized passes. Without NumPy the same API runs over the row dicts.
+
+from datetime import date
+from typing import Dict, List, Tuple
+
+from money import cents_of
+from utils import iso_ordinal
+
+try:
+    # Optional dependency; only speeds things up
+    import numpy as np
+except Exception:
+    np = None
+
+HAVE_NUMPY = np is not None
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+Cell = Tuple[str, str, str, str]   # (username, "YYYY-MM" or "", type, category)
+
+# ---------- Row helpers (shared by both implementations) ----------
+def month_of(date_str) -> str:
+    """'YYYY-MM' for a valid ISO date, '' otherwise."""
+    return date_str[:7] if iso_ordinal(date_str) is not None else ""
+
+def category_of(t) -> str:
+    return (t.get("category") or "Uncategorized").strip()
+
+def _intern(values, table: Dict[str, int]):
+    return [table.setdefault(v, len(table)) for v in values]
+
+# ---------- NumPy implementation ----------
+class _NumpyFrame:
+    def __init__(self, rows: List[dict]):
+        n = len(rows)
+        self.users: Dict[str, int] = {}
+        self.types: Dict[str, int] = {}
+        self.categories: Dict[str, int] = {}
+        self.amount = np.fromiter((cents_of(t) for t in rows), dtype=np.int64, count=n)
+        self.user = np.array(_intern((t.get("username") for t in rows), self.users), dtype=np.int32)
+        self.type = np.array(_intern((t.get("type") for t in rows), self.types), dtype=np.int32)
+        self.category = np.array(_intern((category_of(t) for t in rows), self.categories), dtype=np.int32)
+        # Day numbers from the shared ISO parse cache; int64 min is NaT.
+        epoch, nat = _EPOCH_ORDINAL, np.iinfo(np.int64).min
+        days = (iso_ordinal(t.get("date")) for t in rows)
+        self.date = np.fromiter((nat if o is None else o - epoch for o in days),
+                                dtype=np.int64, count=n).view("datetime64[D]")
+
+    def __len__(self):
+        return len(self.amount)
+
+    def rollup_cells(self) -> Dict[Cell, Tuple[int, int]]:
+        valid = ~np.isnat(self.date)
+        undated = np.iinfo(np.int64).min   # months before 1970 are negative
+        month = np.where(valid, self.date.astype("datetime64[M]").astype(np.int64), undated)
+        if not len(self):
+            return {}
+        month_keys, month_code = np.unique(month, return_inverse=True)
+        # Pack the four codes into one int64 so a 1-D unique does the grouping.
+        nm, nt, nc = len(month_keys), len(self.types), len(self.categories)
+        packed = ((self.user.astype(np.int64) * nm + month_code) * nt + self.type) * nc + self.category
+        uniq, inverse = np.unique(packed, return_inverse=True)
+        sums = np.bincount(inverse, weights=self.amount)
+        counts = np.bincount(inverse)
+        users, types, cats = list(self.users), list(self.types), list(self.categories)
+        out = {}
+        for key, s, n in zip(uniq.tolist(), sums.tolist(), counts.tolist()):
+            key, c = divmod(key, nc)
+            key, ty = divmod(key, nt)
+            u, mi = divmod(key, nm)
+            m = int(month_keys[mi])
+            ym = "" if m == undated else f"{1970 + m // 12:04d}-{m % 12 + 1:02d}"
+            out[(users[u], ym, types[ty], cats[c])] = (int(round(s)), int(n))
+        return out
+
+# ---------- Pure-Python fallback ----------
+class _RowFrame:
+    def __init__(self, rows: List[dict]):
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def rollup_cells(self) -> Dict[Cell, Tuple[int, int]]:
+        out = {}
+        for t in self.rows:
+            key = (t.get("username"), month_of(t.get("date")), t.get("type"), category_of(t))
+            s, n = out.get(key, (0, 0))
+            out[key] = (s + cents_of(t), n + 1)
+        return out
+
+TransactionFrame = _NumpyFrame if HAVE_NUMPY else _RowFrame
+
+# ---------- Series helpers ----------
+def linear_trend(values: List[float]) -> Tuple[float, float]:
+    """Least-squares (slope, intercept) of values against 0..n-1."""
+    n = len(values)
+    if HAVE_NUMPY and n >= 2:
+        xs = np.arange(n, dtype=float)
+        ys = np.asarray(values, dtype=float)
+        x_mean, y_mean = xs.mean(), ys.mean()
+        den = float(((xs - x_mean) ** 2).sum()) or 1
+        slope = float(((xs - x_mean) * (ys - y_mean)).sum()) / den
+        return slope, float(y_mean - slope * x_mean)
+    xs = list(range(n))
+    x_mean = sum(xs) / n
+    y_mean = sum(values) / n
+    num = sum((x - x_mean) * (y - y_mean) for x, y in zip(xs, values))
+    den = sum((x - x_mean) ** 2 for x in xs) or 1
+    slope = num / den
+    return slope, y_mean - slope * x_mean
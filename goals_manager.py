@@ -1,74 +1,96 @@
 # goals_manager.py
 
-from typing import List
-from decimal import Decimal
-from data_manager import load_json, save_json_with_backup, FILES
-from utils import get_nonempty_input, get_number, today_iso, to_decimal, fmt_money
+from typing import List, Optional
+from data_manager import get_backend, timed
+from utils import get_nonempty_input, get_amount, fmt_money, remove_identical
+from money import money_of, migrate_rows
 import user_manager as um
+import services as svc
 import ui
 
-GOALS_PATH = FILES["goals"]
-_goals: List[dict] = load_json(GOALS_PATH)
+_backend = get_backend()
+_goals: Optional[List[dict]] = None   # loaded on first use, see get_goals_data
 
-def _user_goals(username: str) -> List[dict]:
-    return [g for g in _goals if g.get("username") == username]
+def reload_goals():
+    """Forget the loaded goals; the next access reads them again."""
+    global _goals
+    _goals = None
 
-def save_goals():
-    save_json_with_backup(GOALS_PATH, _goals)
+def get_goals_data() -> List[dict]:
+    global _goals
+    if _goals is None:
+        with timed("load goals"):
+            _goals = _backend.load("goals")
+            migrate_rows("goals", _goals)
+    return _goals
 
-def add_goal():
+# ---------- Data ----------
+def user_goals(username: str) -> List[dict]:
+    return [g for g in get_goals_data() if g.get("username") == username]
+
+def insert_goal(g: dict):
+    goals = get_goals_data()
+    goals.append(g)
+    _backend.insert("goals", goals, [g])
+
+def update_goal(g: dict, before: Optional[dict] = None):
+    """before: g as it was prior to the edit (see data_manager.merge_update)."""
+    _backend.update("goals", get_goals_data(), [g], before and [before])
+
+def remove_goal(g: dict):
+    goals = get_goals_data()
+    remove_identical(goals, g)
+    _backend.delete("goals", goals, [g])
+
+# ---------- Menu adapters (see services.GoalService) ----------
+def _service():
     if not um.is_logged_in():
         ui.status_warn("Please log in first.")
+        return None
+    return svc.GoalService(svc.Session.for_user(um.get_current_user()))
+
+def add_goal():
+    s = _service()
+    if s is None:
         return
-    cu = um.get_current_user()
     ui.section("Add Savings Goal")
     name = get_nonempty_input("Goal name: ")
-    target = get_number("Target amount: ")
+    target = get_amount("Target amount: ")
     deadline = input("Deadline (YYYY-MM-DD, optional): ").strip()
-
-    g = {
-        "username": cu["username"],
-        "goal_name": name,
-        "target_amount": float(target),
-        "saved_so_far": 0.0,
-        "deadline": deadline or "",
-        "created_at": today_iso(),
-    }
-    _goals.append(g)
-    save_goals()
+    try:
+        s.add(name, target, deadline)
+    except svc.ServiceError as e:
+        ui.status_err(str(e))
+        return
     ui.status_ok("Goal added.")
 
 def update_progress():
-    if not um.is_logged_in():
-        ui.status_warn("Please log in first.")
+    s = _service()
+    if s is None:
         return
-    cu = um.get_current_user()
-    goals = _user_goals(cu["username"])
+    cur = s.session.currency
+    goals = s.list()
     if not goals:
         ui.status_warn("No goals yet.")
         return
 
     ui.section("Update Goal Progress")
     for i, g in enumerate(goals, start=1):
-        print(f"{i}. {g['goal_name']} — target {fmt_money(g['target_amount'], cu['currency'])}, saved {fmt_money(g['saved_so_far'], cu['currency'])}")
-    try:
-        idx = int(input("Select goal #: ").strip())
-        g = goals[idx-1]
-    except Exception:
-        ui.status_err("Invalid selection.")
+        print(f"{i}. {g['goal_name']} — target {fmt_money(money_of(g, 'target_cents'), cur)}, saved {fmt_money(money_of(g, 'saved_cents'), cur)}")
+    idx = ui.select("Select goal #: ", len(goals))
+    if idx is None:
         return
 
-    amt = get_number("Add amount to saved: ", allow_zero=False)
-    g["saved_so_far"] = float(to_decimal(g["saved_so_far"]) + amt)
-    save_goals()
+    amt = get_amount("Add amount to saved: ", allow_zero=False)
+    s.contribute(idx, amt)
     ui.status_ok("Progress updated.")
 
 def view_goals():
-    if not um.is_logged_in():
-        ui.status_warn("Please log in first.")
+    s = _service()
+    if s is None:
         return
-    cu = um.get_current_user()
-    goals = _user_goals(cu["username"])
+    cur = s.session.currency
+    goals = s.list()
     ui.section("Savings Goals")
     if not goals:
         ui.status_warn("No goals yet.")
@@ -76,36 +98,30 @@ def view_goals():
 
     rows = []
     for g in goals:
-        target = to_decimal(g["target_amount"])
-        saved  = to_decimal(g["saved_so_far"])
-        pct = (saved / target * 100) if target > 0 else Decimal("0")
-        bar = _bar(int(pct))
-        rows.append((g["goal_name"], f"{bar} {pct:.0f}%", fmt_money(saved, cu["currency"]), fmt_money(target, cu["currency"]), g.get("deadline","")))
+        target = money_of(g, "target_cents")
+        saved  = money_of(g, "saved_cents")
+        bar = _bar(int(g["pct"]))
+        rows.append((g["goal_name"], f"{bar} {g['pct']:.0f}%", fmt_money(saved, cur), fmt_money(target, cur), g.get("deadline","")))
     ui.table(rows, headers=("GOAL","PROGRESS","SAVED","TARGET","DEADLINE"), align=["l","l","r","r","l"])
 
 def delete_goal():
-    if not um.is_logged_in():
-        ui.status_warn("Please log in first.")
+    s = _service()
+    if s is None:
         return
-    cu = um.get_current_user()
-    goals = _user_goals(cu["username"])
+    goals = s.list()
     if not goals:
         ui.status_warn("No goals to delete.")
         return
     ui.section("Delete Goal")
     for i, g in enumerate(goals, start=1):
         print(f"{i}. {g['goal_name']}")
-    try:
-        idx = int(input("Select goal #: ").strip())
-        g = goals[idx-1]
-    except Exception:
-        ui.status_err("Invalid selection.")
+    idx = ui.select("Select goal #: ", len(goals))
+    if idx is None:
         return
 
-    confirm = input(f"Delete '{g['goal_name']}'? (y/n): ").lower()
+    confirm = input(f"Delete '{goals[idx-1]['goal_name']}'? (y/n): ").lower()
     if confirm == "y":
-        _goals.remove(g)
-        save_goals()
+        s.delete(idx)
         ui.status_ok("Goal deleted.")
     else:
         ui.status_warn("Deletion cancelled.")
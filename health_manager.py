@@ -1,60 +1,39 @@
 # health_manager.py
 
-from decimal import Decimal
-from collections import defaultdict
-from datetime import date
-from typing import List, Dict
+import math
 import user_manager as um
-from data_manager import load_json, FILES
-from utils import to_decimal, fmt_money
+from utils import fmt_money
+import rollups
 import ui
 
-TXNS_PATH = FILES["transactions"]
-
-def _load_user_txns():
-    from data_manager import load_json
-    if not um.is_logged_in():
-        return []
-    cu = um.get_current_user()
-    return [t for t in load_json(TXNS_PATH) if t.get("username")==cu["username"]]
-
 def health_score():
     if not um.is_logged_in():
         ui.status_warn("Please log in first.")
         return
     cu = um.get_current_user()
-    txns = _load_user_txns()
-    if not txns:
+    if not rollups.count(cu["username"]):
         ui.status_warn("No data for scoring.")
         return
 
     # last 3 months income/expense
-    buckets = defaultdict(lambda: {"inc":Decimal("0"),"exp":Decimal("0")})
-    for t in txns:
-        y,m = t["date"][:4], t["date"][5:7]
-        key = f"{y}-{m}"
-        amt = to_decimal(t["amount"])
-        if t["type"]=="income":
-            buckets[key]["inc"] += amt
-        elif t["type"]=="expense":
-            buckets[key]["exp"] += amt
+    buckets = {ym: {"inc": inc, "exp": exp} for ym, (inc, exp, _) in rollups.monthly_totals(cu["username"]).items()}
     months = sorted(buckets.keys())[-3:]
     if not months:
         ui.status_warn("Not enough data.")
         return
 
-    inc = sum((buckets[m]["inc"] for m in months), Decimal("0")) / max(1,len(months))
-    exp = sum((buckets[m]["exp"] for m in months), Decimal("0")) / max(1,len(months))
+    inc = sum(buckets[m]["inc"] for m in months) / max(1,len(months))
+    exp = sum(buckets[m]["exp"] for m in months) / max(1,len(months))
     net = inc - exp
-    savings_rate = (net/inc*100) if inc > 0 else Decimal("0")
+    savings_rate = (net/inc*100) if inc > 0 else 0.0
 
-    # volatility proxy: expense std / mean (rough)
-    vals = [buckets[m]["exp"] for m in months]
-    mean = sum(vals, Decimal("0")) / max(1,len(vals))
+    # volatility proxy: expense std / mean (rough), in cents
+    vals = [buckets[m]["exp"].cents for m in months]
+    mean = sum(vals) / max(1,len(vals))
     var = sum((v-mean)**2 for v in vals) / max(1,len(vals))
     # normalize score: higher savings rate and lower volatility -> higher score
-    rate_score = min(100, max(0, float(savings_rate)))          # 0..100
-    vol_penalty = min(40, 40 * float(var.sqrt() / (mean + Decimal("1"))))  # cap
+    rate_score = min(100, max(0, savings_rate))          # 0..100
+    vol_penalty = min(40, 40 * math.sqrt(var) / (mean + 100))  # cap
 
     score = max(0, min(100, rate_score - vol_penalty))
 
@@ -1,10 +1,20 @@
 # import_export.py
 
 import csv
+import gzip
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from typing import List
-from data_manager import FILES, save_json_with_backup, load_json
+from urllib.parse import quote
+from data_manager import DATA_DIR, flush_writes, load_json
+from money import Money, money_of
+from utils import iso_ordinal
 import user_manager as um
 import transaction_manager as tm
+import query
 import ui
 
 def export_users_csv(path="data/users.csv"):
@@ -16,37 +26,265 @@ def export_users_csv(path="data/users.csv"):
             w.writerow({"username":u.get("username",""),"currency":u.get("currency",""),"created_at":u.get("created_at","")})
     ui.status_ok(f"Users exported -> {path}")
 
-def export_transactions_csv(path="data/transactions_all.csv", username: str | None = None):
-    txns = tm.get_transactions_data()
-    with open(path, "w", newline="", encoding="utf-8") as f:
-        w = csv.DictWriter(f, fieldnames=["id","username","type","amount","category","date","description","created_at","updated_at"])
+TXN_FIELDS = ["id","username","type","amount","category","date","description","created_at","updated_at"]
+
+# ---------- Export ----------
+def _export_rows(username=None, start=None, end=None) -> List[dict]:
+    """Rows to export. A user's rows come from the per-user index and a date
+    range from the query engine's date index, so neither scans everyone."""
+    if start is None and end is None:
+        return tm.get_user_transactions(username) if username else tm.get_transactions_data()
+    lo = iso_ordinal(start) if start else None
+    hi = iso_ordinal(end) if end else None
+    users = [username] if username else tm.usernames()
+    rows = []
+    for u in users:
+        rows.extend(query.index_for(u).search(start=lo, end=hi))
+    return rows
+
+def _write_csv(path, rows, compress=False) -> str:
+    if compress and not path.endswith(".gz"):
+        path += ".gz"
+    if path.endswith(".gz"):
+        f = gzip.open(path, "wt", newline="", encoding="utf-8")
+    else:
+        f = open(path, "w", newline="", encoding="utf-8")
+    with f:
+        w = csv.DictWriter(f, fieldnames=TXN_FIELDS)
         w.writeheader()
-        for t in txns:
-            if username and t.get("username") != username:
-                continue
-            w.writerow(t)
+        for t in rows:
+            # CSV keeps a decimal "amount" column; cents stay internal.
+            row = {k: v for k, v in t.items() if k != "amount_cents"}
+            row["amount"] = str(money_of(t))
+            w.writerow(row)
+    return path
+
+def export_transactions_csv(path="data/transactions_all.csv", username: str | None = None,
+                            start: str | None = None, end: str | None = None, compress=False):
+    path = _write_csv(path, _export_rows(username, start, end), compress)
     ui.status_ok(f"Transactions exported -> {path}")
 
-def import_transactions_csv(path):
-    """Append transactions from CSV into current dataset (expects same headers)."""
-    rows = []
-    with open(path, "r", newline="", encoding="utf-8") as f:
-        r = csv.DictReader(f)
-        for row in r:
-            rows.append(row)
-    # normalize and append
-    data = tm.get_transactions_data()
-    count = 0
-    for t in rows:
-        try:
-            t["id"] = int(t["id"])
-            t["amount"] = float(t["amount"])
-            data.append(t)
-            count += 1
-        except Exception:
-            pass
-    tm.save_transactions()
-    ui.status_ok(f"Imported {count} transaction(s) from {path}")
+def export_all_users(out_dir=os.path.join(DATA_DIR, "exports"), start=None, end=None,
+                     compress=False, workers=None):
+    """One CSV per user, written concurrently. Rows are gathered on this
+    thread (loading may touch shared state); the pool only formats,
+    compresses and writes, so the total work is proportional to the data."""
+    os.makedirs(out_dir, exist_ok=True)
+    jobs = []
+    names = {u.get("username") for u in um.get_users_data()} | set(tm.usernames())
+    for name in sorted(names, key=str):
+        dest = os.path.join(out_dir, f"transactions_{quote(str(name), safe='')}.csv")
+        jobs.append((dest, list(_export_rows(name, start, end))))
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers or min(8, os.cpu_count() or 1)) as pool:
+        list(pool.map(lambda job: _write_csv(job[0], job[1], compress), jobs))
+    n_rows = sum(len(rows) for _, rows in jobs)
+    ui.status_ok(f"Exported {n_rows} transaction(s) for {len(jobs)} user(s) -> {out_dir} "
+                 f"in {time.perf_counter() - started:.2f}s")
+
+def _ask_export_options():
+    start = input("Start date (YYYY-MM-DD, blank = all): ").strip() or None
+    end = input("End date (YYYY-MM-DD, blank = all): ").strip() or None
+    for d in (start, end):
+        if d and iso_ordinal(d) is None:
+            ui.status_err("Invalid date; use YYYY-MM-DD.")
+            return None
+    compress = input("Gzip the output? (y/n) [n]: ").strip().lower() == "y"
+    return start, end, compress
+
+# ---------- Streaming import ----------
+# The CSV is read as bytes and fed line by line to csv.reader, so the byte
+# offset after each record is known exactly. Rows are validated and committed
+# CHUNK_ROWS at a time through transaction_manager; after each commit a
+# checkpoint (<csv>.import.json) records the offset, so an interrupted import
+# resumes at the first uncommitted chunk. Rejected rows go to <csv>.rejected.csv.
+CHUNK_ROWS = 5000
+
+def _checkpoint_path(path):
+    return path + ".import.json"
+
+def _read_checkpoint(path):
+    cp = load_json(_checkpoint_path(path))
+    if not isinstance(cp, dict):
+        return None
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    # Only valid for the exact file it was written for.
+    if cp.get("size") != st.st_size or cp.get("mtime_ns") != st.st_mtime_ns:
+        return None
+    return cp
+
+def _write_checkpoint(path, offset, header, stats):
+    st = os.stat(path)
+    tmp = _checkpoint_path(path) + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"size": st.st_size, "mtime_ns": st.st_mtime_ns, "offset": offset,
+                   "header": header, "stats": stats}, f)
+    os.replace(tmp, _checkpoint_path(path))
+
+class _ByteLines:
+    """Iterate decoded lines of a binary file, counting the bytes consumed.
+
+    A line that is not UTF-8 is decoded with replacement characters and
+    kept in .bad until the reader takes it, so its record can be rejected."""
+    def __init__(self, f, offset=0):
+        self.f = f
+        self.offset = offset
+        self.bad = None
+
+    def __iter__(self):
+        for raw in self.f:
+            self.offset += len(raw)
+            try:
+                yield raw.decode("utf-8")
+            except UnicodeDecodeError:
+                self.bad = self.bad or raw
+                yield raw.decode("utf-8", "replace")
+
+def normalize_record(rec, usernames, now):
+    """Validated transaction dict for one CSV record.
+
+    Raises ValueError(reason, value) for a rejected record."""
+    username = (rec.get("username") or "").strip()
+    if username not in usernames:
+        raise ValueError("unknown username", username)
+    try:
+        tid = int(str(rec.get("id") or "").strip())
+    except ValueError:
+        raise ValueError("bad id", rec.get("id"))
+    t_type = (rec.get("type") or "").strip().lower()
+    if t_type not in ("income", "expense"):
+        raise ValueError("bad type", rec.get("type"))
+    try:
+        cents = Money.parse(rec.get("amount")).cents
+    except ValueError:
+        raise ValueError("bad amount", rec.get("amount"))
+    date_str = (rec.get("date") or "").strip()
+    if iso_ordinal(date_str) is None:
+        raise ValueError("malformed date", rec.get("date"))
+    return {
+        "id": tid,
+        "username": username,
+        "type": t_type,
+        "amount_cents": cents,
+        "category": (rec.get("category") or "").strip() or "Uncategorized",
+        "date": date_str,
+        "description": (rec.get("description") or "").strip(),
+        "created_at": (rec.get("created_at") or "").strip() or now,
+        "updated_at": (rec.get("updated_at") or "").strip() or now,
+    }
+
+def _already_imported(t):
+    # Guards the chunk that may have been committed just before a crash.
+    cur = tm.find_transaction(t["username"], t["id"])
+    return cur is not None and all(cur.get(k) == t[k] for k in ("type", "amount_cents", "date", "description"))
+
+def _unique_ids(chunk, bad, stats):
+    """The chunk's transactions whose (username, id) is not taken yet; the
+    others are moved to bad as duplicate ids."""
+    rows, seen = [], set()
+    for t, rec in chunk:
+        key = (t["username"], t["id"])
+        if key in seen or tm.find_transaction(*key) is not None:
+            stats["reasons"]["duplicate id"] = stats["reasons"].get("duplicate id", 0) + 1
+            bad.append([f"duplicate id: {t['id']!r}"] + rec)
+            continue
+        seen.add(key)
+        rows.append(t)
+    return rows
+
+def import_transactions_csv(path, chunk_size=CHUNK_ROWS, resume=None):
+    """Stream transactions from CSV (same headers as the export) into the store.
+
+    resume: True/False to pick up or ignore a checkpoint; None asks.
+    Returns the import stats (None if nothing was read)."""
+    if not os.path.exists(path):
+        ui.status_err(f"No such file: {path}")
+        return
+    cp = _read_checkpoint(path)
+    if cp and resume is None:
+        done = cp["stats"]["imported"] + cp["stats"]["rejected"]
+        resume = input(f"Resume the interrupted import after {done} row(s)? (y/n): ").strip().lower() == "y"
+    if not resume:
+        cp = None
+
+    usernames = {u.get("username") for u in um.get_users_data()}
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    total_bytes = os.path.getsize(path) or 1
+    stats = dict(cp["stats"]) if cp else {"imported": 0, "rejected": 0, "reasons": {}}
+    reject_path = os.path.splitext(path)[0] + ".rejected.csv"
+    started = time.perf_counter()
+    rows_this_run = 0
+
+    with open(path, "rb") as f:
+        if cp:
+            f.seek(cp["offset"])
+            lines = _ByteLines(f, cp["offset"])
+            reader = csv.reader(lines)
+            header = cp["header"]
+        else:
+            lines = _ByteLines(f)
+            reader = csv.reader(lines)
+            header = [h.lstrip("\ufeff").strip() for h in next(reader, [])]
+            lines.bad = None
+            if not header:
+                ui.status_warn("CSV is empty.")
+                return
+        with open(reject_path, "a" if cp else "w", newline="", encoding="utf-8") as rf:
+            rejects = csv.writer(rf)
+            if not cp:
+                rejects.writerow(["reason"] + header)
+            check_dupes = cp is not None
+            while True:
+                chunk, bad = [], []
+                for rec in reader:
+                    undecodable, lines.bad = lines.bad, None
+                    if not any(rec):
+                        continue
+                    try:
+                        if undecodable is not None:
+                            raise ValueError("bad encoding", undecodable)
+                        chunk.append((normalize_record(dict(zip(header, rec)), usernames, now), rec))
+                    except ValueError as e:
+                        reason, value = e.args
+                        stats["reasons"][reason] = stats["reasons"].get(reason, 0) + 1
+                        bad.append([f"{reason}: {value!r}"] + rec)
+                    if len(chunk) + len(bad) >= chunk_size:
+                        break
+                if not chunk and not bad:
+                    break
+                if check_dupes:
+                    fresh = [(t, rec) for t, rec in chunk if not _already_imported(t)]
+                    stats["imported"] += len(chunk) - len(fresh)
+                    chunk, check_dupes = fresh, False
+                chunk = _unique_ids(chunk, bad, stats)
+                tm.reserve_given_ids(chunk)
+                tm.insert_transactions(chunk)
+                rejects.writerows(bad)
+                rf.flush()
+                stats["imported"] += len(chunk)
+                stats["rejected"] += len(bad)
+                rows_this_run += len(chunk) + len(bad)
+                # The rows must be on disk before a checkpoint that skips them.
+                flush_writes()
+                _write_checkpoint(path, lines.offset, header, stats)
+
+                elapsed = max(time.perf_counter() - started, 1e-9)
+                print(f"  {100 * lines.offset / total_bytes:5.1f}%  "
+                      f"{stats['imported']} imported, {stats['rejected']} rejected  "
+                      f"({rows_this_run / elapsed:,.0f} rows/s)")
+
+    if os.path.exists(_checkpoint_path(path)):
+        os.remove(_checkpoint_path(path))
+    ui.status_ok(f"Imported {stats['imported']} transaction(s) from {path}")
+    if stats["rejected"]:
+        summary = ", ".join(f"{n} {r}" for r, n in sorted(stats["reasons"].items(), key=lambda kv: -kv[1]))
+        ui.status_warn(f"Rejected {stats['rejected']} row(s) ({summary}); see {reject_path}")
+    else:
+        os.remove(reject_path)
+    return stats
 
 def import_export_menu():
     while True:
@@ -55,22 +293,32 @@ def import_export_menu():
         print(f"{ui.FG['blue']}2.{ui.RESET} Export All Transactions CSV")
         print(f"{ui.FG['blue']}3.{ui.RESET} Export Current User Transactions CSV")
         print(f"{ui.FG['blue']}4.{ui.RESET} Import Transactions from CSV")
-        print(f"{ui.FG['blue']}5.{ui.RESET} Back")
+        print(f"{ui.FG['blue']}5.{ui.RESET} Export Every User (one file each)")
+        print(f"{ui.FG['blue']}6.{ui.RESET} Back")
         ui.line()
-        ch = input("Choose (1-5): ").strip()
+        ch = input("Choose (1-6): ").strip()
         if ch == "1":
             export_users_csv()
         elif ch == "2":
-            export_transactions_csv()
+            opts = _ask_export_options()
+            if opts:
+                export_transactions_csv(start=opts[0], end=opts[1], compress=opts[2])
         elif ch == "3":
             if um.is_logged_in():
-                export_transactions_csv(f"data/transactions_{um.get_current_user()['username']}.csv", um.get_current_user()["username"])
+                opts = _ask_export_options()
+                if opts:
+                    name = um.get_current_user()["username"]
+                    export_transactions_csv(f"data/transactions_{name}.csv", name, *opts)
             else:
                 ui.status_warn("Please log in first.")
         elif ch == "4":
             path = input("CSV path: ").strip()
             import_transactions_csv(path)
         elif ch == "5":
+            opts = _ask_export_options()
+            if opts:
+                export_all_users(start=opts[0], end=opts[1], compress=opts[2])
+        elif ch == "6":
             break
         else:
             ui.status_warn("Invalid choice.")
@@ -0,0 +1,175 @@
+# journal_backend.py
+# JSON snapshot + append-only journal for transactions (PFM_STORAGE=journal).
+# Each mutation appends one compact line to transactions.log; loading replays
+# the log over the last snapshot, and compaction folds it back in.
+
+import json
+import os
+
+from data_manager import (DATA_DIR, DURABILITY, FILES, JsonBackend, RowChanges, load_json, save_json,
+                          flush_writes, backup_file, bump_version, locked, mark_diverged, merge_update)
+from utils import remove_identical
+import ui
+
+JOURNAL_PATH = os.path.join(DATA_DIR, "transactions.log")
+JOURNALED = {"transactions"}
+
+# Fold the log into the snapshot once it grows past this many records.
+COMPACT_EVERY = 1000
+
+def _key(row):
+    return [row.get("username"), row.get("id")]
+
+def replay(rows, path=JOURNAL_PATH):
+    """Apply journal records in order on top of snapshot rows (in place)."""
+    if not os.path.exists(path):
+        return 0
+    by_key = {}
+    for r in rows:
+        by_key.setdefault(tuple(_key(r)), r)
+    applied = 0
+    with open(path, "r", encoding="utf-8") as f:
+        for lineno, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rec = json.loads(line)
+            except json.JSONDecodeError:
+                # A torn final write is the only expected damage; stop there.
+                ui.status_warn(f"Journal truncated at line {lineno}; ignoring the rest.")
+                break
+            op = rec.get("op")
+            if op == "insert":
+                row = rec["row"]
+                rows.append(row)
+                by_key.setdefault(tuple(_key(row)), row)
+            elif op == "update":
+                row = by_key.get(tuple(rec["key"]))
+                # An edit made over a row another process had already changed
+                # the same fields of is dropped: the earlier record wins.
+                merged = row is not None and merge_update(row, rec["row"], rec.get("before"))
+                if merged:
+                    row.clear()
+                    row.update(merged)
+            elif op == "delete":
+                row = by_key.pop(tuple(rec["key"]), None)
+                if row is not None:
+                    remove_identical(rows, row)
+            applied += 1
+    return applied
+
+class JournalBackend(JsonBackend):
+    name = "journal"
+
+    def __init__(self, path=JOURNAL_PATH):
+        self.path = path
+        self._pending = 0
+        self._log = None
+        self._log_size = None     # log size after our last append or load
+
+    def _size(self):
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+    def _append(self, records):
+        # Other processes append to (and compact) the same log; the lock keeps
+        # records whole, and a size we did not leave means they wrote too.
+        with locked(self.path):
+            if self._log_size is not None and self._size() != self._log_size:
+                mark_diverged(self.path)
+            if self._log is None:
+                self._log = open(self.path, "a", encoding="utf-8")
+            for rec in records:
+                self._log.write(json.dumps(rec, separators=(",", ":")) + "\n")
+            self._log.flush()
+            if DURABILITY == "always-fsync":
+                os.fsync(self._log.fileno())
+            self._log_size = self._size()
+        self._pending += len(records)
+
+    def _maybe_compact(self, rows):
+        if self._pending >= COMPACT_EVERY:
+            self.compact(rows)
+        else:
+            # The in-memory rows are now the current state of snapshot + log.
+            bump_version(FILES["transactions"], rows)
+
+    def compact(self, rows):
+        """Write a fresh snapshot and truncate the journal."""
+        snapshot_path = FILES["transactions"]
+        with locked(self.path):
+            if self._log_size is not None and self._size() != self._log_size:
+                # Another process appended or compacted: fold what is on disk
+                # (which holds our records too) rather than our rows.
+                mark_diverged(self.path)
+                rows = load_json(snapshot_path)
+                replay(rows, self.path)
+            save_json(snapshot_path, rows, changes=RowChanges("transactions"))
+            flush_writes([snapshot_path])   # durable before the log goes
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+            open(self.path, "w", encoding="utf-8").close()
+            self._log_size = 0
+        self._pending = 0
+        bump_version(snapshot_path, rows)
+        self.write_snapshot("transactions", rows)
+
+    def _load_replayed(self, path):
+        with locked(self.path):
+            rows = load_json(path)
+            self._pending = replay(rows, self.path)
+            self._log_size = self._size()
+        return rows
+
+    # ---------- Backend API ----------
+    def _cache_args(self, dataset):
+        if dataset in JOURNALED:
+            return self._load_replayed, (self.path,)
+        return super()._cache_args(dataset)
+
+    def changed_elsewhere(self, dataset):
+        # Appends leave the lock counter alone; the log size tells them apart.
+        if dataset in JOURNALED and self._log_size is not None and self._size() != self._log_size:
+            return True
+        return super().changed_elsewhere(dataset)
+
+    def save(self, dataset, rows):
+        if dataset in JOURNALED:
+            self.compact(rows)
+        else:
+            super().save(dataset, rows)
+
+    def insert(self, dataset, rows, new_rows):
+        if dataset not in JOURNALED:
+            return super().insert(dataset, rows, new_rows)
+        self._append([{"op": "insert", "row": r} for r in new_rows])
+        self._maybe_compact(rows)
+
+    def update(self, dataset, rows, changed_rows, before=None):
+        if dataset not in JOURNALED:
+            return super().update(dataset, rows, changed_rows, before)
+        self._append([{"op": "update", "key": _key(r), "row": r, **({"before": b} if b else {})}
+                      for r, b in zip(changed_rows, before or [None] * len(changed_rows))])
+        self._maybe_compact(rows)
+
+    def delete(self, dataset, rows, removed_rows):
+        if dataset not in JOURNALED:
+            return super().delete(dataset, rows, removed_rows)
+        self._append([{"op": "delete", "key": _key(r)} for r in removed_rows])
+        self._maybe_compact(rows)
+
+    def save_all(self, datasets):
+        # "Save & Exit": back up the previous snapshot, then fold the journal in.
+        for k, p in FILES.items():
+            if k not in datasets:
+                continue
+            backup_file(p)
+            if k in JOURNALED:
+                backup_file(self.path)
+                self.compact(datasets[k])
+            else:
+                save_json(p, datasets[k], changes=RowChanges(k))
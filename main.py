@@ -1,22 +1,60 @@
 # main.py
 # Orchestrates menus and one-shot save-all on exit (with backups).
 
+import importlib
+import os
+import sys
+import time
+
+_T0 = time.perf_counter()
+
 import user_manager as um
-import transaction_manager as tm
-import report_manager as rm
-from data_manager import save_all, FILES, load_json
+from data_manager import TIMINGS, timed, save_all, close_writes, pending_writes, write_error
 import ui
 
-# NEW imports
-import goals_manager as gm
-import budgets_manager as bm
-import recurring_manager as rc
-import reminders_manager as rem
-import import_export as ie
-import health_manager as hm
-import analytics_manager as an
+_STARTUP_IMPORTS = time.perf_counter() - _T0
+
+# Menu modules are imported on first selection (each brings its own
+# dependencies, e.g. NumPy through frame.py), and datasets load on first
+# access through the managers' get_*_data accessors, so the menu appears
+# without parsing any data file.
+def _module(name):
+    mod = sys.modules.get(name)
+    if mod is None:
+        with timed(f"import {name}"):
+            mod = importlib.import_module(name)
+    return mod
+
+# dataset -> (module, accessor, cache attribute); a dataset is saved on exit
+# only if its cache was loaded (services.py imports every manager, so an
+# imported module alone no longer means its data was used).
+DATASETS = {
+    "users": ("user_manager", "get_users_data", "_users"),
+    "transactions": ("transaction_manager", "get_transactions_data", "_loaded"),
+    "goals": ("goals_manager", "get_goals_data", "_goals"),
+    "budgets": ("budgets_manager", "get_budgets_data", "_budgets"),
+    "reminders": ("reminders_manager", "get_reminders_data", "_reminders"),
+    "recurring": ("recurring_manager", "get_recurring_data", "_recurring"),
+}
+
+def _loaded_datasets():
+    out = {}
+    for ds, (name, getter, cache) in DATASETS.items():
+        mod = sys.modules.get(name)
+        if mod is not None and getattr(mod, cache) not in (None, False):
+            out[ds] = getattr(mod, getter)()
+    return out
+
+def print_timings(title, first_menu=None):
+    ui.section(title)
+    rows = [("startup imports", _STARTUP_IMPORTS)] + TIMINGS
+    if first_menu is not None:
+        rows.append(("time to first menu", first_menu))
+    ui.table([[label, f"{secs * 1000:.1f} ms"] for label, secs in rows],
+             headers=["Step", "Time"], align=["l", "r"])
 
-def main_menu():
+def main_menu(show_timings=False):
+    first = True
     while True:
         ui.clear()
         ui.banner("Personal Finance Manager", f"{ui.stamp()}")
@@ -25,6 +63,13 @@ def main_menu():
             print(f"{ui.BOLD}{ui.FG['green']}Logged in as:{ui.RESET} {cu['username']} ({cu['currency']})")
         else:
             print(f"{ui.FG['grey']}Not logged in{ui.RESET}")
+        pending = pending_writes()
+        if pending:
+            names = ", ".join(os.path.basename(p) for p in pending)
+            print(f"{ui.FG['grey']}Saving in background: {names}{ui.RESET}")
+        err = write_error()
+        if err:
+            ui.status_err(err)
 
         ui.menu("User", [("1","Register"),("2","Login"),("3","Logout")])
         ui.menu("Transactions", [("4","Manage Transactions")])
@@ -40,33 +85,31 @@ def main_menu():
         ui.menu("Help", [("13","Help")])
         print(f"{ui.FG['blue']}14.{ui.RESET} Save & Exit")
         ui.line()
+        if first and show_timings:
+            print_timings("Startup timings", time.perf_counter() - _T0)
+        first = False
 
         choice = input("Enter your choice (1-14): ").strip()
 
         if choice == "1": um.register_user()
         elif choice == "2": um.login_user()
         elif choice == "3": um.logout_user()
-        elif choice == "4": tm.transaction_menu()
-        elif choice == "5": rm.reports_menu()
-        elif choice == "6": gm.goals_menu()
-        elif choice == "7": bm.budgets_menu()
-        elif choice == "8": rc.recurring_menu()
-        elif choice == "9": rem.reminders_menu()
-        elif choice == "10": ie.import_export_menu()
-        elif choice == "11": hm.health_menu()
-        elif choice == "12": an.analytics_menu()
+        elif choice == "4": _module("transaction_manager").transaction_menu()
+        elif choice == "5": _module("report_manager").reports_menu()
+        elif choice == "6": _module("goals_manager").goals_menu()
+        elif choice == "7": _module("budgets_manager").budgets_menu()
+        elif choice == "8": _module("recurring_manager").recurring_menu()
+        elif choice == "9": _module("reminders_manager").reminders_menu()
+        elif choice == "10": _module("import_export").import_export_menu()
+        elif choice == "11": _module("health_manager").health_menu()
+        elif choice == "12": _module("analytics_manager").analytics_menu()
         elif choice == "13":show_help()
         elif choice == "14":
             ui.status_ok("Saving data and exiting... Goodbye.")
-            datasets = {
-                "users": um.get_users_data(),
-                "transactions": tm.get_transactions_data(),
-                "goals": load_json(FILES["goals"]),
-                "budgets": load_json(FILES["budgets"]),
-                "reminders": load_json(FILES["reminders"]),
-                "recurring": load_json(FILES["recurring"]),
-            }
-            save_all(datasets)
+            save_all(_loaded_datasets())
+            close_writes()   # flush the write-behind queue and join its worker
+            if show_timings:
+                print_timings("Session timings")
             break
         else:
             ui.status_warn("Invalid choice.")
@@ -91,4 +134,4 @@ def show_help():
     input("Press Enter to return to the main menu...")
 
 if __name__ == "__main__":
-    main_menu()
+    main_menu(show_timings="--timings" in sys.argv[1:])
@@ -0,0 +1,162 @@
+# money.py
+# Fixed-point money. Amounts are stored and summed as integer cents; Decimal
+# is only used at the edges (parsing user/CSV input, legacy float fields).
+
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from functools import total_ordering
+from typing import Dict, List, Tuple
+
+@total_ordering
+class Money:
+    __slots__ = ("cents",)
+
+    def __init__(self, cents: int = 0):
+        self.cents = int(cents)
+
+    @classmethod
+    def parse(cls, value) -> "Money":
+        """Money from text, Decimal or a legacy float amount (rounded half-up)."""
+        if isinstance(value, Money):
+            return value
+        try:
+            d = Decimal(str(value).strip())
+            if not d.is_finite():
+                raise ValueError
+            return cls(int((d * 100).quantize(Decimal("1"), rounding=ROUND_HALF_UP)))
+        except (InvalidOperation, ValueError, TypeError):
+            raise ValueError(f"Invalid numeric value: {value!r}")
+
+    # ---------- Arithmetic ----------
+    def __add__(self, other):
+        if isinstance(other, Money):
+            return Money(self.cents + other.cents)
+        return NotImplemented
+
+    def __radd__(self, other):
+        # Lets sum() start from its default 0.
+        if other == 0:
+            return self
+        return NotImplemented
+
+    def __sub__(self, other):
+        if isinstance(other, Money):
+            return Money(self.cents - other.cents)
+        return NotImplemented
+
+    def __neg__(self):
+        return Money(-self.cents)
+
+    def __abs__(self):
+        return Money(abs(self.cents))
+
+    def __mul__(self, n):
+        if isinstance(n, int):
+            return Money(self.cents * n)
+        return NotImplemented
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        """Money / Money is a plain ratio; Money / int splits (rounded half-up)."""
+        if isinstance(other, Money):
+            return self.cents / other.cents
+        if isinstance(other, int):
+            q = (Decimal(self.cents) / other).quantize(Decimal("1"), rounding=ROUND_HALF_UP)
+            return Money(int(q))
+        return NotImplemented
+
+    # ---------- Comparison ----------
+    def __eq__(self, other):
+        if isinstance(other, Money):
+            return self.cents == other.cents
+        if other == 0:
+            return self.cents == 0
+        return NotImplemented
+
+    def __lt__(self, other):
+        if isinstance(other, Money):
+            return self.cents < other.cents
+        if other == 0:
+            return self.cents < 0
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.cents)
+
+    def __bool__(self):
+        return self.cents != 0
+
+    # ---------- Conversion ----------
+    def __float__(self):
+        return self.cents / 100
+
+    def to_decimal(self) -> Decimal:
+        return Decimal(self.cents).scaleb(-2)
+
+    def __str__(self):
+        sign = "-" if self.cents < 0 else ""
+        whole, frac = divmod(abs(self.cents), 100)
+        return f"{sign}{whole}.{frac:02d}"
+
+    def __repr__(self):
+        return f"Money({self.cents})"
+
+# ---------- Stored fields ----------
+# dataset -> ((legacy decimal field, integer cents field), ...)
+CENTS_FIELDS: Dict[str, Tuple[Tuple[str, str], ...]] = {
+    "transactions": (("amount", "amount_cents"),),
+    "recurring":    (("amount", "amount_cents"),),
+    "budgets":      (("limit", "limit_cents"),),
+    "goals":        (("target_amount", "target_cents"), ("saved_so_far", "saved_cents")),
+}
+_LEGACY = {new: old for fields in CENTS_FIELDS.values() for old, new in fields}
+
+def cents_of(row, field: str = "amount_cents") -> int:
+    """Integer cents stored in row[field], reading the legacy float field if
+    the row predates the migration."""
+    c = row.get(field)
+    if c is not None:
+        return c
+    try:
+        return Money.parse(row.get(_LEGACY.get(field), 0)).cents
+    except ValueError:
+        return 0
+
+def money_of(row, field: str = "amount_cents") -> Money:
+    return Money(cents_of(row, field))
+
+def migrate_rows(dataset: str, rows: List[dict]) -> int:
+    """Convert legacy float fields to integer cents in place; returns rows changed."""
+    fields = CENTS_FIELDS.get(dataset)
+    if not fields:
+        return 0
+    renames = dict(fields)
+    changed = 0
+    for row in rows:
+        if not any(old in row for old in renames):
+            continue
+        # Rebuilt in place (rows are tracked by identity) keeping key order.
+        items = [(renames[k], cents_of(row, renames[k])) if k in renames else (k, v)
+                 for k, v in row.items() if not (k in renames and renames[k] in row)]
+        row.clear()
+        row.update(items)
+        changed += 1
+    return changed
+
+# ---------- Migration ----------
+def migrate_json_files():
+    """One-shot rewrite of the JSON files in data/ to integer cents (with backups)."""
+    from data_manager import FILES, load_json, save_json, flush_writes, backup_file
+    import ui
+    for dataset in CENTS_FIELDS:
+        path = FILES[dataset]
+        rows = load_json(path)
+        n = migrate_rows(dataset, rows)
+        if n:
+            backup_file(path)
+            save_json(path, rows)
+        ui.status_ok(f"{dataset}: converted {n} row(s).")
+    flush_writes()
+
+if __name__ == "__main__":
+    migrate_json_files()
@@ -0,0 +1,234 @@
+# partition_backend.py
+# Per-user, per-month partitioned transactions (PFM_STORAGE=partitioned).
+# Layout: data/transactions/<user>/<YYYY-MM>.json plus a manifest.json that
+# records which partitions exist, so listing never opens the partitions.
+
+import os
+import sys
+from urllib.parse import quote
+
+from data_manager import DATA_DIR, FILES, JsonBackend, RowChanges, load_json, load_cached, save_json, remove_json
+from money import migrate_rows
+import ui
+
+PART_DIR = os.path.join(DATA_DIR, "transactions")
+UNDATED = "undated"
+
+def _month_of(row) -> str:
+    d = str(row.get("date") or "")
+    return d[:7] if len(d) >= 7 and d[4] == "-" else UNDATED
+
+def _part_key(row):
+    return (row.get("username"), _month_of(row))
+
+class _ManifestChanges:
+    """The manifest entries this process changed, replayable onto a manifest
+    another process wrote (see RowChanges in data_manager)."""
+    conflicts = ()                   # counts are set, never merged
+
+    def __init__(self, entries):
+        self.entries = entries       # (user, ym) -> row count, None = removed
+
+    def then(self, later):
+        return _ManifestChanges({**self.entries, **later.entries})
+
+    def apply(self, theirs):
+        theirs = theirs if isinstance(theirs, dict) else {}
+        for (username, ym), n in self.entries.items():
+            months = theirs.setdefault(username, {})
+            if n is None:
+                months.pop(ym, None)
+            else:
+                months[ym] = n
+            if not months:
+                del theirs[username]
+        return theirs
+
+class PartitionedBackend(JsonBackend):
+    name = "partitioned"
+    supports_user_load = True
+
+    def __init__(self, root=PART_DIR):
+        self.root = root
+        self.manifest_path = os.path.join(root, "manifest.json")
+        os.makedirs(root, exist_ok=True)
+        self._manifest = self._read_manifest()
+        # (user, ym) -> rows held by transaction_manager, and
+        # id(row) -> ((user, ym), row) so edits can move rows between partitions.
+        self._parts = {}
+        self._where = {}
+
+    # ---------- Manifest ----------
+    def _read_manifest(self):
+        m = load_json(self.manifest_path)
+        return m if isinstance(m, dict) else {}
+
+    def _write_manifest(self, keys=()):
+        entries = {(u, ym): self._manifest.get(u, {}).get(ym) for u, ym in keys}
+        save_json(self.manifest_path, self._manifest, changes=_ManifestChanges(entries))
+
+    def storage_paths(self, dataset):
+        if dataset != "transactions":
+            return super().storage_paths(dataset)
+        return (self.manifest_path,)
+
+    def users(self):
+        return sorted(self._manifest)
+
+    def months_for_user(self, username):
+        return sorted(self._manifest.get(username, {}))
+
+    # ---------- Partition files ----------
+    def _path(self, username, ym):
+        user_dir = quote(str(username), safe="").replace(".", "%2E")
+        return os.path.join(self.root, user_dir, f"{ym}.json")
+
+    def _read_part(self, username, ym):
+        return load_cached(self._path(username, ym))
+
+    def _write_part(self, key, changes):
+        username, ym = key
+        rows = self._parts.get(key, [])
+        path = self._path(username, ym)
+        months = self._manifest.setdefault(username, {})
+        if rows:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            save_json(path, rows, changes=changes)
+            months[ym] = len(rows)
+            return
+        # Emptied here; kept if another process added rows to it meanwhile.
+        left = remove_json(path, changes)
+        if left:
+            months[ym] = left
+        else:
+            months.pop(ym, None)
+            if not months:
+                self._manifest.pop(username, None)
+
+    def _track(self, row):
+        key = _part_key(row)
+        self._parts.setdefault(key, []).append(row)
+        self._where[id(row)] = (key, row)
+        return key
+
+    def _untrack(self, row):
+        entry = self._where.pop(id(row), None)
+        if entry is None:
+            return None
+        key = entry[0]
+        part = self._parts.get(key, [])
+        for i, r in enumerate(part):
+            if r is row:
+                del part[i]
+                break
+        return key
+
+    def _flush(self, changes):
+        """Write the partitions in changes ({(user, ym): RowChanges or None
+        to overwrite}), then the manifest."""
+        for key, ch in changes.items():
+            self._write_part(key, ch)
+        self._write_manifest(changes)
+
+    # ---------- Backend API ----------
+    def load(self, dataset):
+        if dataset != "transactions":
+            return super().load(dataset)
+        rows = []
+        for username in self.users():
+            rows.extend(self.load_user_partitions(username))
+        return rows
+
+    def load_user_partitions(self, username):
+        """Load and track one user's partitions for later row-level writes."""
+        for key in [k for k in self._parts if k[0] == username]:
+            for r in self._parts.pop(key):
+                self._where.pop(id(r), None)
+        rows = []
+        for ym in self.months_for_user(username):
+            for row in self._read_part(username, ym):
+                self._track(row)
+                rows.append(row)
+        return rows
+
+    def load_for_user(self, dataset, username):
+        if dataset != "transactions":
+            return super().load_for_user(dataset, username)
+        rows = []
+        for ym in self.months_for_user(username):
+            rows.extend(self._read_part(username, ym))
+        return rows
+
+    def load_for_user_month(self, dataset, username, ym):
+        if dataset != "transactions":
+            return super().load_for_user_month(dataset, username, ym)
+        if ym not in self._manifest.get(username, {}):
+            return []
+        return self._read_part(username, ym)
+
+    def save(self, dataset, rows):
+        if dataset != "transactions":
+            return super().save(dataset, rows)
+        stale = set(self._parts)
+        self._parts, self._where = {}, {}
+        for row in rows:
+            self._track(row)
+        stale |= {(u, ym) for u, months in self._manifest.items() for ym in months}
+        # A full save replaces the dataset (migration), so no changes to merge.
+        self._flush({key: None for key in stale | set(self._parts)})
+
+    def insert(self, dataset, rows, new_rows):
+        if dataset != "transactions":
+            return super().insert(dataset, rows, new_rows)
+        changes = {}
+        for r in new_rows:
+            changes.setdefault(self._track(r), RowChanges("transactions")).insert([r])
+        self._flush(changes)
+
+    def update(self, dataset, rows, changed_rows, before=None):
+        if dataset != "transactions":
+            return super().update(dataset, rows, changed_rows, before)
+        changes = {}
+        for row, b in zip(changed_rows, before or [None] * len(changed_rows)):
+            old = self._untrack(row)
+            new = self._track(row)
+            if old == new:
+                changes.setdefault(new, RowChanges("transactions")).update([row], [b])
+                continue
+            # An edited date can move the row to another month's partition.
+            if old is not None:
+                changes.setdefault(old, RowChanges("transactions")).delete([row])
+            changes.setdefault(new, RowChanges("transactions")).insert([row])
+        self._flush(changes)
+
+    def delete(self, dataset, rows, removed_rows):
+        if dataset != "transactions":
+            return super().delete(dataset, rows, removed_rows)
+        changes = {}
+        for r in removed_rows:
+            key = self._untrack(r)
+            if key is not None:
+                changes.setdefault(key, RowChanges("transactions")).delete([r])
+        self._flush(changes)
+
+    def save_all(self, datasets):
+        # Partitions are rewritten on every mutation; only the small
+        # datasets still go through the save-with-backup path.
+        super().save_all({k: v for k, v in datasets.items() if k != "transactions"})
+
+# ---------- Migration ----------
+def migrate_from_json(force=False):
+    """Split data/transactions.json into per-user, per-month partitions."""
+    backend = PartitionedBackend()
+    if backend.users() and not force:
+        ui.status_warn(f"{PART_DIR} already has partitions; use --force to overwrite.")
+        return False
+    rows = load_json(FILES["transactions"])
+    migrate_rows("transactions", rows)
+    backend.save("transactions", rows)
+    n_parts = sum(len(m) for m in backend._manifest.values())
+    ui.status_ok(f"Migrated {len(rows)} transaction(s) into {n_parts} partition(s).")
+    return True
+
+if __name__ == "__main__":
+    migrate_from_json(force="--force" in sys.argv[1:])
@@ -0,0 +1,213 @@
+# query.py
+# Indexed search over one user's transactions (backs report_manager.search_filter).
+# Per user we keep rows sorted by date and by amount, plus an inverted index
+# of categories; a small planner scans only the most selective of them.
+# transaction_manager applies every insert/edit/delete here.
+
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, List, Optional, Tuple
+
+from money import cents_of
+from utils import iso_ordinal
+
+SORT_KEYS = ("date", "amount", "category", "type")
+
+Entry = Tuple[Optional[int], int, str]   # (day ordinal or None, cents, lower-cased category)
+
+def _insert(keys: List[int], seqs: List[int], key: int, seq: int):
+    # Equal keys stay in sequence (list) order.
+    a, b = bisect_left(keys, key), bisect_right(keys, key)
+    i = bisect_left(seqs, seq, a, b)
+    keys.insert(i, key)
+    seqs.insert(i, seq)
+
+def _delete(keys: List[int], seqs: List[int], key: int, seq: int):
+    a, b = bisect_left(keys, key), bisect_right(keys, key)
+    i = bisect_left(seqs, seq, a, b)
+    del keys[i]
+    del seqs[i]
+
+class UserIndex:
+    """Indexes over one user's rows, kept up to date by add/remove.
+
+    Rows are held by identity and numbered in list order (seq); postings are
+    seqs and ties are always in seq order, so results match a stable sort of
+    the user's rows. Rows with malformed dates are not searchable (see
+    transaction_manager.malformed_dates)."""
+
+    def __init__(self, rows: List[dict]):
+        self.rows: Dict[int, dict] = dict(enumerate(rows))       # seq -> row
+        self._seq: Dict[int, int] = {id(t): i for i, t in self.rows.items()}
+        self._next = len(self.rows)
+        self.entries: Dict[int, Entry] = {i: _entry(t) for i, t in self.rows.items()}
+        dated = sorted((e[0], i) for i, e in self.entries.items() if e[0] is not None)
+        self.date_keys = [o for o, _ in dated]
+        self.by_date = [i for _, i in dated]
+
+        amounts = sorted((self.entries[i][1], i) for i in self.by_date)
+        self.amount_keys = [c for c, _ in amounts]
+        self.by_amount = [i for _, i in amounts]
+
+        # lower-cased category -> seqs in date order
+        self.by_category: Dict[str, List[int]] = {}
+        for i in self.by_date:
+            self.by_category.setdefault(self.entries[i][2], []).append(i)
+
+    # ---------- Updates ----------
+    def _date_order(self, seq):
+        return self.entries[seq][0], seq
+
+    def _index(self, seq: int, row: dict):
+        o, c, cat = self.entries[seq] = _entry(row)
+        if o is None:
+            return
+        _insert(self.date_keys, self.by_date, o, seq)
+        _insert(self.amount_keys, self.by_amount, c, seq)
+        insort(self.by_category.setdefault(cat, []), seq, key=self._date_order)
+
+    def _unindex(self, seq: int):
+        o, c, cat = self.entries[seq]
+        if o is not None:
+            _delete(self.date_keys, self.by_date, o, seq)
+            _delete(self.amount_keys, self.by_amount, c, seq)
+            posting = self.by_category[cat]
+            del posting[bisect_left(posting, (o, seq), key=self._date_order)]
+            if not posting:
+                del self.by_category[cat]
+        del self.entries[seq]
+
+    def add(self, row: dict):
+        """Index a new row after the others, or re-index an edited one in place."""
+        seq = self._seq.get(id(row))
+        if seq is None:
+            seq = self._seq[id(row)] = self._next
+            self._next += 1
+            self.rows[seq] = row
+        else:
+            self._unindex(seq)
+        self._index(seq, row)
+
+    def remove(self, row: dict):
+        seq = self._seq.pop(id(row), None)
+        if seq is None:
+            return
+        self._unindex(seq)
+        del self.rows[seq]
+
+    def __len__(self):
+        return len(self.by_date)
+
+    # ---------- Planning ----------
+    def _plans(self, lo, hi, category, min_cents, max_cents):
+        """Candidate access paths as (estimated rows, name, producer)."""
+        plans = []
+        if lo is not None or hi is not None:
+            a = bisect_left(self.date_keys, lo) if lo is not None else 0
+            b = bisect_right(self.date_keys, hi) if hi is not None else len(self.date_keys)
+            plans.append((max(0, b - a), "date", lambda a=a, b=b: self.by_date[a:b]))
+        if min_cents is not None or max_cents is not None:
+            a = bisect_left(self.amount_keys, min_cents) if min_cents is not None else 0
+            b = bisect_right(self.amount_keys, max_cents) if max_cents is not None else len(self.amount_keys)
+            plans.append((max(0, b - a), "amount", lambda a=a, b=b: self.by_amount[a:b]))
+        if category:
+            cats = [c for c in self.by_category if category in c]
+            size = sum(len(self.by_category[c]) for c in cats)
+            plans.append((size, "category", lambda: _merge_date_order(self, cats)))
+        if not plans:
+            plans.append((len(self.by_date), "date", lambda: self.by_date))
+        return plans
+
+    def search(self, start=None, end=None, category="", min_cents=None, max_cents=None,
+               sort_by="date", descending=False) -> List[dict]:
+        """Rows matching every given predicate (start/end are ordinals,
+        category a lower-case substring), ordered like a stable sort."""
+        category = (category or "").lower()
+        _, path, produce = min(self._plans(start, end, category, min_cents, max_cents),
+                               key=lambda p: p[0])
+        rows = self.rows
+        hits = []
+        for i in produce():
+            t = rows[i]
+            if path != "date":
+                o = iso_ordinal(t.get("date"))
+                if (start is not None and o < start) or (end is not None and o > end):
+                    continue
+            if path != "amount":
+                c = cents_of(t)
+                if (min_cents is not None and c < min_cents) or (max_cents is not None and c > max_cents):
+                    continue
+            if path != "category" and category and category not in (t.get("category") or "").lower():
+                continue
+            hits.append(i)
+
+        sort_by = sort_by if sort_by in SORT_KEYS else "date"
+        key = _sort_key(rows, sort_by)
+        # date-ordered paths (date, category) and the amount path already
+        # come out in (key, position) order for their own key.
+        if (sort_by, path) not in (("date", "date"), ("date", "category"), ("amount", "amount")):
+            hits.sort(key=lambda i: (key(i), i))
+        if descending:
+            hits = _descending(hits, key)
+        return [rows[i] for i in hits]
+
+def _merge_date_order(index: UserIndex, cats: List[str]) -> List[int]:
+    if len(cats) == 1:
+        return index.by_category[cats[0]]
+    wanted = set(cats)
+    return [i for i in index.by_date if (index.rows[i].get("category") or "").lower() in wanted]
+
+def _sort_key(rows, sort_by):
+    if sort_by == "date":
+        return lambda i: iso_ordinal(rows[i].get("date"))
+    if sort_by == "amount":
+        return lambda i: cents_of(rows[i])
+    return lambda i: rows[i].get(sort_by, "")
+
+def _descending(positions: List[int], key) -> List[int]:
+    # Reverse key order but keep ties in position order, as sort(reverse=True) does.
+    out = []
+    j = len(positions)
+    while j > 0:
+        i = j - 1
+        k = key(positions[i])
+        while i > 0 and key(positions[i - 1]) == k:
+            i -= 1
+        out.extend(positions[i:j])
+        j = i
+    return out
+
+def _entry(t: dict) -> Entry:
+    return iso_ordinal(t.get("date")), cents_of(t), (t.get("category") or "").lower()
+
+# ---------- Maintenance ----------
+# username -> index; users are indexed on their first search.
+_indexes: Dict[str, UserIndex] = {}
+
+def apply(added=(), removed=()):
+    """Fold row changes into the indexes already built. An edited row goes
+    in added alone: it is re-indexed and keeps its place."""
+    for t in removed:
+        idx = _indexes.get(t.get("username"))
+        if idx is not None:
+            idx.remove(t)
+    for t in added:
+        idx = _indexes.get(t.get("username"))
+        if idx is not None:
+            idx.add(t)
+
+def invalidate():
+    _indexes.clear()
+
+def built(username: str) -> bool:
+    """Whether username's index exists (index_for will not build it)."""
+    return username in _indexes
+
+def index_for(username: str) -> UserIndex:
+    idx = _indexes.get(username)
+    if idx is None:
+        import transaction_manager as tm
+        idx = _indexes[username] = UserIndex(tm.get_user_transactions(username))
+    return idx
+
+def search(username: str, **predicates) -> List[dict]:
+    return index_for(username).search(**predicates)
@@ -0,0 +1,239 @@
+# recurrence.py
+# Schedules of recurring rules, computed in closed form.
+#
+# A rule's occurrences are next_date followed by one every `interval`
+# days/weeks/months. Every due occurrence up to a date is produced in one
+# pass over day ordinals / month indexes, without re-parsing date strings.
+# Optional rule fields (older rules have none and behave as before):
+#   interval    repeat every N periods (default 1)
+#   month_day   monthly: day of month 1-31, or "last"; short months clamp
+#               without losing the day (Jan 31 -> Feb 28 -> Mar 31)
+#   weekday,nth monthly: nth (1-5, or -1 for the last) weekday (0=Mon) of the month
+#   end_date    no occurrences after this date (YYYY-MM-DD)
+#   max_count   at most this many occurrences in total; `count` tracks them
+# Monthly rules without month_day/weekday keep the original behaviour: the
+# day is clamped in short months and stays clamped (Jan 31 -> Feb 28 -> Mar 28).
+# A rule with nothing left to generate gets next_date "".
+
+import calendar
+from datetime import date
+from typing import List, Optional, Tuple
+
+FREQS = ("daily", "weekly", "monthly")
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+def _parse(s: str) -> date:
+    return date(int(s[:4]), int(s[5:7]), int(s[8:10]))
+
+def _last_day(mi: int) -> int:
+    return calendar.monthrange(mi // 12, mi % 12 + 1)[1]
+
+def _nth_weekday(mi: int, weekday: int, nth: int) -> Optional[int]:
+    """Day of month of the nth weekday in month index mi (None if there is
+    no 5th one that month)."""
+    y, m = mi // 12, mi % 12 + 1
+    first = (weekday - date(y, m, 1).weekday()) % 7 + 1
+    last = _last_day(mi)
+    if nth < 0:
+        return first + 7 * ((last - first) // 7)
+    day = first + 7 * (nth - 1)
+    return day if day <= last else None
+
+def _monthly(rule, start: date, until: date, limit: int) -> List[date]:
+    interval = int(rule.get("interval") or 1)
+    mi0 = start.year * 12 + start.month - 1
+    mi_end = until.year * 12 + until.month - 1
+    out = [start] if start <= until and limit > 0 else []
+    weekday, month_day = rule.get("weekday"), rule.get("month_day")
+    day = start.day
+    k = 1
+    while len(out) < limit:
+        mi = mi0 + k * interval
+        if mi > mi_end:
+            break
+        k += 1
+        if weekday is not None:
+            d = _nth_weekday(mi, int(weekday), int(rule.get("nth") or 1))
+            if d is None:
+                continue           # no 5th such weekday this month
+        elif month_day == "last":
+            d = _last_day(mi)
+        elif month_day:
+            d = min(int(month_day), _last_day(mi))
+        else:
+            day = min(day, _last_day(mi))   # original clamping carries over
+            d = day
+        occ = date(mi // 12, mi % 12 + 1, d)
+        if occ > until:
+            break
+        out.append(occ)
+    return out
+
+def _next_after(rule, last: date) -> Optional[date]:
+    """The occurrence following last (a rule occurrence), None past year 9999."""
+    interval = int(rule.get("interval") or 1)
+    if rule["frequency"] != "monthly":
+        step = interval * (7 if rule["frequency"] == "weekly" else 1)
+        return date.fromordinal(last.toordinal() + step) if last.toordinal() + step <= date.max.toordinal() else None
+    # Some 5th weekdays are years apart; _monthly stops at the first one anyway.
+    far = date(min(9999, last.year + 30 * interval), 12, 31)
+    following = _monthly(rule, last, far, 2)
+    return following[1] if len(following) > 1 else None
+
+def due(rule: dict, today: str) -> Tuple[List[str], str]:
+    """(occurrence dates due on/before today, the rule's new next_date).
+
+    The new next_date is "" once end_date or max_count is reached."""
+    if not rule.get("next_date"):
+        return [], ""
+    start, until = _parse(rule["next_date"]), _parse(today)
+    end = rule.get("end_date")
+    if end:
+        until = min(until, _parse(end))
+    max_count = rule.get("max_count")
+    limit = (int(max_count) - int(rule.get("count") or 0)) if max_count else 1 << 62
+    if limit <= 0:
+        return [], ""
+
+    if rule["frequency"] == "monthly":
+        dates = _monthly(rule, start, until, limit)
+    else:
+        step = int(rule.get("interval") or 1) * (7 if rule["frequency"] == "weekly" else 1)
+        first, stop = start.toordinal(), until.toordinal()
+        n = max(0, min(limit, (stop - first) // step + 1)) if stop >= first else 0
+        dates = [date.fromordinal(o) for o in range(first, first + n * step, step)]
+
+    if not dates:
+        return [], rule["next_date"] if (not end or start <= _parse(end)) else ""
+    nxt = _next_after(rule, dates[-1])
+    if nxt is None or len(dates) >= limit or (end and nxt > _parse(end)):
+        return [d.isoformat() for d in dates], ""
+    return [d.isoformat() for d in dates], nxt.isoformat()
+
+# ---------- Range queries ----------
+def _skip_to(rule, lo: date):
+    """(occurrences before lo's period, the first occurrence from there), or
+    None where the schedule has to be expanded from next_date."""
+    start = _parse(rule["next_date"])
+    if lo <= start:
+        return None
+    interval = int(rule.get("interval") or 1)
+    if rule["frequency"] != "monthly":
+        step = interval * (7 if rule["frequency"] == "weekly" else 1)
+        k = -(-(lo.toordinal() - start.toordinal()) // step)
+        return k, date.fromordinal(start.toordinal() + k * step)
+    if rule.get("weekday") is None and not rule.get("month_day"):
+        return None    # original clamping depends on every month in between
+    if rule.get("weekday") is not None and rule.get("nth") == 5:
+        return None    # months without a 5th weekday break the count
+    mi0 = start.year * 12 + start.month - 1
+    k = -(-(lo.year * 12 + lo.month - 1 - mi0) // interval)
+    if k <= 0:
+        return None
+    mi = mi0 + k * interval
+    return k, date(mi // 12, mi % 12 + 1, _day_in_month(rule, mi))
+
+def _from(rule, lo: str) -> dict:
+    skip = _skip_to(rule, _parse(lo))
+    if skip is None:
+        return rule
+    k, first = skip
+    return dict(rule, next_date=first.isoformat(), count=int(rule.get("count") or 0) + k)
+
+def between(rule: dict, lo: str, hi: str) -> List[str]:
+    """Occurrence dates within [lo, hi]. Most schedules jump straight to lo
+    instead of expanding the occurrences before it."""
+    if not rule.get("next_date") or hi < lo:
+        return []
+    return [d for d in due(_from(rule, lo), hi)[0] if d >= lo]
+
+def next_on_or_after(rule: dict, day: str) -> str:
+    """The first occurrence on or after day ("" if the schedule has ended)."""
+    if not rule.get("next_date"):
+        return ""
+    dates, nxt = due(_from(rule, day), day)
+    return dates[-1] if dates and dates[-1] == day else nxt
+
+# ---------- Rule fields ----------
+def schedule_fields(frequency, start: str, interval=None, month_day=None, weekday=None,
+                    nth=None, end_date=None, max_count=None) -> dict:
+    """Validated schedule fields for a new rule (raises ValueError).
+
+    Dates are YYYY-MM-DD strings the caller has already checked. start is
+    the first candidate date; for nth-weekday and month_day rules
+    next_date is moved to the first matching day on or after it."""
+    blank = lambda v: v is None or str(v).strip() == ""
+    fields = {"frequency": frequency}
+    if frequency not in FREQS:
+        raise ValueError(f"Frequency must be one of {', '.join(FREQS)}.")
+    if not blank(interval):
+        if not str(interval).strip().isdigit() or int(interval) < 1:
+            raise ValueError("Interval must be a whole number of at least 1.")
+        if int(interval) > 1:
+            fields["interval"] = int(interval)
+    if (not blank(month_day) or not blank(weekday)) and frequency != "monthly":
+        raise ValueError("Day-of-month and weekday schedules are monthly.")
+    if not blank(month_day):
+        if str(month_day).strip().lower() == "last":
+            fields["month_day"] = "last"
+        elif str(month_day).strip().isdigit() and 1 <= int(month_day) <= 31:
+            fields["month_day"] = int(month_day)
+        else:
+            raise ValueError("Day of month must be 1-31 or 'last'.")
+    if not blank(weekday):
+        if "month_day" in fields:
+            raise ValueError("Use either a day of month or a weekday, not both.")
+        wd, n = str(weekday).strip().lower()[:3], str(nth if not blank(nth) else 1).strip().lower()
+        wd = WEEKDAYS.index(wd) if wd in WEEKDAYS else int(wd) if wd.isdigit() else -1
+        n = -1 if n in ("-1", "last") else int(n) if n.isdigit() else 0
+        if not 0 <= wd <= 6 or n not in (-1, 1, 2, 3, 4, 5):
+            raise ValueError("Weekday must be mon-sun and nth 1-5 or 'last'.")
+        fields["weekday"], fields["nth"] = wd, n
+    if not blank(end_date):
+        fields["end_date"] = end_date
+        if end_date < start:
+            raise ValueError("End date is before the first date.")
+    if not blank(max_count):
+        if not str(max_count).strip().isdigit() or int(max_count) < 1:
+            raise ValueError("Max count must be a whole number of at least 1.")
+        fields["max_count"], fields["count"] = int(max_count), 0
+
+    first = _parse(start)
+    if "weekday" in fields or "month_day" in fields:
+        # First matching day on/after start (a 5th weekday may be months away).
+        mi0 = first.year * 12 + first.month - 1
+        for mi in range(mi0, mi0 + 12):
+            d = _day_in_month(fields, mi)
+            if d is not None and date(mi // 12, mi % 12 + 1, d) >= first:
+                first = date(mi // 12, mi % 12 + 1, d)
+                break
+    fields["next_date"] = first.isoformat()
+    return fields
+
+def _day_in_month(rule, mi) -> Optional[int]:
+    if rule.get("weekday") is not None:
+        return _nth_weekday(mi, rule["weekday"], rule.get("nth") or 1)
+    if rule.get("month_day") == "last":
+        return _last_day(mi)
+    return min(int(rule["month_day"]), _last_day(mi))
+
+def describe(rule: dict) -> str:
+    """Short schedule text for tables ("monthly", "every 2 weeks", ...)."""
+    freq = rule["frequency"]
+    n = int(rule.get("interval") or 1)
+    unit = {"daily": "day", "weekly": "week", "monthly": "month"}[freq]
+    text = freq if n == 1 else f"every {n} {unit}s"
+    if rule.get("weekday") is not None:
+        nth = rule.get("nth") or 1
+        which = "last" if nth == -1 else {1: "1st", 2: "2nd", 3: "3rd"}.get(nth, f"{nth}th")
+        text += f" on {which} {WEEKDAYS[rule['weekday']].title()}"
+    elif rule.get("month_day") == "last":
+        text += " on last day"
+    elif rule.get("month_day"):
+        text += f" on day {rule['month_day']}"
+    if rule.get("end_date"):
+        text += f" until {rule['end_date']}"
+    if rule.get("max_count"):
+        done = f"{rule['count']}/" if "count" in rule else ""
+        text += f" ({done}{rule['max_count']} times)"
+    return text
@@ -1,33 +1,80 @@
 # recurring_manager.py
 
-from typing import List
-from datetime import date, datetime
-from decimal import Decimal
-from data_manager import load_json, save_json_with_backup, FILES
-from utils import get_nonempty_input, get_number, today_iso
+from typing import Dict, List, Optional
+from datetime import date
+from data_manager import exclusive, get_backend, row_key, timed
+from utils import get_nonempty_input, get_amount, iso_ordinal, remove_identical, today_iso
+from money import money_of, cents_of, migrate_rows
 import user_manager as um
 import transaction_manager as tm
+import services as svc
+import recurrence
 import ui
 
-REC_PATH = FILES["recurring"]
-_recurring: List[dict] = load_json(REC_PATH)
+_backend = get_backend()
+_recurring: Optional[List[dict]] = None   # loaded on first use, see get_recurring_data
 
-FREQS = ("daily","weekly","monthly")
+FREQS = recurrence.FREQS
 
-def save_recurring():
-    save_json_with_backup(REC_PATH, _recurring)
+def reload_recurring():
+    """Forget the loaded rules; the next access reads them again."""
+    global _recurring
+    _recurring = None
 
-def add_rule():
+def get_recurring_data() -> List[dict]:
+    global _recurring
+    if _recurring is None:
+        with timed("load recurring"):
+            _recurring = _backend.load("recurring")
+            migrate_rows("recurring", _recurring)
+        _flag_malformed(_recurring)
+    return _recurring
+
+def malformed_rules(rules: List[dict]) -> List[dict]:
+    """Rules whose next_date or end_date is not a valid YYYY-MM-DD (e.g.
+    hand-edited legacy data); they are never applied."""
+    return [r for r in rules
+            if any(r.get(f) and iso_ordinal(r[f]) is None for f in ("next_date", "end_date"))]
+
+def _flag_malformed(rules: List[dict]):
+    bad = malformed_rules(rules)
+    if not bad:
+        return
+    sample = ", ".join(f"{r.get('username')}/{r.get('category')} ({r.get('next_date')!r})" for r in bad[:5])
+    more = " ..." if len(bad) > 5 else ""
+    ui.status_warn(f"{len(bad)} recurring rule(s) have malformed dates and are not applied: {sample}{more}")
+
+# ---------- Data ----------
+def user_rules(username: str) -> List[dict]:
+    return [r for r in get_recurring_data() if r["username"] == username]
+
+def insert_rule(rule: dict):
+    recurring = get_recurring_data()
+    recurring.append(rule)
+    _backend.insert("recurring", recurring, [rule])
+
+def remove_rule(rule: dict):
+    recurring = get_recurring_data()
+    remove_identical(recurring, rule)
+    _backend.delete("recurring", recurring, [rule])
+
+# ---------- Menu adapters (see services.RecurringService) ----------
+def _service():
     if not um.is_logged_in():
         ui.status_warn("Please log in first.")
+        return None
+    return svc.RecurringService(svc.Session.for_user(um.get_current_user()))
+
+def add_rule():
+    s = _service()
+    if s is None:
         return
-    cu = um.get_current_user()
     ui.section("Add Recurring Rule")
     rtype = input("Type (income/expense): ").lower().strip()
     if rtype not in ("income","expense"):
         ui.status_err("Invalid type.")
         return
-    amount = get_number("Amount: ")
+    amount = get_amount("Amount: ")
     category = get_nonempty_input("Category: ").title()
     freq = input("Frequency (daily/weekly/monthly): ").lower().strip()
     if freq not in FREQS:
@@ -35,117 +82,157 @@ def add_rule():
         return
     next_date = input("Next date (YYYY-MM-DD, blank=today): ").strip() or today_iso()
     description = input("Description (optional): ").strip()
-
-    rule = {
-        "username": cu["username"],
-        "type": rtype,
-        "amount": float(amount),
-        "category": category,
-        "frequency": freq,
-        "next_date": next_date,
-        "description": description,
-        "created_at": today_iso()
-    }
-    _recurring.append(rule)
-    save_recurring()
+    schedule = {}
+    if input("More schedule options? (y/n): ").lower().strip() == "y":
+        schedule["interval"] = input("Repeat every N periods (blank = 1): ").strip()
+        if freq == "monthly":
+            schedule["month_day"] = input("Day of month (1-31 or 'last', blank = next date's): ").strip()
+            if not schedule["month_day"]:
+                weekday = input("Or nth weekday, e.g. '2 tue' or 'last fri' (blank = none): ").split()
+                if len(weekday) == 2:
+                    schedule["nth"], schedule["weekday"] = weekday
+                elif weekday:
+                    ui.status_err("Use '<nth> <weekday>'.")
+                    return
+        schedule["end_date"] = input("End date (YYYY-MM-DD, blank = none): ").strip()
+        schedule["max_count"] = input("Stop after N occurrences (blank = never): ").strip()
+    try:
+        s.add(rtype, amount, category, freq, next_date, description, **schedule)
+    except svc.ServiceError as e:
+        ui.status_err(str(e))
+        return
     ui.status_ok("Recurring rule added.")
 
 def view_rules():
-    if not um.is_logged_in():
-        ui.status_warn("Please log in first.")
+    s = _service()
+    if s is None:
         return
-    cu = um.get_current_user()
-    rules = [r for r in _recurring if r["username"]==cu["username"]]
+    rules = s.list()
     ui.section("Recurring Rules")
     if not rules:
         ui.status_warn("No rules.")
         return
-    rows = [(r["type"], f"{r['amount']:.2f}", r["category"], r["frequency"], r["next_date"], r.get("description","")) for r in rules]
+    rows = [(r["type"], str(money_of(r)), r["category"], recurrence.describe(r), r["next_date"] or "(ended)", r.get("description","")) for r in rules]
     ui.table(rows, headers=("TYPE","AMOUNT","CATEGORY","FREQ","NEXT DATE","DESC"))
 
 def delete_rule():
-    if not um.is_logged_in():
-        ui.status_warn("Please log in first.")
+    s = _service()
+    if s is None:
         return
-    cu = um.get_current_user()
-    rules = [r for r in _recurring if r["username"]==cu["username"]]
+    rules = s.list()
     if not rules:
         ui.status_warn("No rules to delete.")
         return
     ui.section("Delete Rule")
     for i, r in enumerate(rules, start=1):
-        print(f"{i}. {r['type']} {r['category']} {r['amount']} ({r['frequency']}) next {r['next_date']}")
-    try:
-        idx = int(input("Select rule #: ").strip())
-        r = rules[idx-1]
-    except Exception:
-        ui.status_err("Invalid selection.")
+        print(f"{i}. {r['type']} {r['category']} {money_of(r)} ({recurrence.describe(r)}) next {r['next_date'] or '(ended)'}")
+    idx = ui.select("Select rule #: ", len(rules))
+    if idx is None:
         return
     confirm = input("Delete this rule? (y/n): ").lower()
     if confirm == "y":
-        _recurring.remove(r)
-        save_recurring()
+        s.delete(idx)
         ui.status_ok("Rule deleted.")
     else:
         ui.status_warn("Deletion cancelled.")
 
-def _advance(date_str: str, freq: str) -> str:
-    y, m, d = map(int, date_str.split("-"))
-    dt = date(y, m, d)
-    if freq == "daily":
-        nd = date.fromordinal(dt.toordinal()+1)
-    elif freq == "weekly":
-        nd = date.fromordinal(dt.toordinal()+7)
-    else:  # monthly
-        nm = m + 1
-        ny = y + (nm-1)//12
-        nm = 1 + (nm-1)%12
-        # clamp day
-        last_day = 28
-        while True:
-            try:
-                nd = date(ny, nm, min(d, 31))
-                break
-            except ValueError:
-                d -= 1
-    return nd.isoformat()
+def _due_occurrences(rules: List[dict], username: str, today: str):
+    """Transactions for the user's rules due on/before today (ids are
+    assigned by the caller); advances each rule's next_date (and count).
+    Returns (new transactions, rules that advanced, those rules as they
+    were before)."""
+    new_txns = []
+    advanced, before = [], []
+    skip = {id(r) for r in malformed_rules(rules)}
+    for r in rules:
+        if id(r) in skip:
+            continue
+        dates, next_date = recurrence.due(r, today)
+        if not dates and next_date == r["next_date"]:
+            continue
+        before.append(dict(r))
+        amount_cents, description = cents_of(r), r.get("description","(recurring)")
+        for day in dates:
+            new_txns.append({
+                "id": None,
+                "username": username,
+                "type": r["type"],
+                "amount_cents": amount_cents,
+                "category": r["category"],
+                "date": day,
+                "description": description,
+                "created_at": day + " 00:00:00",
+                "updated_at": day + " 00:00:00",
+            })
+        r["next_date"] = next_date
+        if r.get("max_count"):
+            r["count"] = r.get("count", 0) + len(dates)
+        advanced.append(r)
+    return new_txns, advanced, before
+
+def _current(rules: List[dict]) -> List[dict]:
+    """rules as just reloaded from storage (those still there)."""
+    reload_recurring()
+    fresh: Dict[tuple, List[dict]] = {}
+    for r in get_recurring_data():
+        fresh.setdefault(row_key("recurring", r), []).append(r)
+    return [fresh[k].pop(0) for k in (row_key("recurring", r) for r in rules) if fresh.get(k)]
+
+def materialize(rules: List[dict], today: str) -> Dict[str, int]:
+    """Generate the occurrences of rules (any users) due on/before today in
+    one commit: a single transaction insert and a single rule update.
+    Returns the number of occurrences per rule owner.
+
+    Runs under the recurring dataset's lock (data_manager.exclusive), so
+    processes applying rules at the same time never generate an occurrence
+    twice; rules another process advanced are reloaded first."""
+    with exclusive("recurring") as changed:
+        if changed:
+            rules = _current(rules)
+        return _materialize(rules, today)
+
+def _materialize(rules: List[dict], today: str) -> Dict[str, int]:
+    by_user: Dict[str, List[dict]] = {}
+    for r in rules:
+        by_user.setdefault(r["username"], []).append(r)
+    counts = {}
+    new_txns = []
+    advanced, before = [], []
+    for username, user_rules in by_user.items():
+        txns, adv, prev = _due_occurrences(user_rules, username, today)
+        tm.assign_ids(username, txns)
+        counts[username] = len(txns)
+        new_txns += txns
+        advanced += adv
+        before += prev
+    tm.insert_transactions(new_txns)
+    if advanced:
+        _backend.update("recurring", get_recurring_data(), advanced, before)
+    return counts
+
+def apply_due_for(usernames, today: str | None = None) -> Dict[str, int]:
+    """Apply due rules for several users in one commit; returns the number
+    of occurrences per username (users without rules are left out)."""
+    today = today or date.today().isoformat()
+    wanted = set(usernames)
+    with exclusive("recurring") as changed:
+        if changed:
+            reload_recurring()
+        return _materialize([r for r in get_recurring_data() if r["username"] in wanted], today)
+
+def rule_owners() -> List[str]:
+    return sorted({r["username"] for r in get_recurring_data()})
 
 def apply_due(today: str | None = None):
     """Generate transactions for rules due on/before today and advance 'next_date'."""
-    if not um.is_logged_in():
-        ui.status_warn("Please log in first.")
+    s = _service()
+    if s is None:
         return
-    cu = um.get_current_user()
-    user_rules = [r for r in _recurring if r["username"]==cu["username"]]
-    if not user_rules:
+    applied = s.apply_due(today)
+    if applied is None:
         ui.status_warn("No rules.")
         return
-    today = today or date.today().isoformat()
-    count = 0
-    for r in user_rules:
-        while r["next_date"] <= today:
-            # create transaction
-            tm.get_transactions_data().append({
-                "id": _next_id_for_user(cu["username"]),
-                "username": cu["username"],
-                "type": r["type"],
-                "amount": float(r["amount"]),
-                "category": r["category"],
-                "date": r["next_date"],
-                "description": r.get("description","(recurring)"),
-                "created_at": r["next_date"] + " 00:00:00",
-                "updated_at": r["next_date"] + " 00:00:00",
-            })
-            r["next_date"] = _advance(r["next_date"], r["frequency"])
-            count += 1
-    tm.save_transactions()
-    save_recurring()
-    ui.status_ok(f"Applied {count} occurrence(s).")
-
-def _next_id_for_user(username: str) -> int:
-    from transaction_manager import get_transactions_data
-    tx = [t["id"] for t in get_transactions_data() if t.get("username")==username]
-    return (max(tx)+1) if tx else 1
+    ui.status_ok(f"Applied {applied} occurrence(s).")
 
 def recurring_menu():
     while True:
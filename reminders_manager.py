@@ -1,81 +1,201 @@
 # reminders_manager.py
 
-from typing import List
-from datetime import date, datetime, timedelta
-from data_manager import load_json, save_json_with_backup, FILES
-from utils import get_nonempty_input, today_iso
+import heapq
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Optional, Tuple
+from data_manager import get_backend, timed
+from utils import get_nonempty_input, remove_identical
 import user_manager as um
+import services as svc
+import recurrence
 import ui
 
-REM_PATH = FILES["reminders"]
-_reminders: List[dict] = load_json(REM_PATH)
+_backend = get_backend()
+_reminders: Optional[List[dict]] = None   # loaded on first use, see get_reminders_data
 
-def save_reminders():
-    save_json_with_backup(REM_PATH, _reminders)
+def get_reminders_data() -> List[dict]:
+    global _reminders
+    if _reminders is None:
+        with timed("load reminders"):
+            _reminders = _backend.load("reminders")
+    return _reminders
 
-def add_reminder():
+# ---------- Due-date index ----------
+# One-shot reminders are kept in due-date order, per user and across all
+# users, so "due between two dates" is two bisects. A repeating reminder
+# (one with a "frequency", e.g. a monthly bill) is a single row whose
+# due_date is its first occurrence; its later ones are computed on query
+# (recurrence.between) rather than stored. Built on first query and kept in
+# step by insert_reminder/remove_reminder.
+class DueIndex:
+    def __init__(self):
+        self.dates: List[str] = []
+        self.rows: List[dict] = []
+
+    def add(self, r: dict):
+        # After equal dates, so ties keep insertion order.
+        i = bisect_right(self.dates, r["due_date"])
+        self.dates.insert(i, r["due_date"])
+        self.rows.insert(i, r)
+
+    def remove(self, r: dict):
+        i = bisect_left(self.dates, r["due_date"])
+        while self.rows[i] is not r:
+            i += 1
+        del self.dates[i]
+        del self.rows[i]
+
+    def between(self, lo: str, hi: str) -> List[dict]:
+        return self.rows[bisect_left(self.dates, lo):bisect_right(self.dates, hi)]
+
+_by_user: Optional[Dict[str, DueIndex]] = None    # None until first query
+_everyone = DueIndex()
+_repeating: Dict[str, List[dict]] = {}            # username -> repeating rows
+
+def _index_add(r: dict):
+    if r.get("frequency"):
+        _repeating.setdefault(r["username"], []).append(r)
+    else:
+        _by_user.setdefault(r["username"], DueIndex()).add(r)
+        _everyone.add(r)
+
+def _index():
+    global _by_user
+    if _by_user is None:
+        _by_user = {}
+        for r in get_reminders_data():
+            _index_add(r)
+    return _by_user
+
+def _schedule(r: dict) -> dict:
+    return dict(r, next_date=r["due_date"])
+
+def _occurrences(rows: List[dict], lo: str, hi: str) -> List[Tuple[str, dict]]:
+    return sorted(((d, r) for r in rows for d in recurrence.between(_schedule(r), lo, hi)),
+                  key=lambda dr: dr[0])
+
+def _merge(one_shot: List[dict], repeating: List[Tuple[str, dict]]) -> List[Tuple[str, dict]]:
+    # Both are in date order; on a tie one-shot reminders come first.
+    return list(heapq.merge(((r["due_date"], r) for r in one_shot), repeating, key=lambda dr: dr[0]))
+
+# ---------- Data ----------
+def user_reminders(username: str, today: str) -> List[Tuple[str, dict]]:
+    """(date, row) for every reminder of the user in date order: one-shot
+    ones at their due date, repeating ones at their next occurrence on or
+    after today (their first date once they have ended)."""
+    index = _index().get(username, DueIndex())
+    upcoming = []
+    for r in _repeating.get(username, []):
+        upcoming.append((recurrence.next_on_or_after(_schedule(r), today) or r["due_date"], r))
+    upcoming.sort(key=lambda dr: dr[0])
+    return _merge(index.rows, upcoming)
+
+def reminders_due(username: str, lo: str, hi: str) -> List[Tuple[str, dict]]:
+    """(date, row) for each occurrence of the user's reminders in [lo, hi]."""
+    index = _index().get(username, DueIndex())
+    return _merge(index.between(lo, hi), _occurrences(_repeating.get(username, []), lo, hi))
+
+def reminders_due_all(lo: str, hi: str) -> List[Tuple[str, dict]]:
+    """reminders_due across every user at once (for a notifier sweep)."""
+    _index()
+    repeating = [r for rows in _repeating.values() for r in rows]
+    return _merge(_everyone.between(lo, hi), _occurrences(repeating, lo, hi))
+
+def insert_reminder(r: dict):
+    reminders = get_reminders_data()
+    reminders.append(r)
+    if _by_user is not None:
+        _index_add(r)
+    _backend.insert("reminders", reminders, [r])
+
+def remove_reminder(r: dict):
+    reminders = get_reminders_data()
+    remove_identical(reminders, r)
+    if _by_user is not None:
+        if r.get("frequency"):
+            remove_identical(_repeating[r["username"]], r)
+        else:
+            _by_user[r["username"]].remove(r)
+            _everyone.remove(r)
+    _backend.delete("reminders", reminders, [r])
+
+# ---------- Menu adapters (see services.ReminderService) ----------
+def _service():
     if not um.is_logged_in():
         ui.status_warn("Please log in first.")
+        return None
+    return svc.ReminderService(svc.Session.for_user(um.get_current_user()))
+
+def _table(rs):
+    if any(r.get("repeats") for r in rs):
+        rows = [(r["due_date"], r["title"], r.get("repeats",""), r.get("notes","")) for r in rs]
+        ui.table(rows, headers=("DUE DATE","TITLE","REPEATS","NOTES"))
+        return
+    rows = [(r["due_date"], r["title"], r.get("notes","")) for r in rs]
+    ui.table(rows, headers=("DUE DATE","TITLE","NOTES"))
+
+def add_reminder():
+    s = _service()
+    if s is None:
         return
-    cu = um.get_current_user()
     ui.section("Add Reminder")
     title = get_nonempty_input("Title: ")
     due_date = get_nonempty_input("Due date (YYYY-MM-DD): ")
     notes = input("Notes (optional): ").strip()
-    r = {"username": cu["username"], "title": title, "due_date": due_date, "notes": notes, "created_at": today_iso()}
-    _reminders.append(r)
-    save_reminders()
+    schedule = {}
+    repeat = input("Repeat (daily/weekly/monthly, blank = once): ").lower().strip()
+    if repeat:
+        if repeat not in recurrence.FREQS:
+            ui.status_err("Invalid frequency.")
+            return
+        schedule["frequency"] = repeat
+        schedule["interval"] = input("Every N periods (blank = 1): ").strip()
+        schedule["end_date"] = input("Until (YYYY-MM-DD, blank = no end): ").strip()
+    try:
+        s.add(title, due_date, notes, **schedule)
+    except svc.ServiceError as e:
+        ui.status_err(str(e))
+        return
     ui.status_ok("Reminder added.")
 
 def view_reminders():
-    if not um.is_logged_in():
-        ui.status_warn("Please log in first.")
+    s = _service()
+    if s is None:
         return
-    cu = um.get_current_user()
-    rs = [r for r in _reminders if r["username"]==cu["username"]]
+    rs = s.list()
     ui.section("Reminders")
     if not rs:
         ui.status_warn("No reminders.")
         return
-    rows = [(r["due_date"], r["title"], r.get("notes","")) for r in sorted(rs, key=lambda x: x["due_date"])]
-    ui.table(rows, headers=("DUE DATE","TITLE","NOTES"))
+    _table(rs)
 
 def due_soon(days=7):
-    if not um.is_logged_in():
-        ui.status_warn("Please log in first.")
+    s = _service()
+    if s is None:
         return
-    cu = um.get_current_user()
-    today = date.today()
-    lim = today + timedelta(days=days)
-    rs = [r for r in _reminders if r["username"]==cu["username"] and today.isoformat() <= r["due_date"] <= lim.isoformat()]
+    rs = s.due_soon(days)
     ui.section(f"Due within {days} day(s)")
     if not rs:
         ui.status_warn("Nothing due soon.")
         return
-    rows = [(r["due_date"], r["title"], r.get("notes","")) for r in sorted(rs, key=lambda x: x["due_date"])]
-    ui.table(rows, headers=("DUE DATE","TITLE","NOTES"))
+    _table(rs)
 
 def delete_reminder():
-    if not um.is_logged_in():
-        ui.status_warn("Please log in first.")
+    s = _service()
+    if s is None:
         return
-    cu = um.get_current_user()
-    rs = [r for r in _reminders if r["username"]==cu["username"]]
+    rs = s.list()
     if not rs:
         ui.status_warn("No reminders to delete.")
         return
     ui.section("Delete Reminder")
     for i, r in enumerate(rs, start=1):
         print(f"{i}. {r['due_date']} — {r['title']}")
-    try:
-        idx = int(input("Select #: ").strip())
-        r = rs[idx-1]
-    except Exception:
-        ui.status_err("Invalid selection.")
+    idx = ui.select("Select #: ", len(rs))
+    if idx is None:
         return
     if input("Delete? (y/n): ").lower() == "y":
-        _reminders.remove(r)
-        save_reminders()
+        s.delete(idx)
         ui.status_ok("Reminder deleted.")
     else:
         ui.status_warn("Deletion cancelled.")
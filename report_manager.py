@@ -2,220 +2,161 @@
 # Read-only analytics over transactions.
 
 from datetime import date
-from decimal import Decimal
-from collections import defaultdict
-from typing import List, Dict, Any, Tuple
-
-from data_manager import load_json, FILES
-from utils import fmt_money, parse_date, to_decimal
+from utils import fmt_money
+from money import Money, money_of
 import user_manager as um
+import services as svc
 import ui
 
-TXNS_PATH = FILES["transactions"]
-
-def _load_user_transactions() -> List[Dict[str, Any]]:
-    if not um.is_logged_in():
-        return []
-    cu = um.get_current_user()
-    all_txns = load_json(TXNS_PATH)
-    return [t for t in all_txns if t.get("username") == cu["username"]]
-
-def _safe_in_month(date_str: str, y: int, m: int) -> bool:
-    try:
-        d = parse_date(date_str)
-        return d.year == y and d.month == m
-    except Exception:
-        return False
-
-def _totals(txns: List[Dict[str, Any]]) -> Tuple[Decimal, Decimal, Decimal]:
-    inc = Decimal("0")
-    exp = Decimal("0")
-    for t in txns:
-        amt = to_decimal(t.get("amount", 0))
-        if t.get("type") == "income":
-            inc += amt
-        elif t.get("type") == "expense":
-            exp += amt
-    return inc, exp, inc - exp
-
-def _group_by_month(txns: List[Dict[str, Any]]) -> Dict[Tuple[int, int], List[Dict[str, Any]]]:
-    buckets: Dict[Tuple[int, int], List[Dict[str, Any]]] = defaultdict(list)
-    for t in txns:
-        try:
-            d = parse_date(t["date"])
-        except Exception:
-            continue
-        buckets[(d.year, d.month)].append(t)
-    return dict(buckets)
-
-def _group_by_category(txns: List[Dict[str, Any]]) -> Dict[str, Decimal]:
-    totals: Dict[str, Decimal] = defaultdict(lambda: Decimal("0"))
-    for t in txns:
-        if t.get("type") == "expense":
-            cat = (t.get("category") or "Uncategorized").strip()
-            totals[cat] += to_decimal(t.get("amount", 0))
-    return dict(totals)
-
 def _month_name(y, m):
     return date(y, m, 1).strftime("%b %Y")
 
-def _bar_from_pct(pct: Decimal, width: int = 20) -> str:
+def _bar_from_pct(pct: float, width: int = 20) -> str:
     filled = int((float(pct) / 100) * width + 0.5)
     filled = max(0, min(filled, width))
     return "█" * filled + "·" * (width - filled)
 
 # -----------------------------
-# Reports
+# Reports (menu adapters over services.ReportService)
 # -----------------------------
-def dashboard_summary():
+def _service():
     if not um.is_logged_in():
         ui.status_warn("Please log in first.")
+        return None
+    return svc.ReportService(svc.Session.for_user(um.get_current_user()))
+
+def _ask_month():
+    try:
+        year = int(input("Year (e.g., 2025): ").strip())
+        month = int(input("Month (1-12): ").strip())
+        _ = date(year, month, 1)
+    except Exception:
+        ui.status_err("Invalid year/month.")
+        return None
+    return year, month
+
+def _txn_table(txns, cur):
+    headers = ("DATE","TYPE","AMOUNT","CATEGORY","DESC")
+    rows = [(t['date'], t['type'], fmt_money(money_of(t), cur), t['category'], t.get('description','')) for t in txns]
+    ui.table(rows, headers=headers, align=["l","l","r","l","l"])
+
+def dashboard_summary():
+    s = _service()
+    if s is None:
         return
 
-    cu = um.get_current_user()
-    txns = _load_user_transactions()
+    cur = s.session.currency
     ui.section("Dashboard")
-    if not txns:
+    d = s.dashboard()
+    if not d["transactions"]:
         ui.status_warn("No transactions yet.")
         return
 
-    total_inc, total_exp, net_all = _totals(txns)
-
-    today = date.today()
-    ym_txns = [t for t in txns if _safe_in_month(t.get("date"), today.year, today.month)]
-    m_inc, m_exp, m_net = _totals(ym_txns)
-
-    print(f"{ui.BOLD}User:{ui.RESET} {cu['username']}    {ui.BOLD}Currency:{ui.RESET} {cu['currency']}")
+    total, month = d["all_time"], d["this_month"]
+    print(f"{ui.BOLD}User:{ui.RESET} {s.username}    {ui.BOLD}Currency:{ui.RESET} {cur}")
     ui.line()
-    print(f"{ui.FG['green']}Total Income{ui.RESET} : {fmt_money(total_inc, cu['currency'])}")
-    print(f"{ui.FG['red']}Total Expense{ui.RESET}: {fmt_money(total_exp, cu['currency'])}")
-    print(f"{ui.FG['cyan']}Net (All){ui.RESET}    : {fmt_money(net_all, cu['currency'])}")
+    print(f"{ui.FG['green']}Total Income{ui.RESET} : {fmt_money(total['income'], cur)}")
+    print(f"{ui.FG['red']}Total Expense{ui.RESET}: {fmt_money(total['expense'], cur)}")
+    print(f"{ui.FG['cyan']}Net (All){ui.RESET}    : {fmt_money(total['net'], cur)}")
     ui.line()
-    print(f"This Month ({today.strftime('%b %Y')})")
-    print(f"  Income : {fmt_money(m_inc, cu['currency'])}")
-    print(f"  Expense: {fmt_money(m_exp, cu['currency'])}")
-    print(f"  Net    : {fmt_money(m_net, cu['currency'])}")
+    print(f"This Month ({_month_name(int(d['month'][:4]), int(d['month'][5:]))})")
+    print(f"  Income : {fmt_money(month['income'], cur)}")
+    print(f"  Expense: {fmt_money(month['expense'], cur)}")
+    print(f"  Net    : {fmt_money(month['net'], cur)}")
     ui.line()
     print("Recent Transactions (latest 5):")
-    for t in sorted(txns, key=lambda x: x.get("date", ""), reverse=True)[:5]:
-        print(f"  {t['date']}  {t['type']:<7}  {t['category']:<14}  {fmt_money(to_decimal(t['amount']), cu['currency'])}  - {t.get('description','')}")
+    for t in d["recent"]:
+        print(f"  {t['date']}  {t['type']:<7}  {t['category']:<14}  {fmt_money(money_of(t), cur)}  - {t.get('description','')}")
 
 def monthly_report():
-    if not um.is_logged_in():
-        ui.status_warn("Please log in first.")
+    s = _service()
+    if s is None:
         return
 
-    cu = um.get_current_user()
-    try:
-        year = int(input("Year (e.g., 2025): ").strip())
-        month = int(input("Month (1-12): ").strip())
-        _ = date(year, month, 1)
-    except Exception:
-        ui.status_err("Invalid year/month.")
+    ym = _ask_month()
+    if ym is None:
         return
-
-    txns = _load_user_transactions()
-    m_txns = [t for t in txns if _safe_in_month(t.get("date"), year, month)]
-    inc, exp, net = _totals(m_txns)
+    year, month = ym
+    r = s.monthly(f"{year:04d}-{month:02d}")
+    cur = s.session.currency
 
     ui.section(f"Monthly Report: {_month_name(year, month)}")
-    print(f"Income : {fmt_money(inc, cu['currency'])}")
-    print(f"Expense: {fmt_money(exp, cu['currency'])}")
-    print(f"Net    : {fmt_money(net, cu['currency'])}")
+    print(f"Income : {fmt_money(r['income'], cur)}")
+    print(f"Expense: {fmt_money(r['expense'], cur)}")
+    print(f"Net    : {fmt_money(r['net'], cur)}")
 
-    if not m_txns:
+    if not r["transactions"]:
         ui.status_warn("No transactions for this month.")
         return
 
     ui.line()
-    headers = ("DATE","TYPE","AMOUNT","CATEGORY","DESC")
-    rows = [(t['date'], t['type'], fmt_money(to_decimal(t['amount']), cu['currency']), t['category'], t.get('description','')) for t in sorted(m_txns, key=lambda x: x.get("date"))]
-    ui.table(rows, headers=headers, align=["l","l","r","l","l"])
+    _txn_table(r["transactions"], cur)
 
 def category_breakdown():
-    if not um.is_logged_in():
-        ui.status_warn("Please log in first.")
+    s = _service()
+    if s is None:
         return
 
-    cu = um.get_current_user()
-    txns = _load_user_transactions()
-
     scope = input("Filter by a specific month? (y/n): ").lower().strip()
     title = "Category Breakdown – All Time"
+    ym = None
     if scope == "y":
-        try:
-            year = int(input("Year (e.g., 2025): ").strip())
-            month = int(input("Month (1-12): ").strip())
-            _ = date(year, month, 1)
-            txns = [t for t in txns if _safe_in_month(t.get("date"), year, month)]
-            title = f"Category Breakdown – {_month_name(year, month)}"
-        except Exception:
-            ui.status_err("Invalid year/month.")
+        picked = _ask_month()
+        if picked is None:
             return
+        year, month = picked
+        ym = f"{year:04d}-{month:02d}"
+        title = f"Category Breakdown – {_month_name(year, month)}"
 
-    cat_totals = _group_by_category(txns)
-    total_exp = sum(cat_totals.values(), Decimal("0"))
+    cats = s.category_breakdown(ym)
 
     ui.section(title)
-    if total_exp == 0:
+    if not cats:
         ui.status_warn("No expense data to show.")
         return
 
     rows = []
-    for cat, amt in sorted(cat_totals.items(), key=lambda kv: kv[1], reverse=True):
-        pct = (amt / total_exp * 100) if total_exp > 0 else Decimal("0")
-        bar = _bar_from_pct(pct)
-        rows.append((cat, fmt_money(amt, cu['currency']), f"{bar} {pct:.1f}%"))
+    for c in cats:
+        bar = _bar_from_pct(c["pct"])
+        rows.append((c["category"], fmt_money(c["amount"], s.session.currency), f"{bar} {c['pct']:.1f}%"))
     ui.table(rows, headers=("CATEGORY","AMOUNT","SHARE"), align=["l","r","l"])
 
 def spending_trend():
-    if not um.is_logged_in():
-        ui.status_warn("Please log in first.")
+    s = _service()
+    if s is None:
         return
 
-    cu = um.get_current_user()
-    txns = _load_user_transactions()
-    buckets = _group_by_month(txns)
-
     try:
         n = int(input("How many recent months to show? (e.g., 6): ").strip() or "6")
     except Exception:
         n = 6
 
-    if not buckets:
+    trend = s.trend(n)
+    if not trend:
         ui.status_warn("No transactions to chart.")
         return
 
-    ordered = sorted(buckets.keys())[-n:]
     ui.section("Spending Trend (Net per Month)")
-    max_abs = Decimal("0")
-    nets = []
-    for y, m in ordered:
-        inc, exp, net = _totals(buckets[(y, m)])
-        nets.append((_month_name(y, m), net))
-        if abs(net) > max_abs:
-            max_abs = abs(net)
+    nets = [(_month_name(int(m["month"][:4]), int(m["month"][5:7])), m["net"]) for m in trend]
+    max_abs = max((abs(net) for _, net in nets), default=Money(0))
     if max_abs == 0:
-        max_abs = Decimal("1")
+        max_abs = Money(1)
 
     width = 24
     for label, net in nets:
-        ratio = (abs(net) / max_abs)                      # Decimal
-        units = int(ratio * Decimal(width) + Decimal("0.5"))  # keep all Decimal
+        units = (abs(net.cents) * width * 2 + max_abs.cents) // (max_abs.cents * 2)  # rounded half up
         if net >= 0:
             line = " " * width + "|" + ui.FG["green"] + "█" * units + ui.RESET
         else:
             line = " " * (width - units) + ui.FG["red"] + "█" * units + ui.RESET + "|"
-        print(f"{label:<12} {line}  {fmt_money(net, cu['currency'])}")
+        print(f"{label:<12} {line}  {fmt_money(net, s.session.currency)}")
 
 def search_filter():
-    if not um.is_logged_in():
-        ui.status_warn("Please log in first.")
+    s = _service()
+    if s is None:
         return
 
-    cu = um.get_current_user()
-    txns = _load_user_transactions()
-    if not txns:
+    if not s.count():
         ui.status_warn("No transactions found.")
         return
 
@@ -228,62 +169,50 @@ def search_filter():
     sort_by = input("Sort by (date/amount/category/type) [date]: ").strip().lower() or "date"
     order = input("Order (asc/desc) [asc]: ").strip().lower() or "asc"
 
-    filtered = []
-    for t in txns:
-        try:
-            d = parse_date(t["date"])
-        except Exception:
-            continue
-        if start:
-            try:
-                if d < parse_date(start):
-                    continue
-            except Exception:
-                ui.status_warn("Invalid start date; ignoring.")
-        if end:
-            try:
-                if d > parse_date(end):
-                    continue
-            except Exception:
-                ui.status_warn("Invalid end date; ignoring.")
-
-        if cat and cat not in (t.get("category", "").lower()):
+    # Invalid bounds are reported and dropped rather than failing the search.
+    amount = lambda value, label: svc.parse_amount(value, label, allow_zero=True)
+    bounds = {}
+    for key, value, label, check in (("start", start, "start date", svc.parse_day),
+                                     ("end", end, "end date", svc.parse_day),
+                                     ("min_amount", min_amt, "min amount", amount),
+                                     ("max_amount", max_amt, "max amount", amount)):
+        if not value:
             continue
+        try:
+            check(value, label)
+            bounds[key] = value
+        except svc.ServiceError:
+            ui.status_warn(f"Invalid {label}; ignoring.")
 
-        amt = to_decimal(t.get("amount", 0))
-        if min_amt:
-            try:
-                if amt < to_decimal(min_amt):
-                    continue
-            except Exception:
-                ui.status_warn("Invalid min amount; ignoring.")
-        if max_amt:
-            try:
-                if amt > to_decimal(max_amt):
-                    continue
-            except Exception:
-                ui.status_warn("Invalid max amount; ignoring.")
-
-        filtered.append(t)
-
-    key_funcs = {
-        "date": lambda x: x.get("date", ""),
-        "amount": lambda x: to_decimal(x.get("amount", 0)),
-        "category": lambda x: x.get("category", ""),
-        "type": lambda x: x.get("type", ""),
-    }
-    key_fn = key_funcs.get(sort_by, key_funcs["date"])
-    reverse = (order == "desc")
-    filtered.sort(key=key_fn, reverse=reverse)
+    filtered = s.search(category=cat, sort_by=sort_by, descending=(order == "desc"), **bounds)
 
     if not filtered:
         ui.status_warn("No matching transactions.")
         return
 
     ui.line()
-    headers = ("DATE","TYPE","AMOUNT","CATEGORY","DESC")
-    rows = [(t['date'], t['type'], fmt_money(to_decimal(t['amount']), cu['currency']), t['category'], t.get('description','')) for t in filtered]
-    ui.table(rows, headers=headers, align=["l","l","r","l","l"])
+    _txn_table(filtered, s.session.currency)
+
+def description_search():
+    s = _service()
+    if s is None:
+        return
+
+    ui.section("Description Search")
+    text = input("Search descriptions for: ").strip()
+    if not text:
+        ui.status_warn("Nothing to search for.")
+        return
+
+    limit = 50
+    hits = s.description_search(text, limit)
+    if not hits:
+        ui.status_warn("No matching transactions.")
+        return
+
+    _txn_table(hits, s.session.currency)
+    if len(hits) == limit:
+        print(f"Showing the best {limit} matches.")
 
 def reports_menu():
     while True:
@@ -293,10 +222,11 @@ def reports_menu():
         print(f"{ui.FG['blue']}3.{ui.RESET} Category Breakdown")
         print(f"{ui.FG['blue']}4.{ui.RESET} Spending Trend (ASCII)")
         print(f"{ui.FG['blue']}5.{ui.RESET} Search & Filter")
-        print(f"{ui.FG['blue']}6.{ui.RESET} Back to Main Menu")
+        print(f"{ui.FG['blue']}6.{ui.RESET} Description Search")
+        print(f"{ui.FG['blue']}7.{ui.RESET} Back to Main Menu")
         ui.line()
 
-        choice = input("Enter your choice (1-6): ").strip()
+        choice = input("Enter your choice (1-7): ").strip()
         if choice == "1":
             dashboard_summary()
         elif choice == "2":
@@ -308,7 +238,9 @@ def reports_menu():
         elif choice == "5":
             search_filter()
         elif choice == "6":
+            description_search()
+        elif choice == "7":
             ui.status_ok("Returning to Main Menu...")
             break
         else:
-            ui.status_warn("Invalid choice. Please enter a number 1–6.")
+            ui.status_warn("Invalid choice. Please enter a number 1–7.")
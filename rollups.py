@@ -0,0 +1,143 @@
+# rollups.py
+# Materialized monthly aggregates: (username, YYYY-MM, type, category) -> [cents, count].
+# transaction_manager applies every insert/edit/delete here, so reports read
+# sums without touching individual transactions.
+
+import os
+from typing import Dict, List, Tuple
+
+from data_manager import DATA_DIR, get_backend, load_json, save_json, file_stamp, diverged, on_flush
+from frame import TransactionFrame, month_of, category_of
+from money import Money, cents_of
+
+ROLLUP_PATH = os.path.join(DATA_DIR, "rollups.json")
+
+# username -> ym -> type -> category -> [sum_cents, count]
+_table: Dict[str, Dict[str, Dict[str, Dict[str, List[int]]]]] = {}
+_ready = False
+_dirty = False      # changed since last saved; written on flush (see save)
+
+# ---------- Maintenance ----------
+def _add(t, sign: int):
+    user, ym, typ, cat = t.get("username"), month_of(t.get("date")), t.get("type"), category_of(t)
+    by_cat = _table.setdefault(user, {}).setdefault(ym, {}).setdefault(typ, {})
+    cell = by_cat.setdefault(cat, [0, 0])
+    cell[0] += sign * cents_of(t)
+    cell[1] += sign
+    if cell[1] == 0:
+        # Drop emptied cells so deleted months/categories don't linger.
+        del by_cat[cat]
+        if not by_cat:
+            del _table[user][ym][typ]
+            if not _table[user][ym]:
+                del _table[user][ym]
+
+def _source_stamp():
+    paths = get_backend().storage_paths("transactions")
+    if diverged(paths):
+        # Another process merged rows in that this table has not seen.
+        return None
+    return [list(s) if s else None for s in file_stamp(paths)]
+
+def apply(added=(), removed=()):
+    """Fold row changes into the table (an edit is remove(before) + add(after)).
+
+    Call ensure() before the change is written, and this after it."""
+    for t in removed:
+        _add(t, -1)
+    for t in added:
+        _add(t, +1)
+    _mark_dirty()
+
+def rebuild(rows):
+    global _ready
+    _table.clear()
+    # One vectorized group-by over the whole history (see frame.py).
+    for (user, ym, typ, cat), (total, n) in TransactionFrame(rows).rollup_cells().items():
+        _table.setdefault(user, {}).setdefault(ym, {}).setdefault(typ, {})[cat] = [total, n]
+    _ready = True
+    _mark_dirty()
+
+def _mark_dirty():
+    global _dirty
+    _dirty = True
+
+def save():
+    """Write the table if it changed. Runs on every full flush and at exit
+    rather than per change: a table left unsaved by a crash is stamped
+    against older transactions, so ensure() rebuilds it."""
+    global _dirty
+    if not _dirty:
+        return
+    _dirty = False
+    save_json(ROLLUP_PATH, {"source": None, "table": _table}, finalize=_stamp_saved)
+
+def _stamp_saved(saved):
+    # Stamped when actually written, after the transactions it describes,
+    # unless another process wrote some since that the table has not seen.
+    if not get_backend().changed_elsewhere("transactions"):
+        saved["source"] = _source_stamp()
+
+on_flush(save)
+
+def ready() -> bool:
+    """Whether the table is loaded (queries will not rebuild it)."""
+    return _ready
+
+def invalidate():
+    global _ready, _dirty
+    _ready = _dirty = False
+_dirty = False      # changed since last saved; written on flush (see save)
+
+def ensure(rows_provider=None):
+    """Load the persisted table, rebuilding it if the transactions changed behind it."""
+    global _ready
+    if _ready:
+        return
+    saved = load_json(ROLLUP_PATH)
+    stamp = _source_stamp()
+    if stamp is not None and isinstance(saved, dict) and saved.get("source") == stamp:
+        _table.clear()
+        _table.update(saved.get("table", {}))
+        _ready = True
+        return
+    if rows_provider is None:
+        import transaction_manager as tm
+        rows_provider = tm.get_transactions_data
+    rebuild(rows_provider())
+
+# ---------- Queries ----------
+def _user(username):
+    ensure()
+    return _table.get(username, {})
+
+def months(username) -> List[str]:
+    return sorted(ym for ym in _user(username) if ym)
+
+def totals(username, ym=None) -> Tuple[Money, Money, Money]:
+    """(income, expense, net) for one month, or all time when ym is None."""
+    inc = exp = 0
+    buckets = _user(username)
+    for m in ([ym] if ym is not None else list(buckets)):
+        by_type = buckets.get(m, {})
+        inc += sum(c[0] for c in by_type.get("income", {}).values())
+        exp += sum(c[0] for c in by_type.get("expense", {}).values())
+    return Money(inc), Money(exp), Money(inc - exp)
+
+def monthly_totals(username) -> Dict[str, Tuple[Money, Money, Money]]:
+    return {ym: totals(username, ym) for ym in months(username)}
+
+def category_expenses(username, ym=None) -> Dict[str, Money]:
+    out: Dict[str, int] = {}
+    buckets = _user(username)
+    for m in ([ym] if ym is not None else list(buckets)):
+        for cat, (cents, _) in buckets.get(m, {}).get("expense", {}).items():
+            out[cat] = out.get(cat, 0) + cents
+    return {cat: Money(c) for cat, c in out.items()}
+
+def count(username, ym=None) -> int:
+    buckets = _user(username)
+    return sum(c[1]
+               for m in ([ym] if ym is not None else list(buckets))
+               for by_cat in buckets.get(m, {}).values()
+               for c in by_cat.values())
@@ -0,0 +1,176 @@
+# scheduler.py
+# Generates recurring-rule occurrences for every user as they fall due.
+#
+#   python scheduler.py run [--poll 60]                    (daemon)
+#   python scheduler.py once [--today YYYY-MM-DD] [--json]  (one pass, e.g. from cron)
+#
+# Every active rule sits in one min-heap keyed by next_date. A tick pops only
+# the rules that are due, expands them (recurrence.due) and commits the new
+# transactions of all users together (recurring_manager.materialize: one
+# insert, one rule update), then pushes each rule back under its new
+# next_date. Finding the due rules costs O(due · log n) for n rules; rules
+# that are not due are never looked at. The commit is a row-level update on
+# sqlite, but the JSON-file backends rewrite the rules file (O(n)) and back
+# it up, once per tick that applied something. Rules with malformed dates
+# are left off the heap and logged.
+#
+# Between ticks the daemon sleeps until the next rule falls due (local
+# midnight of its date), waking every --poll seconds (PFM_SCHEDULER_POLL) to
+# see whether another process (menus, cli.py, server.py) wrote the rules or
+# transactions; changed data is reloaded and the heap rebuilt, as it also is
+# every hour. Status lines go to stderr; `once` prints its results to stdout
+# like cli.py.
+
+import argparse
+import contextlib
+import heapq
+import json
+import os
+import signal
+import sys
+import time
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+
+from data_manager import close_writes, file_stamp, flush_writes, get_backend
+from utils import iso_ordinal
+import recurring_manager as rc
+import transaction_manager as tm
+
+POLL_SECONDS = int(os.environ.get("PFM_SCHEDULER_POLL", "60"))
+REBUILD_EVERY = 3600    # seconds; also catches a write we could not tell apart from ours
+
+class Scheduler:
+    def __init__(self):
+        self._heap: List[Tuple[str, int, dict]] = []   # (next_date, tie-break, rule)
+        self._seq = 0
+        self._stamps = None      # (rules, transactions) storage stamps we are current with
+        self._built = None       # monotonic time of the last heap rebuild
+        self._rules = None       # the rule list the heap was built from
+
+    def _storage_stamps(self):
+        backend = get_backend()
+        return (file_stamp(backend.storage_paths("recurring")),
+                file_stamp(backend.storage_paths("transactions")))
+
+    def refresh(self):
+        """Reload whatever another process changed and rebuild the heap (O(n))
+        if the rules changed; cheap (a few stats) when nothing did."""
+        rules, txns = stamps = self._storage_stamps()
+        hourly = self._built is not None and time.monotonic() - self._built >= REBUILD_EVERY
+        if self._stamps is not None and (txns != self._stamps[1] or hourly):
+            tm.reload_transactions()    # keep reports and rollups in step
+        if self._stamps is None or rules != self._stamps[0] or hourly:
+            rc.reload_recurring()
+            self._rebuild()
+        self._stamps = stamps
+
+    def _rebuild(self):
+        self._rules = rc.get_recurring_data()
+        bad = rc.malformed_rules(self._rules)
+        if bad:
+            _log(f"skipping {len(bad)} rule(s) with malformed dates: "
+                 + ", ".join(f"{r.get('username')}/{r.get('category')} ({r.get('next_date')!r})" for r in bad))
+        skip = {id(r) for r in bad}
+        self._heap = [(r["next_date"], i, r) for i, r in enumerate(self._rules)
+                      if r.get("next_date") and id(r) not in skip]
+        heapq.heapify(self._heap)
+        self._seq = len(self._heap)
+        self._built = time.monotonic()
+
+    def __len__(self):
+        return len(self._heap)
+
+    def next_due(self) -> Optional[str]:
+        return self._heap[0][0] if self._heap else None
+
+    def tick(self, today: str) -> Dict[str, int]:
+        """Materialize every rule due on/before today; occurrences per user."""
+        due = []
+        while self._heap and self._heap[0][0] <= today:
+            due.append(heapq.heappop(self._heap)[2])
+        if not due:
+            return {}
+        counts = rc.materialize(due, today)
+        if rc.get_recurring_data() is not self._rules:
+            # Another process had changed the rules; materialize reloaded them.
+            self._rebuild()
+        else:
+            for r in due:
+                if r["next_date"]:
+                    heapq.heappush(self._heap, (r["next_date"], self._seq, r))
+                    self._seq += 1
+        # Durable before we sleep; and our own write must not read as another
+        # process's on the next refresh.
+        flush_writes()
+        self._stamps = self._storage_stamps()
+        return counts
+
+def _seconds_until(day: str) -> float:
+    midnight = datetime(int(day[:4]), int(day[5:7]), int(day[8:10]))
+    return (midnight - datetime.now()).total_seconds()
+
+def _log(message: str):
+    print(f"{datetime.now():%Y-%m-%d %H:%M:%S} {message}", file=sys.stderr, flush=True)
+
+def _summary(counts: Dict[str, int]) -> str:
+    users = ", ".join(f"{u} {n}" for u, n in sorted(counts.items()))
+    return f"applied {sum(counts.values())} occurrence(s) ({users})"
+
+def run(poll: int = POLL_SECONDS):
+    s = Scheduler()
+    s.refresh()
+    _log(f"scheduler started: {len(s)} active rule(s), next due {s.next_due() or '-'}")
+    while True:
+        counts = s.tick(date.today().isoformat())
+        if counts:
+            _log(_summary(counts))
+        nxt = s.next_due()
+        wait = poll if nxt is None else min(poll, _seconds_until(nxt))
+        time.sleep(max(wait, 1))
+        s.refresh()
+
+def once(today: Optional[str], as_json: bool, out) -> int:
+    s = Scheduler()
+    s.refresh()
+    today = today or date.today().isoformat()
+    counts = s.tick(today)
+    if as_json:
+        out.write(json.dumps({"ok": True, "today": today, "applied": counts,
+                              "total": sum(counts.values()), "next_due": s.next_due()}) + "\n")
+    else:
+        for u, n in sorted(counts.items()):
+            out.write(f"{u}\t{n}\n")
+    return 0
+
+def _day(s):
+    if iso_ordinal(s) is None:
+        raise argparse.ArgumentTypeError("expected YYYY-MM-DD")
+    return s
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(prog="pfm-scheduler", description="Apply recurring rules as they fall due.")
+    sub = p.add_subparsers(dest="command", required=True)
+    r = sub.add_parser("run", help="run as a daemon")
+    r.add_argument("--poll", type=int, default=POLL_SECONDS, help="seconds between checks for changed data")
+    o = sub.add_parser("once", help="apply everything due now and exit")
+    o.add_argument("--today", type=_day, help="apply as of YYYY-MM-DD (default today)")
+    o.add_argument("--json", action="store_true", help="print results as JSON")
+    args = p.parse_args(argv)
+
+    out = sys.stdout
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    # Manager status lines are for people; keep stdout for results.
+    with contextlib.redirect_stdout(sys.stderr):
+        try:
+            if args.command == "run":
+                run(args.poll)
+                return 0
+            return once(args.today, args.json, out)
+        except KeyboardInterrupt:
+            return 0
+        finally:
+            close_writes()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,427 @@
+# server.py
+# Local JSON API over services.py, for several users (and widgets) at once.
+#
+#   python server.py serve [--host 127.0.0.1] [--port 8765]
+#   python server.py bench [--url http://127.0.0.1:8765] [--user sarah --password ...]
+#                          [--requests 2000] [--concurrency 8]
+#
+# POST /login {"username", "password"} returns a token; every other call sends
+# "Authorization: Bearer <token>" and acts for that token's session (there is
+# no global login). Report endpoints run on a bounded worker pool
+# (PFM_REPORT_WORKERS, default 4, with at most PFM_REPORT_QUEUE waiting);
+# when it is full they answer 503 instead of piling up threads.
+#
+#   GET    /transactions                 POST /transactions
+#   GET    /transactions/<id>            PATCH/DELETE /transactions/<id>
+#   GET    /reports/dashboard            GET /reports/monthly?month=YYYY-MM
+#   GET    /reports/categories[?month=]  GET /reports/trend[?months=6]
+#   GET    /reports/search?start=&end=&category=&min=&max=&sort=&order=
+#   GET    /reports/text?q=&limit=
+#   GET    /budgets[?month=]             POST /budgets
+#   GET    /goals  POST /goals           POST /goals/<n>/contribute   DELETE /goals/<n>
+#   GET    /recurring  POST /recurring   POST /recurring/apply        DELETE /recurring/<n>
+#   GET    /reminders  POST /reminders   GET /reminders/due[?days=7]  DELETE /reminders/<n>
+#
+# Goals, rules and reminders are addressed by their 1-based position in the
+# user's list, as the menus show them. Amounts are decimal strings.
+
+import argparse
+import http.client
+import json
+import os
+import re
+import secrets
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from data_manager import close_writes
+import services as svc
+
+REPORT_WORKERS = int(os.environ.get("PFM_REPORT_WORKERS", "4"))
+REPORT_QUEUE = int(os.environ.get("PFM_REPORT_QUEUE", "64"))
+SESSION_TTL = int(os.environ.get("PFM_SESSION_TTL", str(8 * 3600)))   # seconds idle
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+# ---------- Sessions ----------
+class SessionStore:
+    """token -> (Session, last use); idle sessions expire after SESSION_TTL."""
+
+    def __init__(self, ttl: int = SESSION_TTL):
+        self.ttl = ttl
+        self._sessions: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def open(self, session: svc.Session) -> str:
+        token = secrets.token_urlsafe(24)
+        with self._lock:
+            self._sessions[token] = [session, time.monotonic()]
+        return token
+
+    def get(self, token: str) -> Optional[svc.Session]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._sessions.get(token)
+            if entry is None:
+                return None
+            if now - entry[1] > self.ttl:
+                del self._sessions[token]
+                return None
+            entry[1] = now
+            return entry[0]
+
+    def close(self, token: str):
+        with self._lock:
+            self._sessions.pop(token, None)
+
+# ---------- Report pool ----------
+class ReportPool:
+    """A fixed set of worker threads with a bounded backlog."""
+
+    def __init__(self, workers: int = REPORT_WORKERS, queue: int = REPORT_QUEUE):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="report")
+        self._slots = threading.BoundedSemaphore(workers + queue)
+
+    def run(self, fn, *args, **kwargs):
+        if not self._slots.acquire(blocking=False):
+            raise HTTPError(503, "Report workers are busy; retry shortly.")
+        try:
+            return self._executor.submit(fn, *args, **kwargs).result()
+        finally:
+            self._slots.release()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+# ---------- Routes ----------
+# (method, path regex, handler); handlers get (server, session, match, query, body).
+ROUTES = []
+
+def route(method, pattern):
+    def register(fn):
+        ROUTES.append((method, re.compile(f"^{pattern}$"), fn))
+        return fn
+    return register
+
+def _q(query, name, default=None):
+    return query.get(name, [default])[0]
+
+def _int(value, name):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise HTTPError(400, f"{name} must be an integer.")
+
+@route("GET", "/transactions")
+def list_transactions(api, s, m, q, body):
+    return svc.TransactionService(s).list()
+
+@route("POST", "/transactions")
+def add_transaction(api, s, m, q, body):
+    return svc.TransactionService(s).add(body.get("type"), body.get("amount"), body.get("category"),
+                                         body.get("description", ""), body.get("date"))
+
+@route("GET", r"/transactions/(\d+)")
+def get_transaction(api, s, m, q, body):
+    return svc.TransactionService(s).get(int(m[1]))
+
+@route("PATCH", r"/transactions/(\d+)")
+def edit_transaction(api, s, m, q, body):
+    fields = ("type", "amount", "category", "description", "date")
+    return svc.TransactionService(s).edit(int(m[1]), **{k: body[k] for k in fields if k in body})
+
+@route("DELETE", r"/transactions/(\d+)")
+def delete_transaction(api, s, m, q, body):
+    return svc.TransactionService(s).delete(int(m[1]))
+
+@route("GET", "/reports/dashboard")
+def report_dashboard(api, s, m, q, body):
+    return api.pool.run(svc.ReportService(s).dashboard)
+
+@route("GET", "/reports/monthly")
+def report_monthly(api, s, m, q, body):
+    return api.pool.run(svc.ReportService(s).monthly, _q(q, "month", ""))
+
+@route("GET", "/reports/categories")
+def report_categories(api, s, m, q, body):
+    return api.pool.run(svc.ReportService(s).category_breakdown, _q(q, "month"))
+
+@route("GET", "/reports/trend")
+def report_trend(api, s, m, q, body):
+    return api.pool.run(svc.ReportService(s).trend, _int(_q(q, "months", "6"), "months"))
+
+@route("GET", "/reports/search")
+def report_search(api, s, m, q, body):
+    return api.pool.run(svc.ReportService(s).search, start=_q(q, "start"), end=_q(q, "end"),
+                        category=_q(q, "category", ""), min_amount=_q(q, "min"),
+                        max_amount=_q(q, "max"), sort_by=_q(q, "sort", "date"),
+                        descending=_q(q, "order") == "desc")
+
+@route("GET", "/reports/text")
+def report_text(api, s, m, q, body):
+    return api.pool.run(svc.ReportService(s).description_search, _q(q, "q", ""),
+                        _int(_q(q, "limit", "50"), "limit"))
+
+@route("GET", "/budgets")
+def list_budgets(api, s, m, q, body):
+    return api.pool.run(svc.BudgetService(s).status, _q(q, "month"))
+
+@route("POST", "/budgets")
+def set_budget(api, s, m, q, body):
+    return svc.BudgetService(s).set(body.get("category"), body.get("limit"), body.get("month"))
+
+@route("GET", "/goals")
+def list_goals(api, s, m, q, body):
+    return svc.GoalService(s).list()
+
+@route("POST", "/goals")
+def add_goal(api, s, m, q, body):
+    return svc.GoalService(s).add(body.get("name"), body.get("target"), body.get("deadline", ""))
+
+@route("POST", r"/goals/(\d+)/contribute")
+def contribute_goal(api, s, m, q, body):
+    return svc.GoalService(s).contribute(int(m[1]), body.get("amount"))
+
+@route("DELETE", r"/goals/(\d+)")
+def delete_goal(api, s, m, q, body):
+    return svc.GoalService(s).delete(int(m[1]))
+
+@route("GET", "/recurring")
+def list_rules(api, s, m, q, body):
+    return svc.RecurringService(s).list()
+
+@route("POST", "/recurring")
+def add_rule(api, s, m, q, body):
+    return svc.RecurringService(s).add(body.get("type"), body.get("amount"), body.get("category"),
+                                       body.get("frequency"), body.get("next_date"),
+                                       body.get("description", ""),
+                                       **{k: body.get(k) for k in ("interval", "month_day", "weekday",
+                                                                   "nth", "end_date", "max_count")})
+
+@route("POST", "/recurring/apply")
+def apply_rules(api, s, m, q, body):
+    return {"applied": svc.RecurringService(s).apply_due(body.get("today")) or 0}
+
+@route("DELETE", r"/recurring/(\d+)")
+def delete_rule(api, s, m, q, body):
+    return svc.RecurringService(s).delete(int(m[1]))
+
+@route("GET", "/reminders")
+def list_reminders(api, s, m, q, body):
+    return svc.ReminderService(s).list()
+
+@route("GET", "/reminders/due")
+def due_reminders(api, s, m, q, body):
+    return svc.ReminderService(s).due_soon(_int(_q(q, "days", "7"), "days"))
+
+@route("POST", "/reminders")
+def add_reminder(api, s, m, q, body):
+    return svc.ReminderService(s).add(body.get("title"), body.get("due_date"), body.get("notes", ""),
+                                      **{k: body.get(k) for k in ("frequency", "interval", "month_day", "weekday",
+                                                                  "nth", "end_date", "max_count")})
+
+@route("DELETE", r"/reminders/(\d+)")
+def delete_reminder(api, s, m, q, body):
+    return svc.ReminderService(s).delete(int(m[1]))
+
+# ---------- HTTP ----------
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"      # keep-alive: clients reuse connections
+    disable_nagle_algorithm = True     # headers and body go out as separate writes
+    server_version = "pfm"
+
+    def log_message(self, fmt, *args):
+        if self.server.verbose:
+            super().log_message(fmt, *args)
+
+    def _send(self, status: int, payload):
+        data = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _body(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        try:
+            body = json.loads(self.rfile.read(length))
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            raise HTTPError(400, "Body must be JSON.")
+        if not isinstance(body, dict):
+            raise HTTPError(400, "Body must be a JSON object.")
+        return body
+
+    def _token(self) -> str:
+        auth = self.headers.get("Authorization", "")
+        return auth[7:].strip() if auth.startswith("Bearer ") else ""
+
+    def _dispatch(self, method):
+        url = urlsplit(self.path)
+        path = url.path.rstrip("/") or "/"
+        try:
+            body = self._body()
+            if method == "POST" and path == "/login":
+                session = svc.login(body.get("username"), body.get("password") or "")
+                return self._send(200, {"token": self.server.sessions.open(session),
+                                        "username": session.username, "currency": session.currency})
+            token = self._token()
+            session = self.server.sessions.get(token) if token else None
+            if session is None:
+                raise HTTPError(401, "Log in first (POST /login) and send the token.")
+            if method == "POST" and path == "/logout":
+                self.server.sessions.close(token)
+                return self._send(200, {"ok": True})
+
+            allowed = False
+            for verb, pattern, fn in ROUTES:
+                m = pattern.match(path)
+                if m is None:
+                    continue
+                if verb != method:
+                    allowed = True
+                    continue
+                return self._send(200, fn(self.server, session, m, parse_qs(url.query), body))
+            raise HTTPError(405 if allowed else 404, "Method not allowed." if allowed else "Not found.")
+        except HTTPError as e:
+            self._send(e.status, {"error": str(e)})
+        except svc.ServiceError as e:
+            self._send(400, {"error": str(e)})
+        except Exception as e:
+            self.log_error("%s %s failed: %r", method, path, e)
+            self._send(500, {"error": "Internal error."})
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PATCH(self):
+        self._dispatch("PATCH")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+class APIServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, verbose=False):
+        super().__init__(address, Handler)
+        self.sessions = SessionStore()
+        self.pool = ReportPool()
+        self.verbose = verbose
+
+def serve(host="127.0.0.1", port=8765, verbose=False):
+    httpd = APIServer((host, port), verbose)
+    # A service manager stops us with SIGTERM; unwind like Ctrl+C so queued
+    # writes are flushed below.
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    print(f"Serving on http://{host}:{httpd.server_address[1]} (Ctrl+C to stop)", file=sys.stderr)
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        httpd.pool.shutdown()
+        close_writes()
+
+# ---------- Benchmark client ----------
+# A read-heavy mix, roughly what a dashboard widget plus a few people produce.
+BENCH_MIX = [
+    ("GET", "/reports/dashboard", None),
+    ("GET", "/transactions", None),
+    ("GET", "/reports/categories", None),
+    ("GET", "/reports/trend?months=12", None),
+    ("GET", "/budgets", None),
+    ("GET", "/reminders/due", None),
+    ("GET", "/reports/search?min=10&sort=amount&order=desc", None),
+    ("POST", "/transactions", {"type": "expense", "amount": "1.00", "category": "Bench",
+                               "description": "benchmark"}),
+]
+
+def _request(conn, method, path, body=None, token=None):
+    headers = {"Content-Type": "application/json"}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+    resp = conn.getresponse()
+    return resp.status, json.loads(resp.read() or b"null")
+
+def bench(url, username, password, requests=2000, concurrency=8):
+    target = urlsplit(url)
+    connect = lambda: http.client.HTTPConnection(target.hostname, target.port or 80, timeout=30)
+    status, payload = _request(connect(), "POST", "/login", {"username": username, "password": password})
+    if status != 200:
+        print(f"login failed: {payload}", file=sys.stderr)
+        return 1
+    token = payload["token"]
+
+    latencies, errors = [], {}
+    lock = threading.Lock()
+    counter = iter(range(requests))
+
+    def worker():
+        conn = connect()
+        mine = []
+        for n in counter:
+            method, path, body = BENCH_MIX[n % len(BENCH_MIX)]
+            t0 = time.perf_counter()
+            status, _ = _request(conn, method, path, body, token)
+            mine.append(time.perf_counter() - t0)
+            if status != 200:
+                with lock:
+                    errors[status] = errors.get(status, 0) + 1
+        with lock:
+            latencies.extend(mine)
+
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+
+    latencies.sort()
+    pct = lambda p: latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+    print(f"{len(latencies)} requests, {concurrency} clients, {elapsed:.2f}s: {len(latencies) / elapsed:.0f} req/s")
+    print(f"latency ms  p50 {pct(0.50):.1f}  p90 {pct(0.90):.1f}  p99 {pct(0.99):.1f}  max {latencies[-1] * 1000:.1f}")
+    if errors:
+        print("errors: " + ", ".join(f"{s} x{n}" for s, n in sorted(errors.items())))
+    _request(connect(), "POST", "/logout", token=token)
+    return 0 if not errors else 1
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(prog="pfm-server", description="Personal Finance Manager JSON API.")
+    sub = p.add_subparsers(dest="command", required=True)
+    s = sub.add_parser("serve", help="run the API server")
+    s.add_argument("--host", default="127.0.0.1")
+    s.add_argument("--port", type=int, default=8765)
+    s.add_argument("--verbose", action="store_true", help="log every request")
+    b = sub.add_parser("bench", help="load-test a running server")
+    b.add_argument("--url", default="http://127.0.0.1:8765")
+    b.add_argument("--user", required=True)
+    b.add_argument("--password", required=True)
+    b.add_argument("--requests", type=int, default=2000)
+    b.add_argument("--concurrency", type=int, default=8)
+    args = p.parse_args(argv)
+    if args.command == "serve":
+        serve(args.host, args.port, args.verbose)
+        return 0
+    return bench(args.url, args.user, args.password, args.requests, args.concurrency)
+
+if __name__ == "__main__":
+    sys.exit(main())
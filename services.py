@@ -0,0 +1,478 @@
+# services.py
+# Headless API over the managers: no input(), print or ui, and no global login.
+# Each service is bound to a Session (who is acting) and returns plain dicts
+# and lists (amounts as Money); invalid input raises ServiceError. The
+# terminal menus, cli.py and any server are adapters over these classes.
+
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from data_manager import exclusive, get_backend
+from money import Money, money_of
+from utils import iso_ordinal, month_key, today_iso
+import budgets_manager as bm
+import goals_manager as gm
+import query
+import recurrence
+import recurring_manager as rc
+import reminders_manager as rem
+import rollups
+import textsearch
+import transaction_manager as tm
+import user_manager as um
+
+TXN_TYPES = ("income", "expense")
+
+# The managers share module-level lists, indexes and rollups; every service
+# call that changes them holds this lock exclusively, so sessions on other
+# threads never see a half-applied change. Report calls only read rollups and
+# indexes once they are built, so they share it (see _SharedLock.reading).
+class _SharedLock:
+    """`with _lock:` is exclusive (and reentrant); `with _lock.reading(ready):`
+    runs alongside other readers while ready() is true, else exclusively."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._writer = None          # thread holding it exclusively
+        self._depth = 0
+        self._readers = 0
+
+    def __enter__(self):
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer != me:
+                while self._writer is not None or self._readers:
+                    self._cond.wait()
+                self._writer = me
+            self._depth += 1
+        return self
+
+    def __exit__(self, *exc):
+        with self._cond:
+            self._depth -= 1
+            if not self._depth:
+                self._writer = None
+                self._cond.notify_all()
+
+    @contextmanager
+    def reading(self, ready):
+        """ready() tells whether what the call reads is built; building it
+        (a lazy load, a rollup rebuild) changes shared state."""
+        me = threading.get_ident()
+        with self._cond:
+            while self._writer not in (None, me):
+                self._cond.wait()
+            shared = self._writer is None and ready()
+            if shared:
+                self._readers += 1
+        if not shared:
+            with self:
+                yield
+            return
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+_lock = _SharedLock()
+
+class ServiceError(ValueError):
+    """Rejected input; the message is meant for the person who sent it."""
+
+class Session:
+    """Who a service call acts for."""
+    __slots__ = ("username", "currency")
+
+    def __init__(self, username: str, currency: str = "USD"):
+        self.username = username
+        self.currency = currency
+
+    @classmethod
+    def for_user(cls, user: dict) -> "Session":
+        return cls(user["username"], user.get("currency") or "USD")
+
+    def __repr__(self):
+        return f"Session({self.username!r})"
+
+def login(username: str, password: str) -> Session:
+    with _lock:
+        user = um.find_user(username)
+        if user is None or user.get("password") != um.hash_password(password):
+            raise ServiceError("Invalid username or password.")
+        return Session.for_user(user)
+
+# ---------- Validation ----------
+def _now() -> str:
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+def parse_amount(value, field="amount", allow_zero=False) -> Money:
+    try:
+        m = Money.parse(value)
+    except ValueError:
+        raise ServiceError(f"Invalid {field}: {value!r}")
+    if m < 0 or (not allow_zero and m == 0):
+        raise ServiceError(f"{field.capitalize()} must be greater than 0.")
+    return m
+
+def parse_day(value, field="date") -> str:
+    s = str(value or "").strip()
+    if iso_ordinal(s) is None:
+        raise ServiceError(f"Invalid {field}; use YYYY-MM-DD.")
+    return s
+
+def parse_month(value) -> str:
+    s = str(value or "").strip()
+    if iso_ordinal(f"{s}-01") is None:
+        raise ServiceError("Invalid month; use YYYY-MM.")
+    return s
+
+def _type(value) -> str:
+    t = str(value or "").strip().lower()
+    if t not in TXN_TYPES:
+        raise ServiceError("Type must be income or expense.")
+    return t
+
+def _text(value, field) -> str:
+    s = str(value or "").strip()
+    if not s:
+        raise ServiceError(f"{field.capitalize()} cannot be empty.")
+    return s
+
+def _pick(rows: List[dict], index: int, what: str) -> dict:
+    # Goals, rules and reminders have no ids; callers address them by their
+    # 1-based position in the user's list, as the menus show them.
+    if not isinstance(index, int) or not 1 <= index <= len(rows):
+        raise ServiceError(f"No such {what}.")
+    return rows[index - 1]
+
+class _Service:
+    def __init__(self, session: Session):
+        self.session = session
+
+    @property
+    def username(self) -> str:
+        return self.session.username
+
+# ---------- Transactions ----------
+class TransactionService(_Service):
+    def list(self) -> List[dict]:
+        with _lock:
+            return [dict(t) for t in tm.get_user_transactions(self.username)]
+
+    def get(self, txn_id: int) -> dict:
+        with _lock:
+            t = tm.find_transaction(self.username, txn_id)
+            if t is None:
+                raise ServiceError("Transaction not found.")
+            return dict(t)
+
+    def add(self, type, amount, category, description="", date=None) -> dict:
+        t_type = _type(type)
+        cents = parse_amount(amount).cents
+        category = _text(category, "category")
+        date_str = parse_day(date) if date else today_iso()
+        with _lock:
+            now = _now()
+            t = {
+                "id": None,     # see tm.assign_ids
+                "username": self.username,
+                "type": t_type,
+                "amount_cents": cents,
+                "category": category,
+                "date": date_str,
+                "description": str(description or "").strip(),
+                "created_at": now,
+                "updated_at": now,
+            }
+            tm.assign_ids(self.username, [t])
+            tm.insert_transactions([t])
+            return dict(t)
+
+    @staticmethod
+    def check_changes(raw: Dict[str, str]) -> Tuple[dict, List[str]]:
+        """Split raw edits (blank = unchanged) into stored changes and the
+        names of fields whose values were invalid."""
+        changes, invalid = {}, []
+        for field, value in raw.items():
+            value = str(value if value is not None else "").strip()
+            if not value:
+                continue
+            try:
+                if field == "type":
+                    changes["type"] = _type(value)
+                elif field == "amount":
+                    changes["amount_cents"] = parse_amount(value, allow_zero=True).cents
+                elif field == "date":
+                    changes["date"] = parse_day(value)
+                elif field in ("category", "description"):
+                    changes[field] = value
+                else:
+                    invalid.append(field)
+            except ServiceError:
+                invalid.append(field)
+        return changes, invalid
+
+    def edit(self, txn_id: int, **raw) -> dict:
+        changes, invalid = self.check_changes(raw)
+        if invalid:
+            raise ServiceError(f"Invalid {', '.join(invalid)}.")
+        with _lock:
+            t = tm.find_transaction(self.username, txn_id)
+            if t is None:
+                raise ServiceError("Transaction not found.")
+            changes["updated_at"] = _now()
+            tm.update_transaction(t, changes)
+            return dict(t)
+
+    def delete(self, txn_id: int) -> dict:
+        with _lock:
+            t = tm.find_transaction(self.username, txn_id)
+            if t is None:
+                raise ServiceError("Transaction not found.")
+            tm.remove_transactions([t])
+            return dict(t)
+
+# ---------- Reports ----------
+def _totals(inc, exp, net) -> dict:
+    return {"income": inc, "expense": exp, "net": net}
+
+class ReportService(_Service):
+    def count(self, month: Optional[str] = None) -> int:
+        ym = parse_month(month) if month else None
+        with _lock.reading(rollups.ready):
+            return rollups.count(self.username, ym)
+
+    def dashboard(self, today: Optional[date] = None, recent: int = 5) -> dict:
+        ym = (today or date.today()).strftime("%Y-%m")
+        # Backend loads only fill caches keyed by file stamp, safe to share.
+        with _lock.reading(rollups.ready):
+            rows = get_backend().load_for_user("transactions", self.username)
+            return {
+                "transactions": rollups.count(self.username),
+                "all_time": _totals(*rollups.totals(self.username)),
+                "month": ym,
+                "this_month": _totals(*rollups.totals(self.username, ym)),
+                "recent": [dict(t) for t in sorted(rows, key=lambda x: x.get("date", ""), reverse=True)[:recent]],
+            }
+
+    def monthly(self, month: str) -> dict:
+        """Totals of the month and its transactions in date order."""
+        ym = parse_month(month)
+        with _lock.reading(rollups.ready):
+            # Only the month's rows are read (one partition with PFM_STORAGE=partitioned).
+            rows = get_backend().load_for_user_month("transactions", self.username, ym)
+            # Drop malformed dates that share the prefix ("2025-10-32"); the totals skip them too.
+            key = month_key(f"{ym}-01")
+            rows = [t for t in rows if month_key(t.get("date")) == key]
+            return {"month": ym, **_totals(*rollups.totals(self.username, ym)),
+                    "transactions": [dict(t) for t in sorted(rows, key=lambda x: x.get("date", ""))]}
+
+    def category_breakdown(self, month: Optional[str] = None) -> List[dict]:
+        """Expense categories, largest first, with their share in percent."""
+        ym = parse_month(month) if month else None
+        with _lock.reading(rollups.ready):
+            cats = rollups.category_expenses(self.username, ym)
+        total = sum(cats.values(), Money(0))
+        if total <= 0:
+            return []
+        return [{"category": c, "amount": amt, "pct": amt / total * 100}
+                for c, amt in sorted(cats.items(), key=lambda kv: kv[1], reverse=True)]
+
+    def trend(self, months: int = 6) -> List[dict]:
+        """Per-month totals of the most recent months (every month if months <= 0)."""
+        with _lock.reading(rollups.ready):
+            buckets = rollups.monthly_totals(self.username)
+        ordered = sorted(buckets)
+        if months > 0:
+            ordered = ordered[-months:]
+        return [{"month": ym, **_totals(*buckets[ym])} for ym in ordered]
+
+    def search(self, start=None, end=None, category="", min_amount=None, max_amount=None,
+               sort_by="date", descending=False) -> List[dict]:
+        """start/end are YYYY-MM-DD, amounts decimal text or Money; None = unbounded."""
+        lo = iso_ordinal(parse_day(start, "start date")) if start else None
+        hi = iso_ordinal(parse_day(end, "end date")) if end else None
+        min_cents = parse_amount(min_amount, "min amount", allow_zero=True).cents if min_amount else None
+        max_cents = parse_amount(max_amount, "max amount", allow_zero=True).cents if max_amount else None
+        with _lock.reading(lambda: query.built(self.username)):
+            hits = query.search(self.username, start=lo, end=hi, category=category, min_cents=min_cents,
+                                max_cents=max_cents, sort_by=sort_by, descending=descending)
+            return [dict(t) for t in hits]
+
+    def description_search(self, text: str, limit: int = 50) -> List[dict]:
+        with _lock.reading(lambda: textsearch.built(self.username)):
+            return [dict(t) for t in textsearch.search(self.username, text, limit)]
+
+# ---------- Budgets ----------
+class BudgetService(_Service):
+    def set(self, category, limit, month=None) -> dict:
+        category = _text(category, "category")
+        ym = parse_month(month) if month else date.today().strftime("%Y-%m")
+        cents = parse_amount(limit, "limit").cents
+        with _lock:
+            return dict(bm.upsert_budget(self.username, category, ym, cents))
+
+    def status(self, month=None) -> List[dict]:
+        """Budgets of the month with what was spent against each."""
+        ym = parse_month(month) if month else date.today().strftime("%Y-%m")
+        with _lock:
+            spent = rollups.category_expenses(self.username, ym)
+            budgets = bm.user_budgets(self.username, ym)
+        out = []
+        for b in budgets:
+            limit = money_of(b, "limit_cents")
+            used = spent.get(b["category"], Money(0))
+            out.append({"category": b["category"], "month": ym, "limit": limit, "spent": used,
+                        "pct": (used / limit * 100) if limit > 0 else 0.0, "over": used >= limit})
+        return out
+
+# ---------- Goals ----------
+class GoalService(_Service):
+    def list(self) -> List[dict]:
+        with _lock:
+            goals = [dict(g) for g in gm.user_goals(self.username)]
+        for g in goals:
+            target, saved = money_of(g, "target_cents"), money_of(g, "saved_cents")
+            g["pct"] = (saved / target * 100) if target > 0 else 0.0
+        return goals
+
+    def add(self, name, target, deadline="") -> dict:
+        g = {
+            "username": self.username,
+            "goal_name": _text(name, "goal name"),
+            "target_cents": parse_amount(target, "target").cents,
+            "saved_cents": 0,
+            "deadline": parse_day(deadline, "deadline") if deadline else "",
+            "created_at": today_iso(),
+        }
+        with _lock:
+            gm.insert_goal(g)
+        return dict(g)
+
+    def contribute(self, index: int, amount) -> dict:
+        cents = parse_amount(amount).cents
+        # Adds to the balance on disk, not to a copy another process has
+        # since contributed to.
+        with _lock, exclusive("goals") as changed:
+            if changed:
+                gm.reload_goals()
+            g = _pick(gm.user_goals(self.username), index, "goal")
+            before = dict(g)
+            g["saved_cents"] = money_of(g, "saved_cents").cents + cents
+            gm.update_goal(g, before)
+            return dict(g)
+
+    def delete(self, index: int) -> dict:
+        with _lock:
+            g = _pick(gm.user_goals(self.username), index, "goal")
+            gm.remove_goal(g)
+            return dict(g)
+
+# ---------- Recurring ----------
+class RecurringService(_Service):
+    def list(self) -> List[dict]:
+        with _lock:
+            return [dict(r) for r in rc.user_rules(self.username)]
+
+    def add(self, type, amount, category, frequency, next_date=None, description="",
+            interval=None, month_day=None, weekday=None, nth=None, end_date=None, max_count=None) -> dict:
+        """Schedule options are described in recurrence.py; leaving them all
+        out gives a plain daily/weekly/monthly rule."""
+        freq = str(frequency or "").strip().lower()
+        if freq not in rc.FREQS:
+            raise ServiceError(f"Frequency must be one of {', '.join(rc.FREQS)}.")
+        start = parse_day(next_date, "next date") if next_date else today_iso()
+        end = parse_day(end_date, "end date") if end_date else None
+        try:
+            schedule = recurrence.schedule_fields(freq, start, interval, month_day, weekday,
+                                                  nth, end, max_count)
+        except ValueError as e:
+            raise ServiceError(str(e))
+        rule = {
+            "username": self.username,
+            "type": _type(type),
+            "amount_cents": parse_amount(amount).cents,
+            "category": _text(category, "category"),
+            "frequency": freq,
+            "next_date": schedule.pop("next_date"),
+            "description": str(description or "").strip(),
+            "created_at": today_iso(),
+        }
+        rule.update((k, v) for k, v in schedule.items() if k != "frequency")
+        with _lock:
+            rc.insert_rule(rule)
+        return dict(rule)
+
+    def delete(self, index: int) -> dict:
+        with _lock:
+            r = _pick(rc.user_rules(self.username), index, "rule")
+            rc.remove_rule(r)
+            return dict(r)
+
+    def apply_due(self, today=None) -> Optional[int]:
+        """Occurrences generated, or None if the user has no rules."""
+        day = parse_day(today) if today else None
+        with _lock:
+            return rc.apply_due_for([self.username], day).get(self.username)
+
+# ---------- Reminders ----------
+class ReminderService(_Service):
+    """A reminder with a frequency repeats (schedule options as in
+    recurrence.py): list() shows it at its next occurrence and due_soon()
+    returns each occurrence in the window."""
+
+    @staticmethod
+    def _view(day: str, r: dict) -> dict:
+        out = dict(r, due_date=day)
+        if r.get("frequency"):
+            out["repeats"] = recurrence.describe(r)
+        return out
+
+    def _rows(self, today: Optional[date] = None) -> List[Tuple[str, dict]]:
+        # Positions follow the order list() shows.
+        return rem.user_reminders(self.username, (today or date.today()).isoformat())
+
+    def list(self, today: Optional[date] = None) -> List[dict]:
+        with _lock:
+            return [self._view(d, r) for d, r in self._rows(today)]
+
+    def due_soon(self, days: int = 7, today: Optional[date] = None) -> List[dict]:
+        today = today or date.today()
+        lo, hi = today.isoformat(), (today + timedelta(days=days)).isoformat()
+        with _lock:
+            return [self._view(d, r) for d, r in rem.reminders_due(self.username, lo, hi)]
+
+    def add(self, title, due_date, notes="", frequency=None, interval=None, month_day=None,
+            weekday=None, nth=None, end_date=None, max_count=None) -> dict:
+        r = {"username": self.username, "title": _text(title, "title"),
+             "due_date": parse_day(due_date, "due date"), "notes": str(notes or "").strip(),
+             "created_at": today_iso()}
+        if frequency:
+            freq = str(frequency).strip().lower()
+            if freq not in recurrence.FREQS:
+                raise ServiceError(f"Frequency must be one of {', '.join(recurrence.FREQS)}.")
+            if freq == "monthly" and not month_day and weekday in (None, ""):
+                month_day = int(r["due_date"][8:])   # a bill on the 31st stays on the 31st
+            end = parse_day(end_date, "end date") if end_date else None
+            try:
+                schedule = recurrence.schedule_fields(freq, r["due_date"], interval, month_day,
+                                                      weekday, nth, end, max_count)
+            except ValueError as e:
+                raise ServiceError(str(e))
+            r["due_date"] = schedule.pop("next_date")
+            schedule.pop("count", None)     # occurrences are never stored
+            r.update(schedule)
+        with _lock:
+            rem.insert_reminder(r)
+        return dict(r)
+
+    def delete(self, index: int) -> dict:
+        with _lock:
+            _, r = _pick(self._rows(), index, "reminder")
+            rem.remove_reminder(r)
+            return dict(r)
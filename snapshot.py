@@ -0,0 +1,189 @@
+# snapshot.py
+# Binary snapshot of the transactions for fast cold start (JSON-family backends).
+#
+# Layout (little-endian):
+#   b"PFMSNP01" | u32 header length | header JSON | string tables | records
+# The header records the stamp of the JSON files it was built from, the
+# per-user row ranges and where each string table starts. Every string
+# column is stored once per distinct value (u32 offsets + UTF-8 blob);
+# records are fixed width, grouped by user in their original order.
+# The file is opened with mmap and rows are decoded per user on access.
+
+import json
+import mmap
+import os
+import struct
+from typing import Dict, List, Optional
+
+from data_manager import DATA_DIR, file_stamp
+
+SNAPSHOT_PATH = os.path.join(DATA_DIR, "transactions.snap")
+
+MAGIC = b"PFMSNP01"
+# Row keys in stored order; id and amount_cents are int64, the rest strings.
+KEYS = ("id", "username", "type", "amount_cents", "category", "date",
+        "description", "created_at", "updated_at")
+STR_KEYS = ("username", "type", "category", "date", "description", "created_at", "updated_at")
+RECORD = struct.Struct("<qq" + "I" * len(STR_KEYS))
+_U32 = struct.Struct("<I")
+
+def _representable(rows) -> bool:
+    keys = set(KEYS)
+    for t in rows:
+        if t.keys() != keys or type(t["id"]) is not int or type(t["amount_cents"]) is not int:
+            return False
+        if not all(type(t[k]) is str for k in STR_KEYS):
+            return False
+    return True
+
+def write(rows: List[dict], source_paths, path=SNAPSHOT_PATH) -> bool:
+    """Write a snapshot of rows stamped with source_paths; False (and no
+    snapshot) if some row does not fit the fixed schema."""
+    if not _representable(rows):
+        remove(path)
+        return False
+    order: Dict[str, List[int]] = {}
+    for i, t in enumerate(rows):
+        order.setdefault(t["username"], []).append(i)
+
+    tables = {k: {} for k in STR_KEYS}   # column -> {string: index}
+    records = bytearray()
+    users = {}
+    n = 0
+    for username, idxs in order.items():
+        users[username] = [n, len(idxs)]
+        for i in idxs:
+            t = rows[i]
+            codes = [tables[k].setdefault(t[k], len(tables[k])) for k in STR_KEYS]
+            records += RECORD.pack(t["id"], t["amount_cents"], *codes)
+        n += len(idxs)
+
+    blobs, table_meta, pos = [], {}, 0
+    for k in STR_KEYS:
+        encoded = [s.encode("utf-8") for s in tables[k]]
+        offsets, off = [], 0
+        for b in encoded:
+            offsets.append(off)
+            off += len(b)
+        offsets.append(off)
+        chunk = struct.pack(f"<{len(offsets)}I", *offsets) + b"".join(encoded)
+        table_meta[k] = [pos, len(encoded)]
+        blobs.append(chunk)
+        pos += len(chunk)
+
+    header = json.dumps({
+        "stamp": [list(s) if s else None for s in file_stamp(source_paths)],
+        "rows": n, "users": users, "tables": table_meta, "strings_size": pos,
+    }).encode("utf-8")
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC + _U32.pack(len(header)) + header)
+        for chunk in blobs:
+            f.write(chunk)
+        f.write(records)
+    os.replace(tmp, path)
+    return True
+
+def remove(path=SNAPSHOT_PATH):
+    if os.path.exists(path):
+        os.remove(path)
+
+class Snapshot:
+    """Read-only view over a snapshot file."""
+
+    def __init__(self, path=SNAPSHOT_PATH):
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a snapshot")
+        (hlen,) = _U32.unpack_from(self._mm, len(MAGIC))
+        start = len(MAGIC) + _U32.size
+        self.header = json.loads(self._mm[start:start + hlen])
+        self._strings_at = start + hlen
+        self._records_at = self._strings_at + self.header["strings_size"]
+        self._decoded = {k: {} for k in STR_KEYS}   # column -> {index: str}
+        self._user_rows = {}                        # read-only copies, see user_rows
+
+    def is_fresh(self, source_paths) -> bool:
+        return self.header["stamp"] == [list(s) if s else None for s in file_stamp(source_paths)]
+
+    def __len__(self):
+        return self.header["rows"]
+
+    def users(self) -> List[str]:
+        return sorted(self.header["users"])
+
+    def _string(self, column, i):
+        cache = self._decoded[column]
+        s = cache.get(i)
+        if s is None:
+            base = self._strings_at + self.header["tables"][column][0]
+            lo, hi = struct.unpack_from("<II", self._mm, base + 4 * i)
+            count = self.header["tables"][column][1]
+            data = base + 4 * (count + 1)
+            s = cache[i] = self._mm[data + lo:data + hi].decode("utf-8")
+        return s
+
+    def _rows(self, first, count) -> List[dict]:
+        out = []
+        string = self._string
+        for pos in range(self._records_at + first * RECORD.size,
+                         self._records_at + (first + count) * RECORD.size, RECORD.size):
+            tid, cents, user, typ, cat, day, desc, created, updated = RECORD.unpack_from(self._mm, pos)
+            out.append({
+                "id": tid,
+                "username": string("username", user),
+                "type": string("type", typ),
+                "amount_cents": cents,
+                "category": string("category", cat),
+                "date": string("date", day),
+                "description": string("description", desc),
+                "created_at": string("created_at", created),
+                "updated_at": string("updated_at", updated),
+            })
+        return out
+
+    def load_user(self, username) -> List[dict]:
+        """Freshly decoded rows of one user (empty if they have none)."""
+        span = self.header["users"].get(username)
+        return self._rows(*span) if span else []
+
+    def user_rows(self, username) -> List[dict]:
+        """Memoized rows of one user for read-only callers."""
+        rows = self._user_rows.get(username)
+        if rows is None:
+            rows = self._user_rows[username] = self.load_user(username)
+        return rows
+
+    def load_all(self) -> List[dict]:
+        return self._rows(0, len(self))
+
+    def close(self):
+        self._mm.close()
+        self._file.close()
+
+def open_fresh(source_paths, path=SNAPSHOT_PATH) -> Optional[Snapshot]:
+    """The snapshot at path if it matches source_paths, else None (use JSON)."""
+    if not os.path.exists(path):
+        return None
+    try:
+        snap = Snapshot(path)
+    except (OSError, ValueError):
+        return None
+    if not snap.is_fresh(source_paths):
+        snap.close()
+        return None
+    return snap
+
+if __name__ == "__main__":
+    # Build the snapshot from the current JSON (or journal) store.
+    from data_manager import get_backend
+    from money import migrate_rows
+    import ui
+    backend = get_backend()
+    rows = backend.load("transactions")
+    migrate_rows("transactions", rows)
+    if backend.write_snapshot("transactions", rows):
+        ui.status_ok(f"Wrote {SNAPSHOT_PATH} ({len(rows)} rows).")
+    else:
+        ui.status_warn("No snapshot written (unsupported backend or rows outside the fixed schema).")
@@ -0,0 +1,284 @@
+# sqlite_backend.py
+# SQLite storage engine (stdlib sqlite3) selectable via PFM_STORAGE=sqlite.
+# Transactions live in a real table indexed per user; the smaller datasets are
+# stored as JSON bodies keyed by dataset + username.
+
+import json
+import os
+import sqlite3
+import sys
+import threading
+
+from data_manager import DATA_DIR, DURABILITY, FILES, load_json, backup_file, merge_update, report_conflicts
+from money import Money, migrate_rows
+import ui
+
+DB_PATH = os.path.join(DATA_DIR, "pfm.sqlite3")
+
+TXN_COLUMNS = ("id", "username", "type", "amount_cents", "category", "date",
+               "description", "created_at", "updated_at")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    rid         INTEGER PRIMARY KEY,
+    id          INTEGER,
+    username    TEXT NOT NULL,
+    type        TEXT,
+    amount_cents INTEGER,
+    category    TEXT,
+    date        TEXT,
+    description TEXT,
+    created_at  TEXT,
+    updated_at  TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_txn_user_date     ON transactions(username, date);
+CREATE INDEX IF NOT EXISTS ix_txn_user_category ON transactions(username, category);
+CREATE INDEX IF NOT EXISTS ix_txn_user_id       ON transactions(username, id);
+
+CREATE TABLE IF NOT EXISTS records (
+    rid      INTEGER PRIMARY KEY,
+    dataset  TEXT NOT NULL,
+    username TEXT,
+    body     TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_records_dataset_user ON records(dataset, username);
+"""
+
+class SqliteBackend:
+    name = "sqlite"
+    supports_user_load = False
+
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        # One connection shared by every thread (server.py handles requests on
+        # several); each public method holds _lock while it uses it.
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.RLock()
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL can lose the last commits on power loss, never corrupt.
+        self.conn.execute("PRAGMA synchronous=" + ("FULL" if DURABILITY == "always-fsync" else "NORMAL"))
+        self.conn.executescript(SCHEMA)
+        self._migrate_amounts()
+        # dataset -> {id(row): (rid, row)}; the row is kept referenced so its
+        # id() cannot be reused while the mapping exists.
+        self._rids = {}
+        # Read cache for load_for_user*: bumped on our writes, and
+        # PRAGMA data_version changes when another connection commits.
+        self._version = 0
+        self._memo = {}
+        self._loaded_at = {}     # dataset -> PRAGMA data_version at its last load
+
+    def _migrate_amounts(self):
+        # Databases created before amounts became integer cents have a REAL
+        # "amount" column; add amount_cents and fill it (rounded half-up).
+        cols = {r[1] for r in self.conn.execute("PRAGMA table_info(transactions)")}
+        if "amount_cents" in cols:
+            return
+        with self.conn:
+            self.conn.execute("ALTER TABLE transactions ADD COLUMN amount_cents INTEGER")
+            rows = self.conn.execute("SELECT rid, amount FROM transactions").fetchall()
+            self.conn.executemany("UPDATE transactions SET amount_cents = ? WHERE rid = ?",
+                                  [(Money.parse(a if a is not None else 0).cents, rid) for rid, a in rows])
+
+    def _data_version(self):
+        # Changes when another connection commits, never for our own commits.
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _stamp(self):
+        return (self._version, self._data_version())
+
+    def _cached(self, key, build):
+        stamp = self._stamp()
+        hit = self._memo.get(key)
+        if hit and hit[0] == stamp:
+            return hit[1]
+        rows = build()
+        self._memo[key] = (stamp, rows)
+        return rows
+
+    def _written(self):
+        self._version += 1
+        self._memo.clear()
+
+    # ---------- Row <-> storage ----------
+    def _track(self, dataset, row, rid):
+        self._rids.setdefault(dataset, {})[id(row)] = (rid, row)
+
+    def _rid(self, dataset, row):
+        entry = self._rids.get(dataset, {}).get(id(row))
+        return entry[0] if entry else None
+
+    @staticmethod
+    def _txn_values(row):
+        return tuple(row.get(c) for c in TXN_COLUMNS)
+
+    def _insert_row(self, dataset, row):
+        if dataset == "transactions":
+            cur = self.conn.execute(
+                f"INSERT INTO transactions ({', '.join(TXN_COLUMNS)}) VALUES ({', '.join('?' * len(TXN_COLUMNS))})",
+                self._txn_values(row))
+        else:
+            cur = self.conn.execute(
+                "INSERT INTO records (dataset, username, body) VALUES (?, ?, ?)",
+                (dataset, row.get("username"), json.dumps(row)))
+        self._track(dataset, row, cur.lastrowid)
+
+    def _update_row(self, dataset, row):
+        rid = self._rid(dataset, row)
+        if rid is None:
+            self._insert_row(dataset, row)
+            return
+        if dataset == "transactions":
+            self.conn.execute(
+                f"UPDATE transactions SET {', '.join(c + ' = ?' for c in TXN_COLUMNS)} WHERE rid = ?",
+                self._txn_values(row) + (rid,))
+        else:
+            self.conn.execute("UPDATE records SET username = ?, body = ? WHERE rid = ?",
+                              (row.get("username"), json.dumps(row), rid))
+
+    def _stored_row(self, dataset, rid):
+        if dataset == "transactions":
+            rec = self.conn.execute(f"SELECT {', '.join(TXN_COLUMNS)} FROM transactions WHERE rid = ?",
+                                    (rid,)).fetchone()
+            return rec and dict(zip(TXN_COLUMNS, rec))
+        rec = self.conn.execute("SELECT body FROM records WHERE rid = ?", (rid,)).fetchone()
+        return rec and json.loads(rec[0])
+
+    def _delete_row(self, dataset, row):
+        entry = self._rids.get(dataset, {}).pop(id(row), None)
+        if entry is None:
+            return
+        table = "transactions" if dataset == "transactions" else "records"
+        self.conn.execute(f"DELETE FROM {table} WHERE rid = ?", (entry[0],))
+
+    def _select(self, dataset, username=None, ym=None):
+        if dataset == "transactions":
+            sql = f"SELECT rid, {', '.join(TXN_COLUMNS)} FROM transactions"
+            args = ()
+            if username is not None:
+                sql += " WHERE username = ?"
+                args = (username,)
+                if ym is not None:
+                    # Range on the (username, date) index: "YYYY-MM" <= date < "YYYY-MM."
+                    sql += " AND date >= ? AND date < ?"
+                    args += (ym, ym + ".")
+            for rec in self.conn.execute(sql + " ORDER BY rid", args):
+                yield rec[0], dict(zip(TXN_COLUMNS, rec[1:]))
+        else:
+            sql = "SELECT rid, body FROM records WHERE dataset = ?"
+            args = (dataset,)
+            if username is not None:
+                sql += " AND username = ?"
+                args += (username,)
+            for rid, body in self.conn.execute(sql + " ORDER BY rid", args):
+                yield rid, json.loads(body)
+
+    # ---------- Backend API ----------
+    def load(self, dataset):
+        with self._lock:
+            self._loaded_at[dataset] = self._data_version()
+            self._rids[dataset] = {}
+            rows = []
+            for rid, row in self._select(dataset):
+                self._track(dataset, row, rid)
+                rows.append(row)
+            return rows
+
+    def load_for_user(self, dataset, username):
+        # Read-only snapshot; rows are not tracked for later updates.
+        with self._lock:
+            return self._cached((dataset, username, None),
+                                lambda: [row for _, row in self._select(dataset, username)])
+
+    def load_for_user_month(self, dataset, username, ym):
+        if dataset != "transactions":
+            return [r for r in self.load_for_user(dataset, username) if str(r.get("date", ""))[:7] == ym]
+        with self._lock:
+            return self._cached((dataset, username, ym),
+                                lambda: [row for _, row in self._select(dataset, username, ym)])
+
+    def save(self, dataset, rows):
+        with self._lock, self.conn:
+            if dataset == "transactions":
+                self.conn.execute("DELETE FROM transactions")
+            else:
+                self.conn.execute("DELETE FROM records WHERE dataset = ?", (dataset,))
+            self._rids[dataset] = {}
+            for row in rows:
+                self._insert_row(dataset, row)
+            self._written()
+
+    def insert(self, dataset, rows, new_rows):
+        with self._lock, self.conn:
+            for row in new_rows:
+                self._insert_row(dataset, row)
+            self._written()
+
+    def update(self, dataset, rows, changed_rows, before=None):
+        conflicts = 0
+        with self._lock, self.conn:
+            if before is not None:
+                # Read and write under one write lock, so no other connection
+                # commits in between (see merge_update).
+                self.conn.execute("BEGIN IMMEDIATE")
+            for row, b in zip(changed_rows, before or [None] * len(changed_rows)):
+                rid = self._rid(dataset, row)
+                current = None if b is None or rid is None else self._stored_row(dataset, rid)
+                if current is not None:
+                    merged = merge_update(current, row, b)
+                    if merged is None:
+                        conflicts += 1
+                        merged = current          # theirs is kept, here too
+                    row.update(merged)
+                self._update_row(dataset, row)
+            self._written()
+        report_conflicts(dataset, conflicts)
+
+    def delete(self, dataset, rows, removed_rows):
+        with self._lock, self.conn:
+            for row in removed_rows:
+                self._delete_row(dataset, row)
+            self._written()
+
+    def save_all(self, datasets):
+        # Every mutation is already committed row by row; fold the WAL back
+        # into the main file and keep a backup copy of it.
+        with self._lock:
+            self.conn.commit()
+            self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        backup_file(self.path)
+
+    def storage_paths(self, dataset):
+        return (self.path, self.path + "-wal")
+
+    def changed_elsewhere(self, dataset):
+        with self._lock:
+            return self._loaded_at.get(dataset) != self._data_version()
+
+    def open_snapshot(self, dataset):
+        # The database is its own fast-start format.
+        return None
+
+    def is_empty(self):
+        with self._lock:
+            n_txn = self.conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
+            n_rec = self.conn.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+        return n_txn == 0 and n_rec == 0
+
+# ---------- Migration ----------
+def migrate_from_json(force=False, path=DB_PATH):
+    """One-shot copy of the JSON files in data/ into the SQLite database."""
+    backend = SqliteBackend(path)
+    if not backend.is_empty() and not force:
+        ui.status_warn(f"{path} already has data; use --force to overwrite.")
+        return False
+    for dataset, json_path in FILES.items():
+        rows = load_json(json_path)
+        migrate_rows(dataset, rows)
+        backend.save(dataset, rows)
+        ui.status_ok(f"Migrated {len(rows)} {dataset} row(s).")
+    backend.save_all({})
+    return True
+
+if __name__ == "__main__":
+    migrate_from_json(force="--force" in sys.argv[1:])
@@ -0,0 +1,39 @@
+# Shared fixtures: every test works on a scratch copy of data/ in its own
+# directory, since the modules resolve data/ relative to the working directory.
+import glob
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+STORAGES = ("json", "journal", "partitioned", "sqlite")
+
+def copy_data(dest):
+    os.makedirs(os.path.join(dest, "data"), exist_ok=True)
+    for path in glob.glob(os.path.join(ROOT, "data", "*.json")):
+        shutil.copy(path, os.path.join(dest, "data"))
+
+def run_py(cwd, *args, env=None, **kw):
+    """Run python <args> from the repo in cwd (a scratch data directory)."""
+    full_env = dict(os.environ, PYTHONPATH=ROOT, **(env or {}))
+    return subprocess.run([sys.executable, *args], cwd=cwd, env=full_env,
+                          capture_output=True, text=True, **kw)
+
+def migrate(cwd, storage):
+    """Bring the copied JSON data into the given storage backend."""
+    if storage == "sqlite":
+        run_py(cwd, os.path.join(ROOT, "sqlite_backend.py"), check=True)
+    elif storage == "partitioned":
+        run_py(cwd, os.path.join(ROOT, "partition_backend.py"), check=True)
+
+@pytest.fixture
+def scratch(tmp_path):
+    """A scratch directory holding a copy of data/."""
+    copy_data(str(tmp_path))
+    return str(tmp_path)
@@ -0,0 +1,33 @@
+# cli.py txn add --file: input that is not a list of JSON objects is
+# rejected with a JSON error and exit status 1, not a traceback.
+import json
+import os
+
+import pytest
+
+from conftest import ROOT, run_py
+
+CLI = os.path.join(ROOT, "cli.py")
+
+@pytest.mark.parametrize("text, error", [
+    ('{"amount": "5"}\n{"amount": \n', "malformed JSON on line 2"),
+    ('[{"amount": "5"},', "malformed JSON"),
+    ('[{"amount": "5"}, 7]', "record 2 is not a JSON object"),
+    ('"just a string"\n', "record 1 is not a JSON object"),
+])
+def test_txn_add_rejects_bad_records(scratch, text, error):
+    with open(os.path.join(scratch, "rows.jsonl"), "w", encoding="utf-8") as f:
+        f.write(text)
+    before = os.path.getmtime(os.path.join(scratch, "data", "transactions.json"))
+    p = run_py(scratch, CLI, "txn", "add", "--user", "sarah", "--file", "rows.jsonl", "--json")
+    assert p.returncode == 1, p.stderr
+    assert "Traceback" not in p.stderr
+    result = json.loads(p.stdout)
+    assert result["ok"] is False and result["error"].startswith(error)
+    assert os.path.getmtime(os.path.join(scratch, "data", "transactions.json")) == before
+
+def test_txn_add_from_stdin(scratch):
+    rows = "\n".join(json.dumps({"amount": a, "category": "Stdin"}) for a in ("1.50", "2"))
+    p = run_py(scratch, CLI, "txn", "add", "--user", "sarah", "--file", "-", "--json", input=rows)
+    assert p.returncode == 0, p.stderr
+    assert json.loads(p.stdout)["added"] == 2
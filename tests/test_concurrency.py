@@ -0,0 +1,127 @@
+# Several processes adding transactions at once: every row must survive and
+# every (username, id) must stay unique on each storage backend.
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import ROOT, STORAGES, migrate, run_py
+
+WRITERS, ROWS_EACH = 4, 15
+
+WORKER = """
+import sys, cli
+for i in range({rows}):
+    cli.main(["txn", "add", "--user", "sarah", "--amount", "1", "--category", "Worker",
+              "--description", sys.argv[1] + "-" + str(i)])
+"""
+
+READ_KEYS = """
+import json, transaction_manager as tm
+print(json.dumps([[t["username"], t["id"], t["description"]] for t in tm.get_transactions_data()]))
+"""
+
+def _rows(cwd, storage):
+    out = run_py(cwd, "-c", READ_KEYS, env={"PFM_STORAGE": storage}, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+@pytest.mark.parametrize("storage", STORAGES)
+def test_concurrent_cli_writers_keep_ids_unique(scratch, storage):
+    migrate(scratch, storage)
+    before = len(_rows(scratch, storage))
+    env = dict(os.environ, PYTHONPATH=ROOT, PFM_STORAGE=storage)
+    procs = [subprocess.Popen([sys.executable, "-c", WORKER.format(rows=ROWS_EACH), f"w{n}"],
+                              cwd=scratch, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+             for n in range(WRITERS)]
+    for p in procs:
+        assert p.wait(timeout=120) == 0, p.stderr.read()
+
+    rows = _rows(scratch, storage)
+    assert len(rows) == before + WRITERS * ROWS_EACH
+    assert len({(u, i) for u, i, _ in rows}) == len(rows)
+    added = {d for _, _, d in rows if d[:1] == "w" and "-" in d}
+    assert len(added) == WRITERS * ROWS_EACH
+
+# ---------- Read-modify-write ----------
+# Each worker loads the data, waits until every worker has, then applies
+# its update: all of them start from the same (soon stale) rows.
+GO = """
+import os, sys, time
+open("ready-" + sys.argv[1], "w").close()
+while len([f for f in os.listdir(".") if f.startswith("ready-")]) < int(sys.argv[2]):
+    time.sleep(0.01)
+"""
+
+APPLY_RULES = """
+import recurring_manager as rc
+rc.get_recurring_data()
+""" + GO + """
+rc.apply_due_for(["sarah"], "2026-01-15")
+"""
+
+RULES = [
+    {"username": "sarah", "type": "expense", "amount_cents": 700, "category": "Race weekly",
+     "frequency": "weekly", "next_date": "2025-10-06", "created_at": "2025-10-01"},
+    {"username": "sarah", "type": "expense", "amount_cents": 5000, "category": "Race monthly",
+     "frequency": "monthly", "next_date": "2025-09-30", "created_at": "2025-09-01"},
+]
+
+def _run_together(cwd, storage, script, n=WRITERS):
+    env = dict(os.environ, PYTHONPATH=ROOT, PFM_STORAGE=storage)
+    procs = [subprocess.Popen([sys.executable, "-c", script, str(k), str(n)], cwd=cwd, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+             for k in range(n)]
+    for p in procs:
+        assert p.wait(timeout=120) == 0, p.stderr.read()
+
+@pytest.mark.parametrize("storage", STORAGES)
+def test_concurrent_rule_application_generates_each_occurrence_once(scratch, storage):
+    with open(os.path.join(scratch, "data", "recurring.json"), "w", encoding="utf-8") as f:
+        json.dump(RULES, f)
+    migrate(scratch, storage)
+    _run_together(scratch, storage, APPLY_RULES)
+
+    out = run_py(scratch, "-c", READ_KEYS.replace('t["description"]', 't["category"], t["date"]'),
+                 env={"PFM_STORAGE": storage}, check=True).stdout
+    rows = json.loads(out.strip().splitlines()[-1])
+    weekly = sorted(d for _, _, c, d in rows if c == "Race weekly")
+    monthly = sorted(d for _, _, c, d in rows if c == "Race monthly")
+    assert len(weekly) == len(set(weekly)) == 15          # 2025-10-06 .. 2026-01-12
+    assert monthly == ["2025-09-30", "2025-10-30", "2025-11-30", "2025-12-30"]
+
+CONTRIBUTE = """
+import sys, data_manager, goals_manager as gm, services as svc
+gm.get_goals_data()
+""" + GO + """
+svc.GoalService(svc.Session("sarah")).contribute(1, str(10 * (int(sys.argv[1]) + 1)))
+assert data_manager.write_error() is None
+"""
+
+READ_GOALS = """
+import json, goals_manager as gm
+print(json.dumps([[g["goal_name"], g["saved_cents"]] for g in gm.user_goals("sarah")]))
+"""
+
+@pytest.mark.parametrize("storage", STORAGES)
+def test_concurrent_contributions_all_count(scratch, storage):
+    migrate(scratch, storage)
+    _run_together(scratch, storage, CONTRIBUTE)
+    out = run_py(scratch, "-c", READ_GOALS, env={"PFM_STORAGE": storage}, check=True).stdout
+    goals = json.loads(out.strip().splitlines()[-1])
+    assert goals[0] == ["New Laptop", 500000 + 1000 + 2000 + 3000 + 4000]
+
+def test_update_of_a_row_changed_elsewhere_keeps_theirs():
+    from data_manager import RowChanges
+    mine = {"username": "sarah", "goal_name": "Car", "saved_cents": 100, "deadline": ""}
+    before = dict(mine, saved_cents=0)
+    theirs = [dict(before, saved_cents=50), {"username": "ali", "goal_name": "Car", "saved_cents": 7}]
+    changes = RowChanges("goals").update([mine], [before])
+    assert changes.apply(theirs)[0]["saved_cents"] == 50
+    assert changes.conflicts == [("sarah", "Car", None)]
+
+    # Edits to different fields of the row are both kept.
+    theirs[0] = dict(before, deadline="2027-01-01")
+    assert changes.apply(theirs)[0] == dict(mine, deadline="2027-01-01")
+    assert changes.conflicts == []
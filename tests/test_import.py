@@ -0,0 +1,87 @@
+# import_export.import_transactions_csv: a checkpoint never gets ahead of
+# the rows it covers, even when saves are held back (PFM_DURABILITY=on-exit)
+# and the process dies right after writing it.
+import json
+import os
+
+import pytest
+
+from conftest import STORAGES, migrate, run_py
+
+CSV = """id,username,type,amount,category,date,description
+901,sarah,expense,1.00,Import,2025-10-01,row 901
+902,sarah,expense,2.00,Import,2025-10-02,row 902
+903,sarah,expense,3.00,Import,2025-10-03,row 903
+"""
+
+CRASH = """
+import os, import_export as ie
+write = ie._write_checkpoint
+def write_then_die(*args):
+    write(*args)
+    os._exit(3)          # no flush, no atexit
+ie._write_checkpoint = write_then_die
+ie.import_transactions_csv("bank.csv", chunk_size=1, resume=False)
+"""
+
+RESUME = """
+import json, data_manager, import_export as ie, transaction_manager as tm
+stats = ie.import_transactions_csv("bank.csv", chunk_size=1, resume=True)
+data_manager.close_writes()
+rows = sorted(t["description"] for t in tm.get_transactions_data() if t["category"] == "Import")
+print(json.dumps({"imported": stats["imported"], "rows": rows}))
+"""
+
+@pytest.mark.parametrize("storage", STORAGES)
+def test_crash_after_checkpoint_loses_no_rows(scratch, storage):
+    migrate(scratch, storage)
+    with open(os.path.join(scratch, "bank.csv"), "w", encoding="utf-8") as f:
+        f.write(CSV)
+    env = {"PFM_STORAGE": storage, "PFM_DURABILITY": "on-exit"}
+
+    crashed = run_py(scratch, "-c", CRASH, env=env)
+    assert crashed.returncode == 3, crashed.stderr
+    assert os.path.exists(os.path.join(scratch, "bank.csv.import.json"))
+
+    p = run_py(scratch, "-c", RESUME, env=env)
+    assert p.returncode == 0, p.stderr
+    out = json.loads(p.stdout.strip().splitlines()[-1])
+    assert out == {"imported": 3, "rows": ["row 901", "row 902", "row 903"]}
+
+# Ids given in the CSV must not collide with stored ones (or each other), and
+# ids handed out later start past them.
+DUP_CSV = """id,username,type,amount,category,date,description
+3,sarah,expense,1.00,Import,2025-10-01,taken id
+950,sarah,expense,2.00,Import,2025-10-02,row 950
+950,sarah,expense,3.00,Import,2025-10-03,repeated id
+"""
+
+IMPORT = """
+import json, data_manager, import_export as ie
+stats = ie.import_transactions_csv("bank.csv", chunk_size=2, resume=False)
+data_manager.close_writes()
+print(json.dumps(stats))
+"""
+
+READ_TXNS = """
+import json, transaction_manager as tm
+rows = [t for t in tm.get_transactions_data() if t["username"] == "sarah"]
+print(json.dumps({str(i): sum(t["id"] == i for t in rows) for i in (3, 950)}))
+"""
+
+@pytest.mark.parametrize("storage", STORAGES)
+def test_import_rejects_ids_in_use(scratch, storage):
+    migrate(scratch, storage)
+    with open(os.path.join(scratch, "bank.csv"), "w", encoding="utf-8") as f:
+        f.write(DUP_CSV)
+    p = run_py(scratch, "-c", IMPORT, env={"PFM_STORAGE": storage})
+    assert p.returncode == 0, p.stderr
+    assert json.loads(p.stdout.strip().splitlines()[-1]) == {
+        "imported": 1, "rejected": 2, "reasons": {"duplicate id": 2}}
+    # Even a process that loaded the rows before the import will not reuse 950.
+    with open(os.path.join(scratch, "data", "transaction_ids.json"), encoding="utf-8") as f:
+        assert json.load(f)["sarah"] == 950
+
+    p = run_py(scratch, "-c", READ_TXNS, env={"PFM_STORAGE": storage})
+    assert p.returncode == 0, p.stderr
+    assert json.loads(p.stdout.strip().splitlines()[-1]) == {"3": 1, "950": 1}
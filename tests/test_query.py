@@ -0,0 +1,49 @@
+# query.UserIndex kept up to date with add/remove must answer every search
+# exactly like an index rebuilt from the user's current rows.
+import random
+
+import pytest
+
+import query
+from utils import iso_ordinal
+
+CATEGORIES = ("Food", "food court", "Rent", "Travel", "")
+
+def _row(rng, n):
+    date = f"2025-{rng.randint(1, 3):02d}-{rng.randint(1, 31):02d}"   # some invalid (02-30)
+    return {"username": "u", "id": n, "type": rng.choice(("income", "expense")),
+            "amount_cents": rng.choice((500, 1000, 1250, rng.randint(1, 5000))),
+            "category": rng.choice(CATEGORIES), "date": date}
+
+def _random_search(rng):
+    lo, hi = sorted(rng.sample(range(iso_ordinal("2024-12-20"), iso_ordinal("2025-04-10")), 2))
+    pred = {"sort_by": rng.choice(query.SORT_KEYS), "descending": rng.random() < 0.5}
+    if rng.random() < 0.6:
+        pred["start"], pred["end"] = lo, hi
+    if rng.random() < 0.4:
+        pred["min_cents"], pred["max_cents"] = sorted((rng.randint(0, 5000), rng.randint(0, 5000)))
+    if rng.random() < 0.4:
+        pred["category"] = rng.choice(("food", "rent", "t", "x"))
+    return pred
+
+@pytest.mark.parametrize("seed", range(4))
+def test_incremental_index_matches_rebuilt(seed):
+    rng = random.Random(seed)
+    rows = [_row(rng, n) for n in range(60)]
+    idx = query.UserIndex(rows)
+    for n in range(60, 400):
+        op = rng.random()
+        if op < 0.4 or not rows:
+            t = _row(rng, n)
+            rows.append(t)
+            idx.add(t)
+        elif op < 0.7:
+            t = rng.choice(rows)
+            t.update({k: v for k, v in _row(rng, n).items() if k in ("date", "amount_cents", "category")})
+            idx.add(t)
+        else:
+            t = rows.pop(rng.randrange(len(rows)))
+            idx.remove(t)
+        pred = _random_search(rng)
+        expected = query.UserIndex(rows).search(**pred)
+        assert [id(t) for t in idx.search(**pred)] == [id(t) for t in expected], pred
@@ -0,0 +1,187 @@
+# Property tests for recurrence.py: due(), between() and next_on_or_after()
+# against a step-by-step reference built on the original _advance loop.
+import calendar
+import random
+from datetime import date, timedelta
+
+import pytest
+
+import recurrence
+
+# ---------- Reference ----------
+def _advance(date_str: str, freq: str) -> str:
+    # recurring_manager._advance as it was before recurrence.py, verbatim.
+    y, m, d = map(int, date_str.split("-"))
+    dt = date(y, m, d)
+    if freq == "daily":
+        nd = date.fromordinal(dt.toordinal()+1)
+    elif freq == "weekly":
+        nd = date.fromordinal(dt.toordinal()+7)
+    else:  # monthly
+        nm = m + 1
+        ny = y + (nm-1)//12
+        nm = 1 + (nm-1)%12
+        # clamp day
+        last_day = 28
+        while True:
+            try:
+                nd = date(ny, nm, min(d, 31))
+                break
+            except ValueError:
+                d -= 1
+    return nd.isoformat()
+
+def _legacy_due(rule, today):
+    """The old apply_due loop: one _advance per occurrence."""
+    out, nd = [], rule["next_date"]
+    while nd <= today:
+        out.append(nd)
+        nd = _advance(nd, rule["frequency"])
+    return out, nd
+
+def _weekday_days(y, m, weekday):
+    return [d for d in range(1, calendar.monthrange(y, m)[1] + 1) if date(y, m, d).weekday() == weekday]
+
+def _occurrences(rule):
+    """Every occurrence of rule in order, one brute-force step at a time
+    (ignoring end_date and max_count)."""
+    interval = rule.get("interval", 1)
+    cur = rule["next_date"]
+    yield cur
+    if rule["frequency"] != "monthly":
+        while True:
+            for _ in range(interval):
+                cur = _advance(cur, rule["frequency"])
+            yield cur
+    y, m, day = int(cur[:4]), int(cur[5:7]), int(cur[8:])
+    while True:
+        m += interval
+        y, m = y + (m - 1) // 12, (m - 1) % 12 + 1
+        last = calendar.monthrange(y, m)[1]
+        if rule.get("weekday") is not None:
+            days = _weekday_days(y, m, rule["weekday"])
+            nth = rule["nth"]
+            if nth != -1 and nth > len(days):
+                continue
+            d = days[-1] if nth == -1 else days[nth - 1]
+        elif rule.get("month_day") == "last":
+            d = last
+        elif rule.get("month_day"):
+            d = min(rule["month_day"], last)
+        else:
+            day = min(day, last)      # the old clamping sticks
+            d = day
+        yield date(y, m, d).isoformat()
+
+def _reference_due(rule, today):
+    """(occurrences due by today, new next_date) per the rule's limits."""
+    end = rule.get("end_date")
+    limit = rule["max_count"] - rule.get("count", 0) if rule.get("max_count") else None
+    out = []
+    for d in _occurrences(rule):
+        if (limit is not None and len(out) >= limit) or (end and d > end):
+            return out, ""
+        if d > today:
+            return out, d
+        out.append(d)
+
+def _random_rule(rng, legacy=False):
+    freq = rng.choice(recurrence.FREQS)
+    start = date(2019, 1, 1) + timedelta(days=rng.randint(0, 2000))
+    if legacy:
+        return {"frequency": freq, "next_date": start.isoformat()}
+    options = {}
+    if rng.random() < 0.5:
+        options["interval"] = rng.randint(1, 4)
+    if freq == "monthly":
+        pick = rng.random()
+        if pick < 0.3:
+            options["month_day"] = rng.choice([1, 15, 28, 29, 30, 31, "last"])
+        elif pick < 0.6:
+            options["weekday"], options["nth"] = rng.randint(0, 6), rng.choice([1, 2, 3, 4, 5, -1])
+    if rng.random() < 0.3:
+        options["end_date"] = (start + timedelta(days=rng.randint(0, 1500))).isoformat()
+    if rng.random() < 0.3:
+        options["max_count"] = rng.randint(1, 40)
+    return recurrence.schedule_fields(freq, start.isoformat(), **options)
+
+def _random_day(rng, rule, span=1200):
+    start = date.fromisoformat(rule["next_date"])
+    return (start + timedelta(days=rng.randint(-60, span))).isoformat()
+
+# ---------- Legacy rules ----------
+@pytest.mark.parametrize("seed", range(5))
+def test_due_matches_legacy_advance_loop(seed):
+    rng = random.Random(seed)
+    for _ in range(500):
+        rule = _random_rule(rng, legacy=True)
+        today = _random_day(rng, rule, 400 if rule["frequency"] == "daily" else 1500)
+        assert recurrence.due(rule, today) == _legacy_due(rule, today), (rule, today)
+
+def test_reference_matches_legacy_loop_for_plain_rules():
+    rng = random.Random(99)
+    for _ in range(500):
+        rule = _random_rule(rng, legacy=True)
+        today = _random_day(rng, rule, 800)
+        assert _reference_due(rule, today) == _legacy_due(rule, today)
+
+def test_applying_in_steps_equals_applying_once():
+    rng = random.Random(7)
+    for _ in range(500):
+        rule = _random_rule(rng, legacy=rng.random() < 0.5)
+        mid, today = sorted((_random_day(rng, rule), _random_day(rng, rule)))
+        first, nxt = recurrence.due(rule, mid)
+        later = dict(rule, next_date=nxt)
+        if rule.get("max_count"):
+            later["count"] = rule.get("count", 0) + len(first)
+        rest, final = recurrence.due(later, today)
+        assert (first + rest, final) == recurrence.due(rule, today), (rule, mid, today)
+
+# ---------- Richer schedules ----------
+@pytest.mark.parametrize("seed", range(5))
+def test_due_matches_reference(seed):
+    rng = random.Random(100 + seed)
+    for _ in range(500):
+        rule = _random_rule(rng)
+        today = _random_day(rng, rule)
+        assert recurrence.due(rule, today) == _reference_due(rule, today), (rule, today)
+
+@pytest.mark.parametrize("seed", range(5))
+def test_between_and_next_match_reference(seed):
+    rng = random.Random(200 + seed)
+    for _ in range(400):
+        rule = _random_rule(rng, legacy=rng.random() < 0.2)
+        lo = _random_day(rng, rule)
+        hi = (date.fromisoformat(lo) + timedelta(days=rng.randint(0, 120))).isoformat()
+        upto_hi, _ = _reference_due(rule, hi)
+        assert recurrence.between(rule, lo, hi) == [d for d in upto_hi if d >= lo], (rule, lo, hi)
+
+        before_lo, nxt = _reference_due(rule, lo)
+        expected = before_lo[-1] if before_lo and before_lo[-1] == lo else nxt
+        assert recurrence.next_on_or_after(rule, lo) == expected, (rule, lo)
+
+# ---------- Cases worth spelling out ----------
+def test_month_end_clamping():
+    legacy = {"frequency": "monthly", "next_date": "2025-01-31"}
+    assert recurrence.due(legacy, "2025-04-30") == (["2025-01-31", "2025-02-28", "2025-03-28", "2025-04-28"], "2025-05-28")
+    anchored = recurrence.schedule_fields("monthly", "2025-01-31", month_day=31)
+    assert recurrence.due(anchored, "2025-04-30")[0] == ["2025-01-31", "2025-02-28", "2025-03-31", "2025-04-30"]
+    last = recurrence.schedule_fields("monthly", "2024-01-10", month_day="last")
+    assert recurrence.due(last, "2024-03-31")[0] == ["2024-01-31", "2024-02-29", "2024-03-31"]
+
+def test_interval_end_date_and_max_count():
+    every_2_weeks = recurrence.schedule_fields("weekly", "2025-01-01", interval=2, end_date="2025-02-10")
+    assert recurrence.due(every_2_weeks, "2025-12-31") == (["2025-01-01", "2025-01-15", "2025-01-29"], "")
+    three = recurrence.schedule_fields("daily", "2025-01-01", max_count=3)
+    assert recurrence.due(three, "2025-01-02") == (["2025-01-01", "2025-01-02"], "2025-01-03")
+    assert recurrence.due(dict(three, count=2, next_date="2025-01-03"), "2025-12-31") == (["2025-01-03"], "")
+    last_friday = recurrence.schedule_fields("monthly", "2025-01-01", weekday="fri", nth="last", interval=3)
+    assert recurrence.between(last_friday, "2025-03-01", "2025-12-31") == ["2025-04-25", "2025-07-25", "2025-10-31"]
+
+def test_schedule_fields_rejects_bad_options():
+    for bad in ({"interval": "0"}, {"month_day": "32"}, {"weekday": "xyz"},
+                {"weekday": "mon", "nth": "6"}, {"max_count": "-1"}):
+        with pytest.raises(ValueError):
+            recurrence.schedule_fields("monthly", "2025-01-01", **bad)
+    with pytest.raises(ValueError):
+        recurrence.schedule_fields("daily", "2025-01-01", weekday="mon")
@@ -0,0 +1,117 @@
+# reminders_manager: the due-date index with equal dates, and reminders_due
+# merging one-shot reminders with the occurrences of repeating ones.
+import json
+
+import pytest
+
+import reminders_manager as rm
+from conftest import run_py
+
+def _rem(title, due, username="sarah", **schedule):
+    return {"username": username, "title": title, "due_date": due, "notes": "", **schedule}
+
+def _same(rows, expected):
+    return [id(r) for r in rows] == [id(r) for r in expected]
+
+def test_due_index_keeps_equal_dates_in_insertion_order():
+    # a, b and c are equal dicts: removal must go by identity, not value.
+    a, b, c = _rem("Bill", "2025-05-01"), _rem("Bill", "2025-05-01"), _rem("Bill", "2025-05-01")
+    early, late = _rem("Early", "2025-04-30"), _rem("Late", "2025-05-02")
+    idx = rm.DueIndex()
+    for r in (a, late, b, early, c):
+        idx.add(r)
+    assert _same(idx.rows, [early, a, b, c, late])
+    assert idx.dates == sorted(idx.dates)
+    assert _same(idx.between("2025-05-01", "2025-05-01"), [a, b, c])
+
+    idx.remove(b)
+    assert _same(idx.rows, [early, a, c, late])
+    idx.remove(a)
+    idx.add(b)                     # re-added: after the equal dates still there
+    assert _same(idx.rows, [early, c, b, late])
+    assert _same(idx.between("2025-04-01", "2025-04-30"), [early])
+    assert idx.between("2025-05-03", "2025-06-01") == []
+    for r in (early, c, b, late):
+        idx.remove(r)
+    assert idx.rows == [] and idx.dates == []
+
+@pytest.fixture
+def reminders(monkeypatch):
+    rows = [
+        _rem("Tax", "2025-03-10"),
+        _rem("Card", "2025-03-31"),
+        _rem("Old", "2025-02-27"),
+        _rem("Rent", "2025-01-31", frequency="monthly"),       # clamped: Feb 28, Mar 28
+        _rem("Gym", "2025-03-03", frequency="weekly"),
+        _rem("Trial", "2025-03-20", frequency="daily", max_count=2, count=0),
+        _rem("Licence", "2025-03-15", username="ali"),
+        _rem("Rates", "2024-12-31", username="ali", frequency="monthly", interval=3),
+    ]
+    monkeypatch.setattr(rm, "_reminders", rows)
+    monkeypatch.setattr(rm, "_by_user", None)
+    monkeypatch.setattr(rm, "_everyone", rm.DueIndex())
+    monkeypatch.setattr(rm, "_repeating", {})
+    return rows
+
+def _titles(hits):
+    return [(d, r["username"], r["title"]) for d, r in hits]
+
+def test_reminders_due_merges_one_shot_and_repeating(reminders):
+    assert _titles(rm.reminders_due("sarah", "2025-03-01", "2025-03-31")) == [
+        ("2025-03-03", "sarah", "Gym"),
+        ("2025-03-10", "sarah", "Tax"),        # on a tie the one-shot reminder comes first
+        ("2025-03-10", "sarah", "Gym"),
+        ("2025-03-17", "sarah", "Gym"),
+        ("2025-03-20", "sarah", "Trial"),
+        ("2025-03-21", "sarah", "Trial"),
+        ("2025-03-24", "sarah", "Gym"),
+        ("2025-03-28", "sarah", "Rent"),
+        ("2025-03-31", "sarah", "Card"),
+        ("2025-03-31", "sarah", "Gym"),
+    ]
+    assert _titles(rm.reminders_due("sarah", "2025-02-27", "2025-02-28")) == [
+        ("2025-02-27", "sarah", "Old"), ("2025-02-28", "sarah", "Rent")]
+    assert rm.reminders_due("nobody", "2025-01-01", "2025-12-31") == []
+
+def test_reminders_due_all_merges_every_user(reminders):
+    hits = _titles(rm.reminders_due_all("2025-03-10", "2025-03-31"))
+    assert [d for d, _, _ in hits] == sorted(d for d, _, _ in hits)
+    assert ("2025-03-15", "ali", "Licence") in hits and ("2025-03-31", "ali", "Rates") in hits
+    per_user = sorted(_titles(rm.reminders_due("sarah", "2025-03-10", "2025-03-31"))
+                      + _titles(rm.reminders_due("ali", "2025-03-10", "2025-03-31")))
+    assert sorted(hits) == per_user
+
+# remove_reminder (and remove_goal / remove_rule) drop the row they are
+# given, not the first row equal to it.
+REMOVE_EQUAL = """
+import json, data_manager, goals_manager as gm, recurring_manager as rc, reminders_manager as rm
+out = {}
+for name, rows, insert, remove, make in [
+    ("one-shot", rm.get_reminders_data, rm.insert_reminder, rm.remove_reminder,
+     lambda: {"username": "sarah", "title": "Twin", "due_date": "2025-05-01", "notes": ""}),
+    ("repeating", rm.get_reminders_data, rm.insert_reminder, rm.remove_reminder,
+     lambda: {"username": "sarah", "title": "Twin", "due_date": "2025-05-01", "notes": "",
+              "frequency": "weekly"}),
+    ("goal", gm.get_goals_data, gm.insert_goal, gm.remove_goal,
+     lambda: {"username": "sarah", "goal_name": "Twin", "target_cents": 100, "saved_cents": 0}),
+    ("rule", rc.get_recurring_data, rc.insert_rule, rc.remove_rule,
+     lambda: {"username": "sarah", "type": "expense", "amount_cents": 100, "category": "Twin",
+              "frequency": "weekly", "next_date": "2025-05-01"}),
+]:
+    first, second = make(), make()
+    insert(first)
+    insert(second)
+    rm.reminders_due("sarah", "2025-01-01", "2025-12-31")     # builds the due index
+    remove(second)
+    left = [r for r in rows() if r == first]
+    out[name] = len(left) == 1 and left[0] is first
+out["due"] = [r["title"] for _, r in rm.reminders_due("sarah", "2025-05-01", "2025-05-01")].count("Twin")
+data_manager.close_writes()
+print(json.dumps(out))
+"""
+
+def test_remove_takes_the_row_itself_not_an_equal_one(scratch):
+    p = run_py(scratch, "-c", REMOVE_EQUAL)
+    assert p.returncode == 0, p.stderr
+    assert json.loads(p.stdout.strip().splitlines()[-1]) == {
+        "one-shot": True, "repeating": True, "goal": True, "rule": True, "due": 2}
@@ -0,0 +1,136 @@
+# ReportService.monthly reads the month through the backend's per-user
+# loaders; on every storage it must list exactly the user's rows of that
+# month (as the totals count them), including writes made just before.
+import json
+import os
+
+import pytest
+
+from conftest import STORAGES, migrate, run_py
+
+STEPS = """
+import json, data_manager, services as svc
+from utils import iso_ordinal
+session = svc.Session("sarah")
+txns, reports = svc.TransactionService(session), svc.ReportService(session)
+
+def check(month):
+    report = reports.monthly(month)
+    expected = sorted((t for t in txns.list() if iso_ordinal(t["date"]) and t["date"][:7] == month),
+                      key=lambda t: t["date"])
+    assert [t["id"] for t in report["transactions"]] == [t["id"] for t in expected], month
+    assert len(report["transactions"]) == reports.count(month), month
+    return sorted(t["id"] for t in report["transactions"])
+
+out = {"before": check("2025-10")}
+t = txns.add("expense", "12.34", "Monthly test", date="2025-10-15")
+out["added"] = [t["id"] in check("2025-10")]
+txns.edit(t["id"], date="2025-11-02")
+out["moved"] = [t["id"] in check("2025-10"), t["id"] in check("2025-11")]
+txns.delete(t["id"])
+out["deleted"] = [t["id"] in check("2025-11")]
+out["malformed"] = [r["description"] for r in reports.monthly("2025-10")["transactions"]
+                    if r["description"] == "Malformed day"]
+data_manager.close_writes()
+print(json.dumps(out))
+"""
+
+@pytest.mark.parametrize("storage", STORAGES)
+def test_monthly_report_lists_the_months_rows(scratch, storage):
+    path = os.path.join(scratch, "data", "transactions.json")
+    with open(path, encoding="utf-8") as f:
+        rows = json.load(f)
+    rows.append({"id": 9999, "username": "sarah", "type": "expense", "amount_cents": 100,
+                 "category": "Food", "date": "2025-10-32", "description": "Malformed day"})
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(rows, f)
+    migrate(scratch, storage)
+
+    p = run_py(scratch, "-c", STEPS, env={"PFM_STORAGE": storage})
+    assert p.returncode == 0, p.stderr
+    out = json.loads(p.stdout.strip().splitlines()[-1])
+    assert out["before"]
+    assert out["added"] == [True]
+    assert out["moved"] == [False, True]
+    assert out["deleted"] == [False]
+    assert out["malformed"] == []
+
+# rollups: the table is saved once per flush, not once per change, and a
+# table left unsaved (the process died) is rebuilt rather than trusted.
+ADD_MANY = """
+import os, sys, json, data_manager, rollups, services as svc
+saves = []
+save_json = rollups.save_json
+rollups.save_json = lambda path, *a, **kw: (saves.append(path), save_json(path, *a, **kw))
+txns = svc.TransactionService(svc.Session("sarah"))
+for i in range(5):
+    txns.add("expense", "1", "Rollup test", date="2025-10-0" + str(i + 1))
+if sys.argv[1] == "crash":
+    data_manager.flush_writes(data_manager.pending_writes())   # the rows, not the table
+    os._exit(0)
+data_manager.close_writes()
+print(json.dumps(len(saves)))
+"""
+
+TOTALS = """
+import json, rollups, services as svc
+rebuilt = []
+rebuild = rollups.rebuild
+rollups.rebuild = lambda rows: (rebuilt.append(1), rebuild(rows))
+print(json.dumps({"count": svc.ReportService(svc.Session("sarah")).count("2025-10"), "rebuilt": bool(rebuilt)}))
+"""
+
+@pytest.mark.parametrize("storage", STORAGES)
+def test_rollups_saved_once_per_flush(scratch, storage):
+    migrate(scratch, storage)
+    env = {"PFM_STORAGE": storage}
+    before = json.loads(run_py(scratch, "-c", TOTALS, env=env).stdout.strip().splitlines()[-1])
+
+    p = run_py(scratch, "-c", ADD_MANY, "flush", env=env)
+    assert p.returncode == 0, p.stderr
+    assert json.loads(p.stdout.strip().splitlines()[-1]) == 1
+    after = json.loads(run_py(scratch, "-c", TOTALS, env=env).stdout.strip().splitlines()[-1])
+    assert after == {"count": before["count"] + 5, "rebuilt": False}
+
+    p = run_py(scratch, "-c", ADD_MANY, "crash", env=env)
+    assert p.returncode == 0, p.stderr
+    after = json.loads(run_py(scratch, "-c", TOTALS, env=env).stdout.strip().splitlines()[-1])
+    assert after == {"count": before["count"] + 10, "rebuilt": True}
+
+# services._lock: report calls run alongside each other once the rollups
+# are built; a change waits until they finish.
+SHARED = """
+import json, threading, rollups, services as svc
+reports = svc.ReportService(svc.Session("sarah"))
+reports.count()                              # builds the table (exclusively)
+inside, release = threading.Event(), threading.Event()
+count = rollups.count
+def slow_count(*args):
+    inside.set()
+    release.wait(10)
+    return count(*args)
+rollups.count = slow_count
+slow = threading.Thread(target=reports.count)
+slow.start()
+inside.wait(10)
+rollups.count = count
+other = threading.Thread(target=reports.trend)
+other.start()
+other.join(5)
+writer = threading.Thread(target=svc.TransactionService(svc.Session("sarah")).add,
+                          args=("expense", "1", "Shared lock"))
+writer.start()
+writer.join(0.5)
+out = {"reader_ran": not other.is_alive(), "writer_waited": writer.is_alive()}
+release.set()
+for t in (slow, other, writer):
+    t.join(10)
+out["done"] = not any(t.is_alive() for t in (slow, other, writer))
+print(json.dumps(out))
+"""
+
+def test_report_calls_share_the_lock(scratch):
+    p = run_py(scratch, "-c", SHARED, timeout=60)
+    assert p.returncode == 0, p.stderr
+    assert json.loads(p.stdout.strip().splitlines()[-1]) == {
+        "reader_ran": True, "writer_waited": True, "done": True}
@@ -0,0 +1,92 @@
+# scheduler.Scheduler: rules falling due on different dates are applied by
+# the tick that reaches their date, once, and re-queued under their next date.
+import json
+import os
+
+import pytest
+
+from conftest import ROOT, STORAGES, migrate, run_py
+
+RULES = [
+    {"username": "sarah", "type": "expense", "amount_cents": 5000, "category": "Sched rent",
+     "frequency": "monthly", "next_date": "2025-01-31"},
+    {"username": "sarah", "type": "expense", "amount_cents": 700, "category": "Sched gym",
+     "frequency": "weekly", "next_date": "2025-02-10"},
+    {"username": "ali", "type": "income", "amount_cents": 100, "category": "Sched trial",
+     "frequency": "daily", "next_date": "2025-03-01", "max_count": 3, "count": 0},
+    {"username": "ali", "type": "expense", "amount_cents": 900, "category": "Sched later",
+     "frequency": "monthly", "next_date": "2026-01-01"},
+]
+
+TICKS = """
+import json, scheduler, data_manager, transaction_manager as tm
+s = scheduler.Scheduler()
+s.refresh()
+out = [[len(s), s.next_due()]]
+for today in ("2025-01-30", "2025-02-10", "2025-02-10", "2025-03-05"):
+    out.append([s.tick(today), len(s), s.next_due()])
+data_manager.close_writes()
+print(json.dumps(out))
+"""
+
+READ = """
+import json, recurring_manager as rc, transaction_manager as tm
+txns = [[t["username"], t["category"], t["date"]] for t in tm.get_transactions_data()
+        if t["category"].startswith("Sched ")]
+print(json.dumps({"txns": sorted(txns), "next": [r["next_date"] for r in rc.get_recurring_data()]}))
+"""
+
+def _last_json(proc):
+    assert proc.returncode == 0, proc.stderr
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+@pytest.mark.parametrize("storage", STORAGES)
+def test_tick_applies_rules_as_their_dates_come(scratch, storage):
+    with open(os.path.join(scratch, "data", "recurring.json"), "w", encoding="utf-8") as f:
+        json.dump(RULES, f)
+    migrate(scratch, storage)
+    env = {"PFM_STORAGE": storage}
+
+    ticks = _last_json(run_py(scratch, "-c", TICKS, env=env))
+    assert ticks == [
+        [4, "2025-01-31"],
+        [{}, 4, "2025-01-31"],                           # nothing due yet
+        [{"sarah": 2}, 4, "2025-02-17"],                 # Jan 31 rent, first gym
+        [{}, 4, "2025-02-17"],                           # same day again: nothing new
+        [{"sarah": 4, "ali": 3}, 3, "2025-03-10"],       # trial ends after 3 days
+    ]
+
+    state = _last_json(run_py(scratch, "-c", READ, env=env))
+    assert state["next"] == ["2025-03-28", "2025-03-10", "", "2026-01-01"]
+    assert state["txns"] == sorted([
+        ["sarah", "Sched rent", "2025-01-31"], ["sarah", "Sched rent", "2025-02-28"],
+        ["sarah", "Sched gym", "2025-02-10"], ["sarah", "Sched gym", "2025-02-17"],
+        ["sarah", "Sched gym", "2025-02-24"], ["sarah", "Sched gym", "2025-03-03"],
+        ["ali", "Sched trial", "2025-03-01"], ["ali", "Sched trial", "2025-03-02"],
+        ["ali", "Sched trial", "2025-03-03"],
+    ])
+
+    # A later pass over the same day finds nothing left to apply.
+    again = _last_json(run_py(scratch, os.path.join(ROOT, "scheduler.py"), "once", "--today", "2025-03-05", "--json", env=env))
+    assert again["total"] == 0 and again["next_due"] == "2025-03-10"
+
+@pytest.mark.parametrize("storage", STORAGES)
+def test_rules_with_malformed_dates_are_skipped(scratch, storage):
+    bad = [dict(RULES[1], category="Sched bad day", next_date="2025-02-30"),
+           dict(RULES[1], category="Sched bad end", end_date="someday")]
+    with open(os.path.join(scratch, "data", "recurring.json"), "w", encoding="utf-8") as f:
+        json.dump(bad + RULES, f)
+    migrate(scratch, storage)
+    env = {"PFM_STORAGE": storage}
+
+    p = run_py(scratch, os.path.join(ROOT, "scheduler.py"), "once", "--today", "2025-02-10", "--json", env=env)
+    assert _last_json(p)["applied"] == {"sarah": 2}
+    assert "skipping 2 rule(s) with malformed dates" in p.stderr
+
+    # The menus' path (apply_due_for) skips them too.
+    p = run_py(scratch, "-c", "import recurring_manager as rc, data_manager, json\n"
+               "print(json.dumps(rc.apply_due_for(['sarah'], '2025-03-05'))); data_manager.close_writes()", env=env)
+    assert _last_json(p) == {"sarah": 4}
+    state = _last_json(run_py(scratch, "-c", READ, env=env))
+    assert state["next"][:2] == ["2025-02-30", "2025-02-10"]
+    assert not any(c.startswith("Sched bad") for _, c, _ in state["txns"])
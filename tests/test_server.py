@@ -0,0 +1,67 @@
+# Smoke test of server.py on every storage backend: concurrent requests from
+# several clients must all succeed (handler threads share the backend).
+import http.client
+import json
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from conftest import ROOT, STORAGES, migrate
+
+def _request(port, method, path, body=None, token=None):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    headers = {"Content-Type": "application/json"}
+    if token:
+        headers["Authorization"] = "Bearer " + token
+    conn.request(method, path, json.dumps(body) if body is not None else None, headers)
+    resp = conn.getresponse()
+    payload = json.loads(resp.read() or b"null")
+    conn.close()
+    return resp.status, payload
+
+@pytest.fixture(params=STORAGES)
+def server(request, scratch):
+    migrate(scratch, request.param)
+    env = dict(os.environ, PYTHONPATH=ROOT, PFM_STORAGE=request.param)
+    proc = subprocess.Popen([sys.executable, os.path.join(ROOT, "server.py"), "serve", "--port", "0"],
+                            cwd=scratch, env=env, stderr=subprocess.PIPE, text=True)
+    line = proc.stderr.readline()
+    if "Serving on" not in line:
+        proc.kill()
+        pytest.fail(f"server did not start: {line}{proc.stderr.read()}")
+    port = int(line.split("http://", 1)[1].split()[0].rsplit(":", 1)[1])
+    yield port
+    proc.terminate()
+    proc.wait(timeout=10)
+
+def test_concurrent_requests(server):
+    status, login = _request(server, "POST", "/login", {"username": "sarah", "password": "123456"})
+    assert status == 200, login
+    token = login["token"]
+    failures = []
+
+    def client(n):
+        calls = [("POST", "/transactions", {"type": "expense", "amount": "1.25", "category": "Smoke",
+                                             "date": "2025-10-01", "description": f"client {n}"}),
+                 ("GET", "/transactions", None),
+                 ("GET", "/reports/dashboard", None),
+                 ("GET", "/reports/monthly?month=2025-10", None),
+                 ("GET", "/reminders/due?days=30", None)]
+        for method, path, body in calls * 3:
+            status, payload = _request(server, method, path, body, token)
+            if status != 200:
+                failures.append((method, path, status, payload))
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert failures == []
+
+    status, rows = _request(server, "GET", "/transactions", token=token)
+    assert status == 200
+    assert sum(1 for r in rows if r["category"] == "Smoke") == 18
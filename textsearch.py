@@ -0,0 +1,136 @@
+# textsearch.py
+# Ranked full-text search over transaction descriptions.
+# Per user: an inverted index (token -> rows) and a trigram index over the
+# token vocabulary (trigram -> tokens), so partial words like "netf" are
+# resolved against the vocabulary instead of scanning rows.
+# transaction_manager applies every insert/edit/delete here.
+
+import heapq
+import math
+import re
+from typing import Dict, List, Set
+
+from utils import iso_ordinal
+
+_WORD = re.compile(r"\w+")
+PARTIAL_WEIGHT = 0.6   # a token that merely contains the query term
+
+def tokenize(text) -> List[str]:
+    return _WORD.findall(str(text or "").lower())
+
+def _trigrams(token: str) -> Set[str]:
+    return {token[i:i + 3] for i in range(len(token) - 2)}
+
+class TextIndex:
+    """Inverted + trigram index over one user's descriptions. Rows are held
+    by identity (id(row) -> row) so duplicates and edits are tracked exactly."""
+
+    def __init__(self):
+        self.rows: Dict[int, dict] = {}
+        self.row_tokens: Dict[int, Set[str]] = {}
+        self.postings: Dict[str, Set[int]] = {}
+        self.trigrams: Dict[str, Set[str]] = {}
+
+    def add(self, row: dict):
+        key = id(row)
+        if key in self.rows:
+            self.remove(row)
+        tokens = set(tokenize(row.get("description")))
+        self.rows[key] = row
+        self.row_tokens[key] = tokens
+        for tok in tokens:
+            posting = self.postings.get(tok)
+            if posting is None:
+                posting = self.postings[tok] = set()
+                for g in _trigrams(tok):
+                    self.trigrams.setdefault(g, set()).add(tok)
+            posting.add(key)
+
+    def remove(self, row: dict):
+        key = id(row)
+        if self.rows.pop(key, None) is None:
+            return
+        for tok in self.row_tokens.pop(key, ()):
+            posting = self.postings[tok]
+            posting.discard(key)
+            if not posting:
+                # Last use of the token: drop it from the vocabulary too.
+                del self.postings[tok]
+                for g in _trigrams(tok):
+                    toks = self.trigrams[g]
+                    toks.discard(tok)
+                    if not toks:
+                        del self.trigrams[g]
+
+    def _matching_tokens(self, term: str) -> Dict[str, float]:
+        """Vocabulary tokens matching term -> weight (1 exact, PARTIAL_WEIGHT substring)."""
+        out = {term: 1.0} if term in self.postings else {}
+        grams = _trigrams(term)
+        if not grams:
+            return out   # 1-2 letter terms only match whole tokens
+        cands = None
+        for g in sorted(grams, key=lambda g: len(self.trigrams.get(g, ()))):
+            toks = self.trigrams.get(g)
+            if not toks:
+                return out
+            cands = set(toks) if cands is None else cands & toks
+            if not cands:
+                return out
+        for tok in cands:
+            if tok != term and term in tok:
+                out[tok] = PARTIAL_WEIGHT
+        return out
+
+    def search(self, text: str, limit: int = 50) -> List[dict]:
+        """Rows ranked by the idf-weighted number of query terms they match;
+        ties go to the most recent date."""
+        n = len(self.rows) or 1
+        scores: Dict[int, float] = {}
+        for term in dict.fromkeys(tokenize(text)):
+            best: Dict[int, float] = {}
+            for tok, weight in self._matching_tokens(term).items():
+                posting = self.postings[tok]
+                w = weight * math.log(1 + n / len(posting))
+                for key in posting:
+                    if w > best.get(key, 0.0):
+                        best[key] = w
+            for key, w in best.items():
+                scores[key] = scores.get(key, 0.0) + w
+        top = heapq.nlargest(limit, scores.items(),
+                             key=lambda kv: (kv[1], iso_ordinal(self.rows[kv[0]].get("date")) or 0))
+        return [self.rows[key] for key, _ in top]
+
+# ---------- Maintenance ----------
+# username -> index; users are indexed on their first search.
+_indexes: Dict[str, TextIndex] = {}
+
+def apply(added=(), removed=()):
+    """Fold row changes into the indexes already built (an edit is remove + add)."""
+    for t in removed:
+        idx = _indexes.get(t.get("username"))
+        if idx is not None:
+            idx.remove(t)
+    for t in added:
+        idx = _indexes.get(t.get("username"))
+        if idx is not None:
+            idx.add(t)
+
+def invalidate():
+    _indexes.clear()
+
+def built(username: str) -> bool:
+    """Whether username's index exists (index_for will not build it)."""
+    return username in _indexes
+
+def index_for(username: str) -> TextIndex:
+    idx = _indexes.get(username)
+    if idx is None:
+        import transaction_manager as tm
+        idx = TextIndex()
+        for t in tm.get_user_transactions(username):
+            idx.add(t)
+        _indexes[username] = idx
+    return idx
+
+def search(username: str, text: str, limit: int = 50) -> List[dict]:
+    return index_for(username).search(text, limit)
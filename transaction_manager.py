@@ -1,159 +1,328 @@
 # transaction_manager.py
 # Transactions backed by data_manager and session from user_manager.
 
-from datetime import datetime, date
-from decimal import Decimal
-from typing import List
+from typing import Dict, List, Optional, Tuple
 
-from data_manager import load_json, save_json, FILES
-from utils import today_iso, get_number,ask_int_in_range ,get_choice
+import os
+
+from data_manager import DATA_DIR, get_backend, reserve_ids, timed
+from utils import get_number, get_amount, ask_int_in_range ,get_choice, iso_ordinal, remove_identical
+from money import money_of, migrate_rows
 import user_manager as um
+import services as svc
+import query
+import rollups
+import textsearch
 import ui
 
-TXNS_PATH = FILES["transactions"]
+# Highest id handed out per user, shared by every process (see assign_ids).
+IDS_PATH = os.path.join(DATA_DIR, "transaction_ids.json")
 
 # Module-level state
-_transactions: List[dict] = load_json(TXNS_PATH)
+_backend = get_backend()
+_transactions: List[dict] = []
+# Nothing is read until first access (see _ensure_loaded).
+_loaded = False
+# Usernames whose rows are in _transactions; None means every user is loaded.
+_loaded_users = None
+# Binary snapshot users are decoded from on first access (JSON-family backends).
+_snapshot = None
+
+# Secondary indexes, kept in step with _transactions by every mutation path.
+_by_user: Dict[str, List[dict]] = {}          # username -> rows (list order)
+_by_key: Dict[Tuple[str, int], dict] = {}     # (username, id) -> first such row
+_max_id: Dict[str, int] = {}                  # username -> highest id in use
+
+# ---------- Index maintenance ----------
+def _index_add(rows: List[dict]):
+    for t in rows:
+        username = t.get("username")
+        _by_user.setdefault(username, []).append(t)
+        _by_key.setdefault((username, t.get("id")), t)
+        tid = t.get("id")
+        if isinstance(tid, int) and tid > _max_id.get(username, 0):
+            _max_id[username] = tid
+
+def _index_remove(t: dict):
+    username, tid = t.get("username"), t.get("id")
+    rows = _by_user.get(username, [])
+    remove_identical(rows, t)
+    if _by_key.get((username, tid)) is t:
+        del _by_key[(username, tid)]
+        # Data imported before ids were checked can repeat an id; promote
+        # the next row that carries it.
+        dup = next((r for r in rows if r.get("id") == tid), None)
+        if dup is not None:
+            _by_key[(username, tid)] = dup
+    if tid == _max_id.get(username):
+        ids = [r["id"] for r in rows if isinstance(r.get("id"), int)]
+        _max_id[username] = max(ids) if ids else 0
+
+def _index_rebuild():
+    _by_user.clear()
+    _by_key.clear()
+    _max_id.clear()
+    _index_add(_transactions)
+
+# ---------- Date validation ----------
+def malformed_dates(rows: Optional[List[dict]] = None) -> List[dict]:
+    """Rows whose date is not a valid YYYY-MM-DD (date-based reports leave them out)."""
+    if rows is None:
+        _ensure_loaded()
+    return [t for t in (_transactions if rows is None else rows) if iso_ordinal(t.get("date")) is None]
+
+def _flag_malformed(rows: List[dict]):
+    bad = malformed_dates(rows)
+    if not bad:
+        return
+    sample = ", ".join(f"{t.get('username')}#{t.get('id')} ({t.get('date')!r})" for t in bad[:5])
+    more = " ..." if len(bad) > 5 else ""
+    ui.status_warn(f"{len(bad)} transaction(s) have malformed dates and are left out of date-based reports: {sample}{more}")
 
 # ---------- Persistence ----------
 def reload_transactions():
-    global _transactions
-    _transactions = load_json(TXNS_PATH)
-
-def save_transactions():
-    save_json(TXNS_PATH, _transactions)
+    global _loaded
+    with timed("load transactions"):
+        _load()
+    _loaded = True
+    _index_rebuild()
+    rollups.invalidate()
+    query.invalidate()
+    textsearch.invalidate()
+
+def _load():
+    global _transactions, _loaded_users, _snapshot
+    _snapshot = None if _backend.supports_user_load else _backend.open_snapshot("transactions")
+    if _backend.supports_user_load or _snapshot is not None:
+        # Partitioned storage or a fresh snapshot: users are pulled in on first access.
+        _transactions = []
+        _loaded_users = set()
+    else:
+        _transactions = _backend.load("transactions")
+        _loaded_users = None
+        migrate_rows("transactions", _transactions)
+        _flag_malformed(_transactions)
+
+def _ensure_loaded():
+    if not _loaded:
+        reload_transactions()
+
+def _ensure_user_loaded(username: str):
+    _ensure_loaded()
+    if _loaded_users is None or username in _loaded_users:
+        return
+    if _snapshot is not None:
+        rows = _snapshot.load_user(username)
+    else:
+        rows = _backend.load_user_partitions(username)
+    migrate_rows("transactions", rows)
+    _flag_malformed(rows)
+    _transactions.extend(rows)
+    _index_add(rows)
+    _loaded_users.add(username)
+
+def _ensure_all_loaded():
+    global _loaded_users, _snapshot
+    _ensure_loaded()
+    if _loaded_users is None:
+        return
+    for username in (_snapshot if _snapshot is not None else _backend).users():
+        _ensure_user_loaded(username)
+    _loaded_users = None
+    _snapshot = None
+
+def _before_write(rows: List[dict]):
+    # Backends without per-user writes rewrite (or compact) the whole
+    # dataset, so a snapshot-backed session must hold every row first.
+    if _backend.supports_user_load:
+        for username in {t.get("username") for t in rows}:
+            _ensure_user_loaded(username)
+    else:
+        _ensure_all_loaded()
+
+# Every mutation below brings the rollups up to date *before* touching the
+# rows (so a stale table is rebuilt from the old state), then applies the delta.
+def insert_transactions(rows: List[dict]):
+    """Append new rows and persist only those rows where the backend allows it."""
+    if not rows:
+        return
+    _before_write(rows)
+    rollups.ensure(get_transactions_data)
+    _transactions.extend(rows)
+    _index_add(rows)
+    _backend.insert("transactions", _transactions, rows)
+    rollups.apply(added=rows)
+    query.apply(added=rows)
+    textsearch.apply(added=rows)
+
+def update_transaction(t: dict, changes: dict):
+    """Apply field changes to a row. Edits never change username or id, so
+    the indexes stay valid as they are."""
+    if not changes:
+        return
+    _before_write([t])
+    rollups.ensure(get_transactions_data)
+    before = dict(t)
+    t.update(changes)
+    _backend.update("transactions", _transactions, [t], [before])
+    rollups.apply(added=[t], removed=[before])
+    query.apply(added=[t])
+    if "description" in changes:
+        textsearch.apply(added=[t], removed=[t])
+
+def remove_transactions(rows: List[dict]):
+    if not rows:
+        return
+    _before_write(rows)
+    rollups.ensure(get_transactions_data)
+    for t in rows:
+        remove_identical(_transactions, t)
+        _index_remove(t)
+    _backend.delete("transactions", _transactions, rows)
+    rollups.apply(removed=rows)
+    query.apply(removed=rows)
+    textsearch.apply(removed=rows)
 
 # ---------- Utilities ----------
-def _next_id_for_user(username: str) -> int:
-    ids = [t["id"] for t in _transactions if t.get("username") == username]
-    return (max(ids) + 1) if ids else 1
+def assign_ids(username: str, rows: List[dict]):
+    """Number new rows with the user's next free ids. Ids are reserved from a
+    counter on disk under its lock, so processes adding rows at the same
+    time (menus, cli.py, server.py) never hand out the same id."""
+    if not rows:
+        return
+    _ensure_user_loaded(username)
+    first = reserve_ids(IDS_PATH, username, len(rows), _max_id.get(username, 0))
+    for i, t in enumerate(rows):
+        t["id"] = first + i
+
+def reserve_given_ids(rows: List[dict]):
+    """Move each user's id counter past the ids rows already carry (e.g. from
+    a CSV import), so assign_ids never hands one of them out again."""
+    top: Dict[str, int] = {}
+    for t in rows:
+        top[t["username"]] = max(top.get(t["username"], 0), t["id"])
+    for username, tid in top.items():
+        reserve_ids(IDS_PATH, username, 0, tid)
+
+def find_transaction(username: str, txn_id) -> Optional[dict]:
+    _ensure_user_loaded(username)
+    return _by_key.get((username, txn_id))
 
 def _user_transactions(username: str) -> List[dict]:
-    return [t for t in _transactions if t.get("username") == username]
+    # Live index list: callers must not mutate it.
+    _ensure_user_loaded(username)
+    return _by_user.get(username, [])
+
+def get_user_transactions(username: str) -> List[dict]:
+    return _user_transactions(username)
+
+def usernames() -> List[str]:
+    """Every username that has transactions, without loading all of them."""
+    _ensure_loaded()
+    names = {u for u, rows in _by_user.items() if rows}
+    if _loaded_users is not None:
+        names.update((_snapshot if _snapshot is not None else _backend).users())
+    return sorted(names, key=str)
 
 def get_transactions_data() -> List[dict]:
+    _ensure_all_loaded()
     return _transactions
 
-# ---------- Core ops ----------
-def add_transaction():
+# ---------- Menu adapters (see services.TransactionService) ----------
+def _service():
     if not um.is_logged_in():
         ui.status_warn("Please log in first.")
+        return None
+    return svc.TransactionService(svc.Session.for_user(um.get_current_user()))
+
+def add_transaction():
+    s = _service()
+    if s is None:
         return
 
-    user = um.get_current_user()
     ui.section("Add Transaction")
     t_type = get_choice("Type (income/expense): ", ["income", "expense"])
 
-    amount = get_number("Amount: ")
+    amount = get_amount("Amount: ")
     category = input("Category (e.g. Food, Salary, Bills): ").title().strip()
     if not category:
         ui.status_err("Category cannot be empty.")
         return
 
     description = input("Description: ").strip()
-    date_str = input("Date (YYYY-MM-DD, leave empty for today): ").strip() or today_iso()
-
-    new_txn = {
-        "id": _next_id_for_user(user["username"]),
-        "username": user["username"],
-        "type": t_type,
-        "amount": float(amount),  # stored as float for simplicity
-        "category": category,
-        "date": date_str,
-        "description": description,
-        "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "updated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-    }
-    _transactions.append(new_txn)
-    save_transactions()
+    date_str = input("Date (YYYY-MM-DD, leave empty for today): ").strip()
+    try:
+        s.add(t_type, amount, category, description, date_str)
+    except svc.ServiceError as e:
+        ui.status_err(str(e))
+        return
     ui.status_ok("Transaction added successfully!")
 
 def view_transactions():
-    if not um.is_logged_in():
-        ui.status_warn("Please log in first.")
+    s = _service()
+    if s is None:
         return
 
-    user = um.get_current_user()
-    records = _user_transactions(user["username"])
-    ui.section(f"{user['username']}'s Transactions")
+    records = s.list()
+    ui.section(f"{s.username}'s Transactions")
     if not records:
         ui.status_warn("No transactions found.")
         return
 
     ui.table(
-        rows=[(t['id'], t['type'], f"{t['amount']:.2f}", t['category'], t['date'], t.get('description', '')) for t in records],
+        rows=[(t['id'], t['type'], str(money_of(t)), t['category'], t['date'], t.get('description', '')) for t in records],
         headers=("ID","TYPE","AMOUNT","CATEGORY","DATE","DESC"),
         align=["r","l","r","l","l","l"],
         pad=1
     )
 
+def _pick(s, prompt):
+    view_transactions()
+    txn_id = int(get_number(prompt))
+    try:
+        return s.get(txn_id)
+    except svc.ServiceError as e:
+        ui.status_err(str(e))
+        return None
+
 def edit_transaction():
-    if not um.is_logged_in():
-        ui.status_warn("Please log in first.")
+    s = _service()
+    if s is None:
+        return
+    t = _pick(s, "Enter the transaction ID to edit: ")
+    if t is None:
         return
 
-    view_transactions()
-    txn_id = int(get_number("Enter the transaction ID to edit: "))
-
-    user = um.get_current_user()
-    for t in _transactions:
-        if t.get("id") == txn_id and t.get("username") == user["username"]:
-            print("Leave a field blank to keep it unchanged.")
-
-            new_type = input(f"New type ({t['type']}): ").strip().lower()
-            if new_type:
-                if new_type in ("income", "expense"):
-                    t["type"] = new_type
-                else:
-                    ui.status_warn("Invalid type. Keeping old value.")
-
-            new_amount = input(f"New amount ({t['amount']}): ").strip()
-            if new_amount:
-                try:
-                    t["amount"] = float(Decimal(new_amount))
-                except Exception:
-                    ui.status_warn("Invalid amount. Keeping old value.")
-
-            new_category = input(f"New category ({t['category']}): ").strip()
-            if new_category:
-                t["category"] = new_category
-
-            new_desc = input(f"New description ({t['description']}): ").strip()
-            if new_desc:
-                t["description"] = new_desc
-
-            new_date = input(f"New date ({t['date']}) [YYYY-MM-DD]: ").strip()
-            if new_date:
-                t["date"] = new_date
-
-            t["updated_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            save_transactions()
-            ui.status_ok("Transaction updated successfully!")
-            return
-
-    ui.status_err("Transaction not found.")
+    print("Leave a field blank to keep it unchanged.")
+    raw = {}
+    for field, prompt in (("type", f"New type ({t['type']}): "),
+                          ("amount", f"New amount ({money_of(t)}): "),
+                          ("category", f"New category ({t['category']}): "),
+                          ("description", f"New description ({t['description']}): "),
+                          ("date", f"New date ({t['date']}) [YYYY-MM-DD]: ")):
+        value = input(prompt).strip()
+        if s.check_changes({field: value})[1]:
+            ui.status_warn(f"Invalid {field}. Keeping old value.")
+        else:
+            raw[field] = value
+
+    s.edit(t["id"], **raw)
+    ui.status_ok("Transaction updated successfully!")
 
 def delete_transaction():
-    if not um.is_logged_in():
-        ui.status_warn("Please log in first.")
+    s = _service()
+    if s is None:
+        return
+    t = _pick(s, "Enter the transaction ID to edit: ")
+    if t is None:
         return
 
-    view_transactions()
-    txn_id = int(get_number("Enter the transaction ID to edit: "))
-
-    user = um.get_current_user()
-    for t in list(_transactions):
-        if t.get("id") == txn_id and t.get("username") == user["username"]:
-            confirm = input("Are you sure you want to delete this? (y/n): ").lower()
-            if confirm == "y":
-                _transactions.remove(t)
-                save_transactions()
-                ui.status_ok("Transaction deleted.")
-            else:
-                ui.status_warn("Deletion cancelled.")
-            return
-
-    ui.status_err("Transaction not found.")
+    confirm = input("Are you sure you want to delete this? (y/n): ").lower()
+    if confirm == "y":
+        s.delete(t["id"])
+        ui.status_ok("Transaction deleted.")
+    else:
+        ui.status_warn("Deletion cancelled.")
 
 # ---------- Menu ----------
 def transaction_menu():
@@ -14,7 +14,9 @@ FG = {"grey":"", "red":"", "green":"", "yellow":"", "blue":"", "magenta":"", "cy
 def _enable_colors():
     global RESET, BOLD, DIM, FG
     try:
-        # Optional dependency; improves Windows support
+        # Optional dependency, only needed on Windows; elsewhere skip the import.
+        if os.name != "nt":
+            raise ImportError
         from colorama import init, Fore, Style
         init(autoreset=True)
         RESET = Style.RESET_ALL
@@ -120,3 +122,14 @@ def menu(title, items):
     section(title)
     for k, label in items:
         print(f"{FG['blue']}{k}.{RESET} {label}")
+
+def select(prompt: str, count: int):
+    """Ask for a 1-based list position; None (after an error line) if invalid."""
+    try:
+        idx = int(input(prompt).strip())
+    except ValueError:
+        idx = 0
+    if not 1 <= idx <= count:
+        status_err("Invalid selection.")
+        return None
+    return idx
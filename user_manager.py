@@ -5,14 +5,13 @@ from datetime import datetime
 from typing import Optional, List
 import hashlib
 import getpass
-from data_manager import load_json, save_json, FILES
+from data_manager import get_backend, timed
 from utils import get_nonempty_input
 import ui
 
-USERS_PATH = FILES["users"]
-
 # Module-level state
-_users: List[dict] = load_json(USERS_PATH)
+_backend = get_backend()
+_users: Optional[List[dict]] = None   # loaded on first use, see get_users_data
 _current_user: Optional[dict] = None
 
 # password hashing
@@ -22,7 +21,7 @@ def hash_password(password: str) -> str:
 # ---------- Queries ----------
 def find_user(username: str):
     username = (username or "").strip()
-    for u in _users:
+    for u in get_users_data():
         if u.get("username") == username:
             return u
     return None
@@ -34,6 +33,10 @@ def is_logged_in() -> bool:
     return _current_user is not None
 
 def get_users_data() -> List[dict]:
+    global _users
+    if _users is None:
+        with timed("load users"):
+            _users = _backend.load("users")
     return _users
 
 # ---------- Core ops ----------
@@ -55,8 +58,9 @@ def register_user():
         "currency": currency,
         "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
     }
-    _users.append(new_user)
-    save_json(USERS_PATH, _users)
+    users = get_users_data()
+    users.append(new_user)
+    _backend.insert("users", users, [new_user])
     ui.status_ok(f"User '{username}' registered successfully!")
 
 def login_user():
@@ -80,10 +84,7 @@ def logout_user():
     else:
         ui.status_warn("No user is currently logged in.")
 
-# ---------- Save/Reload ----------
+# ---------- Reload ----------
 def reload_users():
     global _users
-    _users = load_json(USERS_PATH)
-
-def save_users():
-    save_json(USERS_PATH, _users)
+    _users = _backend.load("users")
@@ -1,9 +1,11 @@
 # utils.py
 # Shared validation, formatting, and menu helpers.
 
-from datetime import datetime, date
+from datetime import date
 from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
 
+from money import Money
+
 # --- Conversion & Formatting ---
 
 def to_decimal(value):
@@ -13,19 +15,65 @@ def to_decimal(value):
         raise ValueError(f"Invalid numeric value: {value!r}")
 
 def fmt_money(value, currency=None):
-    try:
-        d = to_decimal(value)
-    except Exception:
-        return str(value)
-    s = f"{d:.2f}"
+    if isinstance(value, Money):
+        s = str(value)
+    else:
+        try:
+            s = f"{to_decimal(value):.2f}"
+        except Exception:
+            return str(value)
     return f"{s} {currency}" if currency else s
 
-def parse_date(date_str):
-    return datetime.strptime(date_str, "%Y-%m-%d").date()
+def get_amount(prompt, allow_zero=False):
+    return Money.parse(get_number(prompt, allow_zero))
+
+# --- Dates ---
+# Stored dates are strict ISO "YYYY-MM-DD". Each distinct string is parsed once
+# into (ordinal, month key); malformed ones map to (None, None).
+_parsed_dates = {}
+
+def _parse_iso(s):
+    if (isinstance(s, str) and len(s) == 10 and s[4] == "-" and s[7] == "-" and s.isascii()
+            and s[:4].isdigit() and s[5:7].isdigit() and s[8:].isdigit()):
+        y, m = int(s[:4]), int(s[5:7])
+        try:
+            return date(y, m, int(s[8:])).toordinal(), y * 12 + m - 1
+        except ValueError:
+            pass
+    return None, None
+
+def _date_parts(date_str):
+    try:
+        return _parsed_dates[date_str]
+    except KeyError:
+        if len(_parsed_dates) >= 100_000:
+            _parsed_dates.clear()
+        parts = _parsed_dates[date_str] = _parse_iso(date_str)
+        return parts
+    except TypeError:   # unhashable
+        return None, None
+
+def iso_ordinal(date_str):
+    """date.toordinal() of a strict ISO date string, or None if malformed."""
+    return _date_parts(date_str)[0]
+
+def month_key(date_str):
+    """year * 12 + (month - 1) of a strict ISO date string, or None if malformed."""
+    return _date_parts(date_str)[1]
 
 def today_iso():
     return date.today().isoformat()
 
+# --- Rows ---
+
+def remove_identical(rows, row):
+    """Remove row itself from rows. list.remove() compares by value and
+    could drop an equal duplicate (e.g. two identical reminders) instead."""
+    for i, r in enumerate(rows):
+        if r is row:
+            del rows[i]
+            return
+
 # --- Input Validation Helpers ---
 
 def get_nonempty_input(prompt):